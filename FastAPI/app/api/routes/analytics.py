@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Literal, Optional
+from datetime import date
+from app.models.analytics import AnalyticsSummary
+from app.services.analytics_service import AnalyticsService
+from app.core.auth import get_current_user
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"]
+)
+
+@router.get("/summary", response_model=AnalyticsSummary)
+async def get_summary(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    group_by: Literal["category", "day", "week", "month"] = "month",
+    currency: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get income and expense totals per group, 'from' inclusive and 'to' exclusive"""
+    try:
+        return await AnalyticsService.summary(current_user["uid"], date_from, date_to, group_by, currency)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build summary: {str(e)}")
@@ -3,7 +3,8 @@ from typing import List, Dict, Any
 
 from app.models.budget import BudgetBase, BudgetModel
 from app.services.budget_service import BudgetService
-from app.services.transaction_service import TransactionService
+from app.core.auth import get_current_user
+from app.core.versioning import conditional_get
 
 router = APIRouter(
     prefix="/budgets",
@@ -11,72 +12,75 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=BudgetModel)
-async def create_budget(budget: BudgetBase):
+async def create_budget(budget: BudgetBase, current_user: dict = Depends(get_current_user)):
     """Create a new budget"""
     # Check if budget already exists for this category
-    existing_budget = await BudgetService.get_by_category(budget.category)
+    existing_budget = await BudgetService.get_by_category(current_user["uid"], budget.category)
     if existing_budget:
         raise HTTPException(status_code=400, detail=f"Budget for category '{budget.category}' already exists")
     
     # Create budget
     budget_data = budget.model_dump()
-    result = await BudgetService.create(budget_data)
+    result = await BudgetService.create(current_user["uid"], budget_data)
     return result
 
-@router.get("/", response_model=List[BudgetModel])
-async def get_all_budgets():
+@router.get("/", response_model=List[BudgetModel], dependencies=[Depends(conditional_get("budgets"))])
+async def get_all_budgets(current_user: dict = Depends(get_current_user)):
     """Get all budgets"""
-    return await BudgetService.get_all()
+    return await BudgetService.get_all(current_user["uid"])
+
+@router.get("/status", response_model=List[Dict[str, Any]])
+async def get_all_budget_statuses(current_user: dict = Depends(get_current_user)):
+    """Get budget status for every category in one call"""
+    # Only the current month's expenses are fetched for calculating every budget's status
+    return await BudgetService.calculate_all_budget_statuses(current_user["uid"])
 
 @router.get("/{budget_id}", response_model=BudgetModel)
-async def get_budget(budget_id: str):
+async def get_budget(budget_id: str, current_user: dict = Depends(get_current_user)):
     """Get a budget by ID"""
-    budget = await BudgetService.get_by_id(budget_id)
+    budget = await BudgetService.get_by_id(current_user["uid"], budget_id)
     if not budget:
         raise HTTPException(status_code=404, detail=f"Budget with ID {budget_id} not found")
     return budget
 
 @router.put("/{budget_id}", response_model=BudgetModel)
-async def update_budget(budget_id: str, budget_update: BudgetBase):
+async def update_budget(budget_id: str, budget_update: BudgetBase, current_user: dict = Depends(get_current_user)):
     """Update a budget"""
     # Check if budget exists
-    existing_budget = await BudgetService.get_by_id(budget_id)
+    existing_budget = await BudgetService.get_by_id(current_user["uid"], budget_id)
     if not existing_budget:
         raise HTTPException(status_code=404, detail=f"Budget with ID {budget_id} not found")
     
     # Update budget
     budget_data = budget_update.model_dump()
-    result = await BudgetService.update(budget_id, budget_data)
+    result = await BudgetService.update(current_user["uid"], budget_id, budget_data)
     return result
 
 @router.delete("/{budget_id}", response_model=dict)
-async def delete_budget(budget_id: str):
+async def delete_budget(budget_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a budget"""
     # Check if budget exists
-    existing_budget = await BudgetService.get_by_id(budget_id)
+    existing_budget = await BudgetService.get_by_id(current_user["uid"], budget_id)
     if not existing_budget:
         raise HTTPException(status_code=404, detail=f"Budget with ID {budget_id} not found")
     
     # Delete budget
-    result = await BudgetService.delete(budget_id)
+    result = await BudgetService.delete(current_user["uid"], budget_id)
     return {"success": result, "message": "Budget deleted successfully"}
 
 @router.get("/category/{category}", response_model=BudgetModel)
-async def get_budget_by_category(category: str):
+async def get_budget_by_category(category: str, current_user: dict = Depends(get_current_user)):
     """Get a budget by category"""
-    budget = await BudgetService.get_by_category(category)
+    budget = await BudgetService.get_by_category(current_user["uid"], category)
     if not budget:
         raise HTTPException(status_code=404, detail=f"Budget for category '{category}' not found")
     return budget
 
 @router.get("/status/{category}", response_model=Dict[str, Any])
-async def get_budget_status(category: str):
+async def get_budget_status(category: str, current_user: dict = Depends(get_current_user)):
     """Get budget status for a category"""
-    # Get all transactions for calculating budget status
-    transactions = await TransactionService.get_all()
-    
-    # Calculate budget status
-    budget_status = await BudgetService.calculate_budget_status(category, transactions)
+    # Calculate budget status from the category's expenses this month
+    budget_status = await BudgetService.calculate_budget_status(current_user["uid"], category)
     
     if not budget_status:
         raise HTTPException(status_code=404, detail=f"No budget found for category '{category}'")
@@ -1,15 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends
 from typing import List, Dict, Any
 
-from app.models.currency import Currency, ExchangeRate, ConversionRequest
+from app.models.currency import Currency, ExchangeRate, ConversionRequest, BatchConversionRequest
 from app.services.currency_service import CurrencyService
+from app.core.versioning import conditional_get
 
 router = APIRouter(
     prefix="/currencies",
     tags=["currencies"]
 )
 
-@router.get("/", response_model=List[Currency])
+@router.get("/", response_model=List[Currency], dependencies=[Depends(conditional_get("currencies"))])
 async def get_all_currencies():
     """Get all available currencies"""
     try:
@@ -19,9 +20,10 @@ async def get_all_currencies():
             return []
         return currencies
     except Exception as e:
-        # Return empty list on error instead of failing
+        # Fail rather than return an empty list, which would carry the list's ETag
+        # and be revalidated with 304 until the currencies next change
         print(f"Error fetching currencies: {e}")
-        return []
+        raise HTTPException(status_code=500, detail=f"Failed to fetch currencies: {str(e)}")
 
 @router.get("/default", response_model=Currency)
 async def get_default_currency():
@@ -86,6 +88,31 @@ async def convert_currency(conversion: ConversionRequest):
             "rate": 1.0
         }
 
+@router.post("/convert/batch", response_model=Dict[str, Any])
+async def convert_currency_batch(conversion: BatchConversionRequest):
+    """Convert many amounts to one currency in a single call"""
+    try:
+        converted, rates = await CurrencyService.convert_many(
+            conversion.amounts,
+            conversion.from_currencies,
+            conversion.to_currency
+        )
+        return {
+            "to_currency": conversion.to_currency,
+            "converted_amounts": converted.tolist(),
+            "rates": rates
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error converting currencies: {e}")
+        # Return amounts unchanged when errors occur, as the single conversion does
+        return {
+            "to_currency": conversion.to_currency,
+            "converted_amounts": conversion.amounts,
+            "rates": {}
+        }
+
 @router.post("/initialize", response_model=Dict[str, bool])
 async def initialize_currencies():
     """Initialize default currencies and exchange rates"""
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Literal, Optional
+from app.models.forecast import Forecast
+from app.services.forecast_service import ForecastService, MAX_HORIZON_DAYS
+from app.core.auth import get_current_user
+
+router = APIRouter(
+    prefix="/forecast",
+    tags=["forecast"]
+)
+
+@router.get("", response_model=Forecast)
+async def get_forecast(
+    horizon_days: int = Query(90, ge=1, le=MAX_HORIZON_DAYS),
+    currency: Optional[str] = None,
+    granularity: Literal["day", "month"] = "day",
+    starting_balance: Optional[float] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Project the balance from the recurring transactions without generating them
+    
+    Without starting_balance, the projection starts from the current net of the user's transactions.
+    """
+    try:
+        return await ForecastService.forecast(current_user["uid"], horizon_days, currency, granularity, starting_balance)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build forecast: {str(e)}")
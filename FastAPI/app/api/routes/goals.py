@@ -1,34 +1,50 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
 from app.models.goal import GoalCreate, GoalModel, GoalUpdate
 from app.services.goal_service import GoalService
+from app.core.auth import get_current_user
+from app.core.versioning import conditional_get
+from app.utils.pagination import InvalidCursorError, NEXT_CURSOR_HEADER
 
 # Initialize router
 goals_router = APIRouter(prefix="/goals", tags=["goals"])
 
 @goals_router.post("", response_model=GoalModel)
-async def create_goal(goal: GoalCreate):
+async def create_goal(goal: GoalCreate, current_user: dict = Depends(get_current_user)):
     """Create a new financial goal"""
     try:
-        created_goal = await GoalService.create(goal.dict())
+        created_goal = await GoalService.create(current_user["uid"], goal.dict())
         return created_goal
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create goal: {str(e)}")
 
-@goals_router.get("", response_model=List[GoalModel])
-async def get_goals(currency: Optional[str] = None):
-    """Get all financial goals with optional currency conversion"""
+@goals_router.get("", response_model=List[GoalModel], dependencies=[Depends(conditional_get("goals", "exchange_rates"))])
+async def get_goals(
+    response: Response,
+    limit: int = Query(100, gt=0, le=500),
+    cursor: Optional[str] = None,
+    currency: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of financial goals with optional currency conversion
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        goals = await GoalService.get_all(target_currency=currency)
+        goals, next_cursor = await GoalService.get_page(current_user["uid"], limit=limit, cursor=cursor, target_currency=currency)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return goals
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve goals: {str(e)}")
 
 @goals_router.get("/{goal_id}", response_model=GoalModel)
-async def get_goal(goal_id: str, currency: Optional[str] = None):
+async def get_goal(goal_id: str, currency: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Get a financial goal by ID with optional currency conversion"""
     try:
-        goal = await GoalService.get_by_id(goal_id, target_currency=currency)
+        goal = await GoalService.get_by_id(current_user["uid"], goal_id, target_currency=currency)
         if not goal:
             raise HTTPException(status_code=404, detail=f"Goal with ID {goal_id} not found")
         return goal
@@ -38,13 +54,13 @@ async def get_goal(goal_id: str, currency: Optional[str] = None):
         raise HTTPException(status_code=500, detail=f"Failed to retrieve goal: {str(e)}")
 
 @goals_router.put("/{goal_id}", response_model=GoalModel)
-async def update_goal(goal_id: str, goal_update: GoalUpdate):
+async def update_goal(goal_id: str, goal_update: GoalUpdate, current_user: dict = Depends(get_current_user)):
     """Update a financial goal"""
     try:
         # Filter out None values
         update_data = {k: v for k, v in goal_update.dict().items() if v is not None}
         
-        updated_goal = await GoalService.update(goal_id, update_data)
+        updated_goal = await GoalService.update(current_user["uid"], goal_id, update_data)
         if not updated_goal:
             raise HTTPException(status_code=404, detail=f"Goal with ID {goal_id} not found")
         return updated_goal
@@ -54,10 +70,10 @@ async def update_goal(goal_id: str, goal_update: GoalUpdate):
         raise HTTPException(status_code=500, detail=f"Failed to update goal: {str(e)}")
 
 @goals_router.delete("/{goal_id}")
-async def delete_goal(goal_id: str):
+async def delete_goal(goal_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a financial goal"""
     try:
-        deleted = await GoalService.delete(goal_id)
+        deleted = await GoalService.delete(current_user["uid"], goal_id)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Goal with ID {goal_id} not found")
         return {"message": f"Goal with ID {goal_id} deleted successfully"}
@@ -67,10 +83,10 @@ async def delete_goal(goal_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to delete goal: {str(e)}")
 
 @goals_router.post("/{goal_id}/contribute")
-async def contribute_to_goal(goal_id: str, amount: float = Query(..., gt=0)):
+async def contribute_to_goal(goal_id: str, amount: float = Query(..., gt=0), current_user: dict = Depends(get_current_user)):
     """Contribute an amount to a financial goal"""
     try:
-        updated_goal = await GoalService.contribute(goal_id, amount)
+        updated_goal = await GoalService.contribute(current_user["uid"], goal_id, amount)
         if not updated_goal:
             raise HTTPException(status_code=404, detail=f"Goal with ID {goal_id} not found")
         return updated_goal
@@ -80,10 +96,26 @@ async def contribute_to_goal(goal_id: str, amount: float = Query(..., gt=0)):
         raise HTTPException(status_code=500, detail=f"Failed to contribute to goal: {str(e)}")
 
 @goals_router.get("/category/{category}", response_model=List[GoalModel])
-async def get_goals_by_category(category: str, currency: Optional[str] = None):
-    """Get financial goals by category with optional currency conversion"""
+async def get_goals_by_category(
+    category: str,
+    response: Response,
+    limit: int = Query(100, gt=0, le=500),
+    cursor: Optional[str] = None,
+    currency: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of financial goals by category with optional currency conversion
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        goals = await GoalService.get_by_category(category, target_currency=currency)
+        goals, next_cursor = await GoalService.get_page(
+            current_user["uid"], limit=limit, cursor=cursor, category=category, target_currency=currency
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return goals
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve goals by category: {str(e)}") 
\ No newline at end of file
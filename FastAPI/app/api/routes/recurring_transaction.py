@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Query, Response
+from typing import List, Dict, Any, Optional
 
 from app.models.recurring_transaction import RecurringTransactionBase, RecurringTransactionModel
 from app.services.recurring_transaction_service import RecurringTransactionService
+from app.core.auth import get_current_user
+from app.core.versioning import conditional_get
 from app.utils.formatting import format_category
+from app.utils.pagination import InvalidCursorError, NEXT_CURSOR_HEADER
 
 router = APIRouter(
     prefix="/recurring-transactions",
@@ -11,7 +14,7 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=RecurringTransactionModel)
-async def create_recurring_transaction(transaction: RecurringTransactionBase):
+async def create_recurring_transaction(transaction: RecurringTransactionBase, current_user: dict = Depends(get_current_user)):
     """Create a new recurring transaction"""
     try:
         # Format the category before saving
@@ -22,7 +25,7 @@ async def create_recurring_transaction(transaction: RecurringTransactionBase):
         validate_frequency_params(transaction_dict)
         
         # Create recurring transaction
-        result = await RecurringTransactionService.create(transaction_dict)
+        result = await RecurringTransactionService.create(current_user["uid"], transaction_dict)
         return result
     except HTTPException:
         raise
@@ -30,22 +33,35 @@ async def create_recurring_transaction(transaction: RecurringTransactionBase):
         print(f"Error creating recurring transaction: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create recurring transaction: {str(e)}")
 
-@router.get("/", response_model=List[RecurringTransactionModel])
-async def get_all_recurring_transactions():
-    """Get all recurring transactions"""
+@router.get("/", response_model=List[RecurringTransactionModel], dependencies=[Depends(conditional_get("recurring_transactions"))])
+async def get_all_recurring_transactions(
+    response: Response,
+    limit: int = Query(100, gt=0, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of recurring transactions
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     try:
-        transactions = await RecurringTransactionService.get_all()
+        transactions, next_cursor = await RecurringTransactionService.get_page(current_user["uid"], limit=limit, cursor=cursor)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         return transactions
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        # Fail rather than return an empty list, which would carry the list's ETag
+        # and be revalidated with 304 until the recurring transactions next change
         print(f"Error getting recurring transactions: {e}")
-        # Return empty list on error
-        return []
+        raise HTTPException(status_code=500, detail=f"Failed to get recurring transactions: {str(e)}")
 
 @router.get("/{transaction_id}", response_model=RecurringTransactionModel)
-async def get_recurring_transaction(transaction_id: str):
+async def get_recurring_transaction(transaction_id: str, current_user: dict = Depends(get_current_user)):
     """Get a recurring transaction by ID"""
     try:
-        transaction = await RecurringTransactionService.get_by_id(transaction_id)
+        transaction = await RecurringTransactionService.get_by_id(current_user["uid"], transaction_id)
         if not transaction:
             raise HTTPException(status_code=404, detail=f"Recurring transaction with ID {transaction_id} not found")
         return transaction
@@ -56,11 +72,11 @@ async def get_recurring_transaction(transaction_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get recurring transaction: {str(e)}")
 
 @router.put("/{transaction_id}", response_model=RecurringTransactionModel)
-async def update_recurring_transaction(transaction_id: str, transaction_update: RecurringTransactionBase):
+async def update_recurring_transaction(transaction_id: str, transaction_update: RecurringTransactionBase, current_user: dict = Depends(get_current_user)):
     """Update a recurring transaction"""
     try:
         # Check if transaction exists
-        existing_transaction = await RecurringTransactionService.get_by_id(transaction_id)
+        existing_transaction = await RecurringTransactionService.get_by_id(current_user["uid"], transaction_id)
         if not existing_transaction:
             raise HTTPException(status_code=404, detail=f"Recurring transaction with ID {transaction_id} not found")
         
@@ -72,7 +88,7 @@ async def update_recurring_transaction(transaction_id: str, transaction_update:
         validate_frequency_params(transaction_dict)
         
         # Update recurring transaction
-        result = await RecurringTransactionService.update(transaction_id, transaction_dict)
+        result = await RecurringTransactionService.update(current_user["uid"], transaction_id, transaction_dict)
         return result
     except HTTPException:
         raise
@@ -81,16 +97,16 @@ async def update_recurring_transaction(transaction_id: str, transaction_update:
         raise HTTPException(status_code=500, detail=f"Failed to update recurring transaction: {str(e)}")
 
 @router.delete("/{transaction_id}", response_model=dict)
-async def delete_recurring_transaction(transaction_id: str):
+async def delete_recurring_transaction(transaction_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a recurring transaction"""
     try:
         # Check if transaction exists
-        existing_transaction = await RecurringTransactionService.get_by_id(transaction_id)
+        existing_transaction = await RecurringTransactionService.get_by_id(current_user["uid"], transaction_id)
         if not existing_transaction:
             raise HTTPException(status_code=404, detail=f"Recurring transaction with ID {transaction_id} not found")
         
         # Delete recurring transaction
-        result = await RecurringTransactionService.delete(transaction_id)
+        result = await RecurringTransactionService.delete(current_user["uid"], transaction_id)
         return {"success": result, "message": "Recurring transaction deleted successfully"}
     except HTTPException:
         raise
@@ -99,21 +115,21 @@ async def delete_recurring_transaction(transaction_id: str):
         return {"success": False, "message": f"Error deleting recurring transaction: {str(e)}"}
 
 @router.post("/generate", response_model=Dict[str, Any])
-async def generate_transactions(background_tasks: BackgroundTasks):
-    """Generate transactions from recurring transactions"""
+async def generate_transactions(background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
+    """Generate the current user's transactions from their recurring transactions"""
     try:
         # Run the generation process in the background
-        background_tasks.add_task(RecurringTransactionService.generate_transactions)
+        background_tasks.add_task(RecurringTransactionService.generate_transactions, current_user["uid"])
         return {"status": "success", "message": "Transaction generation started in the background"}
     except Exception as e:
         print(f"Error starting transaction generation: {e}")
         return {"status": "error", "message": f"Failed to start transaction generation: {str(e)}"}
 
 @router.post("/generate-now", response_model=Dict[str, Any])
-async def generate_transactions_now():
-    """Generate transactions from recurring transactions immediately"""
+async def generate_transactions_now(current_user: dict = Depends(get_current_user)):
+    """Generate the current user's transactions from their recurring transactions immediately"""
     try:
-        result = await RecurringTransactionService.generate_transactions()
+        result = await RecurringTransactionService.generate_transactions(current_user["uid"])
         return result
     except Exception as e:
         print(f"Error generating transactions: {e}")
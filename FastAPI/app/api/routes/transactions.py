@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional, Dict, Any
 from app.models.transaction import TransactionBase, TransactionModel
 from app.services.transaction_service import TransactionService
 from app.services.currency_service import CurrencyService
+from app.core.auth import get_current_user
+from app.core.versioning import conditional_get
 from app.utils.formatting import format_category
+from app.utils.pagination import InvalidCursorError, NEXT_CURSOR_HEADER
 
 router = APIRouter(
     prefix="/transactions",
@@ -11,51 +15,109 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=TransactionModel)
-async def create_transaction(transaction: TransactionBase):
+async def create_transaction(transaction: TransactionBase, current_user: dict = Depends(get_current_user)):
     # Format the category before saving
     transaction_dict = transaction.model_dump()
     transaction_dict["category"] = format_category(transaction_dict["category"])
     
     # Create transaction in Firebase
-    created_transaction = await TransactionService.create(transaction_dict)
+    created_transaction = await TransactionService.create(current_user["uid"], transaction_dict)
     return created_transaction
 
 
-@router.get("/", response_model=List[TransactionModel])
-async def get_transactions(skip: int = 0, limit: int = 100, currency: str = None):
-    """Get all transactions with optional currency conversion"""
-    transactions = await TransactionService.get_all(limit=limit, target_currency=currency)
+@router.get("/", response_model=List[TransactionModel], dependencies=[Depends(conditional_get("transactions", "exchange_rates"))])
+async def get_transactions(
+    response: Response,
+    limit: int = Query(100, gt=0, le=500),
+    cursor: Optional[str] = None,
+    currency: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of transactions, newest first, with optional currency conversion
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    try:
+        transactions, next_cursor = await TransactionService.get_page(
+            current_user["uid"], limit=limit, cursor=cursor, target_currency=currency
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return transactions
 
+@router.post("/bulk", response_model=Dict[str, Any])
+async def bulk_import_transactions(file: UploadFile = File(...), format: Optional[Literal["ndjson", "csv"]] = None, current_user: dict = Depends(get_current_user)):
+    """Import transactions from an NDJSON or CSV upload
+    
+    The format is taken from the file extension when not given. Invalid rows
+    are skipped and reported with their row numbers.
+    """
+    import_format = format
+    if import_format is None:
+        import_format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+    
+    return await TransactionService.bulk_import(current_user["uid"], file.file, import_format)
+
+@router.get("/export")
+async def export_transactions(format: Literal["ndjson", "csv"] = "ndjson", currency: str = None, current_user: dict = Depends(get_current_user)):
+    """Stream every transaction as NDJSON or CSV with optional currency conversion"""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        TransactionService.export(current_user["uid"], format, target_currency=currency),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=transactions.{format}"}
+    )
+
 @router.get("/{transaction_id}", response_model=TransactionModel)
-async def get_transaction(transaction_id: str, currency: str = None):
+async def get_transaction(transaction_id: str, currency: str = None, current_user: dict = Depends(get_current_user)):
     """Get a transaction by ID with optional currency conversion"""
-    transaction = await TransactionService.get_by_id(transaction_id, target_currency=currency)
+    transaction = await TransactionService.get_by_id(current_user["uid"], transaction_id, target_currency=currency)
     if transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return transaction
 
 @router.put("/{transaction_id}", response_model=TransactionModel)
-async def update_transaction(transaction_id: str, transaction: TransactionBase):
+async def update_transaction(transaction_id: str, transaction: TransactionBase, current_user: dict = Depends(get_current_user)):
     # Format the category before saving
     transaction_dict = transaction.model_dump()
     transaction_dict["category"] = format_category(transaction_dict["category"])
     
-    updated_transaction = await TransactionService.update(transaction_id, transaction_dict)
+    updated_transaction = await TransactionService.update(current_user["uid"], transaction_id, transaction_dict)
     if updated_transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return updated_transaction
 
 @router.delete("/{transaction_id}")
-async def delete_transaction(transaction_id: str):
-    success = await TransactionService.delete(transaction_id)
+async def delete_transaction(transaction_id: str, current_user: dict = Depends(get_current_user)):
+    success = await TransactionService.delete(current_user["uid"], transaction_id)
     if not success:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return {"detail": "Transaction deleted successfully"}
 
 @router.get("/category/{category}", response_model=List[TransactionModel])
-async def get_transactions_by_category(category: str, currency: str = None):
-    """Get transactions by category with optional currency conversion"""
+async def get_transactions_by_category(
+    category: str,
+    response: Response,
+    limit: int = Query(100, gt=0, le=500),
+    cursor: Optional[str] = None,
+    currency: str = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of transactions in a category with optional currency conversion
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
     formatted_category = format_category(category)
-    transactions = await TransactionService.get_by_category(formatted_category, target_currency=currency)
+    try:
+        transactions, next_cursor = await TransactionService.get_page(
+            current_user["uid"], limit=limit, cursor=cursor, category=formatted_category, target_currency=currency
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return transactions 
\ No newline at end of file
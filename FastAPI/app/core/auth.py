@@ -1,43 +1,275 @@
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
 import firebase_admin
+import httpx
 from firebase_admin import auth
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from google.auth import crypt
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, Optional
+from app.core.config import (
+    TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, TOKEN_VERIFIER, AUTH_KEYSET_FILE, AUTH_PROJECT_ID
+)
+from app.utils.cache import TTLCache, MISSING
 
 # Initialize HTTP Bearer scheme for token authentication
 security = HTTPBearer()
 
+# Google's x509 certificates for the keys that sign Firebase ID tokens, keyed by key ID
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+# Seconds before the key set's max-age runs out that the background refresh starts
+KEYSET_REFRESH_MARGIN = 300
+# Minimum seconds between refreshes, including on-demand ones for unknown key IDs
+KEYSET_MIN_REFRESH_INTERVAL = 60
+
+class FirebaseTokenVerifier:
+    """Verifies ID tokens with the Firebase Admin SDK, which fetches certificates on demand"""
+    
+    async def start(self) -> None:
+        pass
+    
+    async def stop(self) -> None:
+        pass
+    
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Return the decoded claims of a valid token"""
+        # Signature checks and certificate fetches block, so keep them off the event loop
+        return await run_in_threadpool(auth.verify_id_token, token)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {"verifier": "firebase"}
+
+class KeySetTokenVerifier:
+    """Verifies ID tokens in-process against a preloaded signing key set
+    
+    The keys come from Google's certificate endpoint and are refreshed in the
+    background before their Cache-Control max-age runs out, so verification is a
+    local RS256 signature check plus claim checks with no network call. A token
+    signed with an unknown key ID triggers an immediate, rate-limited refresh to
+    pick up rotated keys. With a keyset_file the keys are read once from disk and
+    never fetched.
+    """
+    
+    def __init__(self, project_id: str, certs_url: str = FIREBASE_CERTS_URL, keyset_file: Optional[str] = None):
+        if not project_id:
+            raise ValueError("Keyset token verification needs AUTH_PROJECT_ID or FIREBASE_PROJECT_ID")
+        
+        self.project_id = project_id
+        self.issuer = f"https://securetoken.google.com/{project_id}"
+        self.certs_url = certs_url
+        self.keyset_file = keyset_file
+        self._verifiers: Dict[str, crypt.RSAVerifier] = {}
+        self._expires_at = 0.0
+        self._attempted_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._refreshes = 0
+        self._refresh_failures = 0
+    
+    async def start(self) -> None:
+        """Load the key set and, unless it came from a file, keep it refreshed in the background"""
+        try:
+            await self.refresh()
+        finally:
+            # Start refreshing even if the first load failed, so the keys arrive later
+            if self.keyset_file is None and (self._task is None or self._task.done()):
+                self._task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self) -> None:
+        """Cancel the background refresh"""
+        if self._task is None:
+            return
+        
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def refresh(self) -> None:
+        """Replace the key set with the current certificates, or the keyset file's keys"""
+        async with self._refresh_lock:
+            await self._load()
+    
+    async def _load(self) -> None:
+        """Fetch or read the keys; callers hold the refresh lock"""
+        self._attempted_at = time.time()
+        if self.keyset_file is not None:
+            with open(self.keyset_file) as f:
+                keys = json.load(f)
+            max_age = float('inf')
+        else:
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.get(self.certs_url)
+                response.raise_for_status()
+            keys = response.json()
+            match = re.search(r'max-age=(\d+)', response.headers.get('cache-control', ''))
+            max_age = int(match.group(1)) if match else 3600
+        
+        # Parse every key once here rather than on each verification
+        self._verifiers = {kid: crypt.RSAVerifier.from_string(key) for kid, key in keys.items()}
+        self._expires_at = time.time() + max_age
+        self._refreshes += 1
+    
+    async def _refresh_loop(self) -> None:
+        """Refresh the key set shortly before it expires, retrying failures"""
+        while True:
+            delay = max(self._expires_at - time.time() - KEYSET_REFRESH_MARGIN, KEYSET_MIN_REFRESH_INTERVAL)
+            await asyncio.sleep(delay)
+            
+            try:
+                await self.refresh()
+            except Exception as e:
+                # Keep serving with the current keys; they outlive max-age by hours
+                self._refresh_failures += 1
+                print(f"Error refreshing token signing keys: {e}")
+    
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Return the decoded claims of a valid token
+        
+        Raises ValueError for malformed, badly signed, expired or foreign tokens.
+        """
+        try:
+            header_segment, payload_segment, signature_segment = token.split('.')
+            header = json.loads(_b64decode(header_segment))
+            claims = json.loads(_b64decode(payload_segment))
+            signature = _b64decode(signature_segment)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Malformed token: {e}")
+        
+        if header.get('alg') != 'RS256':
+            raise ValueError(f"Unexpected signing algorithm '{header.get('alg')}'")
+        
+        kid = header.get('kid')
+        if kid not in self._verifiers:
+            async with self._refresh_lock:
+                # Another request may have refreshed while this one waited
+                if kid not in self._verifiers and self._may_refresh():
+                    await self._load()
+        verifier = self._verifiers.get(kid)
+        if verifier is None:
+            raise ValueError(f"Token signed with unknown key '{kid}'")
+        
+        if not verifier.verify(f"{header_segment}.{payload_segment}".encode(), signature):
+            raise ValueError("Invalid token signature")
+        
+        now = time.time()
+        if claims.get('aud') != self.project_id:
+            raise ValueError(f"Token audience '{claims.get('aud')}' is not project '{self.project_id}'")
+        if claims.get('iss') != self.issuer:
+            raise ValueError(f"Token issuer '{claims.get('iss')}' is not '{self.issuer}'")
+        if not isinstance(claims.get('sub'), str) or not 0 < len(claims['sub']) <= 128:
+            raise ValueError("Token has an invalid subject")
+        if not isinstance(claims.get('exp'), (int, float)) or claims['exp'] <= now:
+            raise ValueError("Token has expired")
+        if claims.get('iat', now) > now or claims.get('auth_time', now) > now:
+            raise ValueError("Token was issued in the future")
+        
+        claims['uid'] = claims['sub']
+        return claims
+    
+    def _may_refresh(self) -> bool:
+        """Whether an unknown key ID may trigger a refresh now"""
+        return self._attempted_at is None or (
+            self.keyset_file is None and time.time() - self._attempted_at >= KEYSET_MIN_REFRESH_INTERVAL
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "verifier": "keyset",
+            "source": self.keyset_file or self.certs_url,
+            "keys": len(self._verifiers),
+            "refreshes": self._refreshes,
+            "refresh_failures": self._refresh_failures,
+            "expires_in_seconds": self._expires_at - time.time() if self._expires_at != float('inf') else None
+        }
+
+def _b64decode(segment: str) -> bytes:
+    """Decode an unpadded base64url JWT segment"""
+    return base64.urlsafe_b64decode(segment + '=' * (-len(segment) % 4))
+
+def create_token_verifier():
+    """Build the verifier selected by TOKEN_VERIFIER"""
+    if TOKEN_VERIFIER == 'keyset':
+        return KeySetTokenVerifier(AUTH_PROJECT_ID, keyset_file=AUTH_KEYSET_FILE)
+    if TOKEN_VERIFIER != 'firebase':
+        raise ValueError(f"Unknown TOKEN_VERIFIER '{TOKEN_VERIFIER}'")
+    return FirebaseTokenVerifier()
+
 class AuthService:
     """Service for handling authentication via Firebase"""
     
+    # User claims of verified tokens, keyed by the token's SHA-256 digest
+    _token_cache = TTLCache(ttl=TOKEN_CACHE_TTL, maxsize=TOKEN_CACHE_SIZE)
+    
+    # Verifications in progress, so concurrent requests with one token verify it once
+    _pending: Dict[bytes, asyncio.Task] = {}
+    
+    # Pluggable token verifier (FirebaseTokenVerifier or KeySetTokenVerifier)
+    _verifier = None
+    
+    @staticmethod
+    def get_verifier():
+        """Return the token verifier, creating the configured one on first use"""
+        if AuthService._verifier is None:
+            AuthService._verifier = create_token_verifier()
+        return AuthService._verifier
+    
+    @staticmethod
+    def set_verifier(verifier) -> None:
+        """Replace the token verifier and drop claims cached by the previous one"""
+        AuthService._verifier = verifier
+        AuthService._token_cache.clear()
+    
+    @staticmethod
+    async def start() -> None:
+        """Preload the verifier's signing keys; call on startup"""
+        await AuthService.get_verifier().start()
+    
+    @staticmethod
+    async def stop() -> None:
+        """Stop the verifier's background work; call on shutdown"""
+        if AuthService._verifier is not None:
+            await AuthService._verifier.stop()
+    
     @staticmethod
     async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
         """
         Verify Firebase JWT token and extract user information
         
+        Verified claims are cached until the token expires, so repeat requests with
+        the same token skip signature verification.
+        
         Args:
             credentials: HTTP Authorization header containing the Firebase JWT token
-            
+        
         Returns:
             dict: User claims from the verified token
-            
+        
         Raises:
             HTTPException: If token is invalid, expired, or missing
         """
         token = credentials.credentials
+        key = hashlib.sha256(token.encode()).digest()
+        
+        user = AuthService._token_cache.get(key)
+        if user is not MISSING:
+            return dict(user)
         
         try:
-            # Verify the token with Firebase Admin SDK
-            decoded_token = auth.verify_id_token(token)
-            
-            # Return the user claims
-            return {
-                "uid": decoded_token["uid"],
-                "email": decoded_token.get("email"),
-                "email_verified": decoded_token.get("email_verified", False),
-                "name": decoded_token.get("name"),
-                "picture": decoded_token.get("picture")
-            }
+            task = AuthService._pending.get(key)
+            if task is None:
+                task = asyncio.ensure_future(AuthService._verify(key, token))
+                AuthService._pending[key] = task
+                task.add_done_callback(lambda _: AuthService._pending.pop(key, None))
+            return dict(await asyncio.shield(task))
         except Exception as e:
             # Raise 401 Unauthorized for any auth-related error
             raise HTTPException(
@@ -45,6 +277,31 @@ class AuthService:
                 detail=f"Invalid authentication credentials: {str(e)}",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+    
+    @staticmethod
+    async def _verify(key: bytes, token: str) -> Dict[str, Any]:
+        """Verify a token and cache its user claims until the token expires"""
+        decoded_token = await AuthService.get_verifier().verify(token)
+        
+        user = {
+            "uid": decoded_token["uid"],
+            "email": decoded_token.get("email"),
+            "email_verified": decoded_token.get("email_verified", False),
+            "name": decoded_token.get("name"),
+            "picture": decoded_token.get("picture")
+        }
+        AuthService._token_cache.set(key, user, min(decoded_token["exp"] - time.time(), TOKEN_CACHE_TTL))
+        return user
+    
+    @staticmethod
+    def get_token_cache_stats() -> Dict[str, Any]:
+        """Get size and hit/miss counters for the verified-token cache"""
+        return AuthService._token_cache.stats()
+    
+    @staticmethod
+    def get_verifier_stats() -> Dict[str, Any]:
+        """Get the token verifier's kind and key set state"""
+        return AuthService.get_verifier().stats()
 
 # Dependency to get current authenticated user
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
@@ -53,7 +310,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     
     Args:
         credentials: HTTP Authorization header containing the Firebase JWT token
-        
+    
     Returns:
         dict: User claims from the verified token
     """
@@ -66,13 +323,13 @@ async def get_optional_user(credentials: Optional[HTTPAuthorizationCredentials]
     
     Args:
         credentials: HTTP Authorization header containing the Firebase JWT token, if any
-        
+    
     Returns:
         Optional[dict]: User claims if authenticated, None otherwise
     """
     if not credentials:
         return None
-        
+    
     try:
         return await AuthService.verify_token(credentials)
     except HTTPException:
@@ -99,4 +99,84 @@ CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
 
 # App Settings
 PORT = int(os.getenv("PORT", 8000))
-DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t") 
\ No newline at end of file
+DEBUG = os.getenv("DEBUG", "False").lower() in ("true", "1", "t") 
+
+# Firestore Settings
+# Size of the thread pool that runs blocking Firestore calls off the event loop
+FIRESTORE_MAX_WORKERS = int(os.getenv("FIRESTORE_MAX_WORKERS", 32))
+# Number of write batches a bulk import commits concurrently
+BULK_IMPORT_CONCURRENCY = int(os.getenv("BULK_IMPORT_CONCURRENCY", 8))
+# Number of recurring rules generated concurrently
+RECURRING_GENERATION_CONCURRENCY = int(os.getenv("RECURRING_GENERATION_CONCURRENCY", 16))
+
+# Cache Settings
+# Seconds an exchange-rate table stays cached per base currency (0 disables the cache)
+EXCHANGE_RATE_CACHE_TTL = int(os.getenv("EXCHANGE_RATE_CACHE_TTL", 300))
+# Most base currencies whose rate tables are cached per worker
+EXCHANGE_RATE_CACHE_SIZE = int(os.getenv("EXCHANGE_RATE_CACHE_SIZE", 256))
+# Upper bound in seconds on how long the currency catalogue is cached; changes made
+# through any worker invalidate it sooner via the 'currencies' collection version
+CURRENCY_CACHE_TTL = int(os.getenv("CURRENCY_CACHE_TTL", 3600))
+# Seconds between checks of the 'currencies' version for other workers' catalogue changes
+CURRENCY_VERSION_CHECK_INTERVAL = float(os.getenv("CURRENCY_VERSION_CHECK_INTERVAL", 60))
+# Keep columnar in-memory copies of users' transactions for analytics and budget status
+COLUMNAR_CACHE_ENABLED = os.getenv("COLUMNAR_CACHE_ENABLED", "False").lower() in ("true", "1", "t")
+# Seconds before the columnar copy is reloaded to pick up other workers' writes
+COLUMNAR_CACHE_TTL = int(os.getenv("COLUMNAR_CACHE_TTL", 300))
+# Most users whose columnar copies are kept per worker; the least recently used are dropped
+COLUMNAR_CACHE_MAX_USERS = int(os.getenv("COLUMNAR_CACHE_MAX_USERS", 1000))
+# Upper bound in seconds on how long a forecast's starting balance is cached when neither
+# aggregates nor the columnar cache are on; writes invalidate it via the 'transactions' version
+BALANCE_CACHE_TTL = int(os.getenv("BALANCE_CACHE_TTL", 3600))
+# Most users whose starting balances are cached per worker
+BALANCE_CACHE_SIZE = int(os.getenv("BALANCE_CACHE_SIZE", 10000))
+# Seconds a collection version behind list ETags is cached before re-reading it,
+# which bounds how long other workers' writes can go unnoticed (0 reads it every request)
+COLLECTION_VERSION_TTL = float(os.getenv("COLLECTION_VERSION_TTL", 2))
+# Maximum number of (user, collection) versions cached per worker
+COLLECTION_VERSION_CACHE_SIZE = int(os.getenv("COLLECTION_VERSION_CACHE_SIZE", 50000))
+# Seconds that contributions to sharded goals are coalesced into one bump of the goals
+# version, which would otherwise be written on every contribution
+SHARDED_GOAL_VERSION_DELAY = float(os.getenv("SHARDED_GOAL_VERSION_DELAY", 1))
+# Maximum number of verified Firebase ID tokens cached per worker
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+# Upper bound in seconds on how long verified claims are cached; entries also
+# expire at the token's own exp (0 verifies every request)
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 3600))
+# Maximum number of user profiles cached per worker for /auth/me
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", 10000))
+# Seconds a user profile stays cached; this worker's own updates invalidate it
+# immediately, other workers' show up once it expires (0 reads it every request)
+PROFILE_CACHE_TTL = int(os.getenv("PROFILE_CACHE_TTL", 30))
+
+# Aggregate Settings
+# Serve budget status from the spending_aggregates collection instead of summing transactions.
+# Enable once rebuild_aggregates.py has backfilled the collection.
+SPENDING_AGGREGATES_ENABLED = os.getenv("SPENDING_AGGREGATES_ENABLED", "False").lower() in ("true", "1", "t")
+
+# Migration Settings
+# Currency assumed for legacy documents saved without one, and for new ones when no
+# default currency is configured
+DEFAULT_CURRENCY_CODE = os.getenv("DEFAULT_CURRENCY_CODE", "USD")
+# Skip the per-document currency backfill on reads. Enable once backfill_currency.py
+# has reported that every transaction and goal has a currency.
+CURRENCY_BACKFILL_COMPLETE = os.getenv("CURRENCY_BACKFILL_COMPLETE", "False").lower() in ("true", "1", "t")
+
+
+# Scheduler Settings
+# Run recurring transaction generation in-process on a cron schedule (off unless enabled)
+RECURRING_SCHEDULER_ENABLED = os.getenv("RECURRING_SCHEDULER_ENABLED", "False").lower() in ("true", "1", "t")
+# Five-field cron expression (minute hour day-of-month month day-of-week), local time
+RECURRING_GENERATION_SCHEDULE = os.getenv("RECURRING_GENERATION_SCHEDULE", "5 0 * * *")
+# Seconds a worker holds the generation lease before another worker may take over
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", 900))
+
+# Auth Settings
+# How Firebase ID tokens are verified: 'firebase' calls the Admin SDK, 'keyset' verifies
+# in-process against a preloaded signing key set refreshed in the background
+TOKEN_VERIFIER = os.getenv("TOKEN_VERIFIER", "firebase").lower()
+# JSON file mapping key IDs to PEM certificates or public keys; when set, the keyset
+# verifier uses only these keys and never fetches Google's (for offline load tests)
+AUTH_KEYSET_FILE = os.getenv("AUTH_KEYSET_FILE")
+# Project ID that tokens must be issued for (the 'aud' claim)
+AUTH_PROJECT_ID = os.getenv("AUTH_PROJECT_ID") or os.getenv("FIREBASE_PROJECT_ID") or getattr(app, "project_id", None)
@@ -0,0 +1,189 @@
+import asyncio
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from firebase_admin import firestore
+from google.api_core import exceptions as api_exceptions
+from app.core.config import db, FIRESTORE_MAX_WORKERS
+from app.utils.pagination import encode_cursor, decode_cursor, InvalidCursorError
+
+# Firestore rejects batches and transactions with more writes than this
+BATCH_SIZE = 500
+
+# Field path of the document ID (FieldPath.document_id()). As the last sort key
+# it keeps an order stable without a composite index, since Firestore's
+# single-field indexes already end in it.
+DOCUMENT_ID = '__name__'
+
+# Bounded pool for the synchronous firebase_admin client. Running every
+# round-trip here keeps a slow Firestore call from stalling the event loop.
+_executor = ThreadPoolExecutor(max_workers=FIRESTORE_MAX_WORKERS, thread_name_prefix="firestore")
+
+async def run(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking Firestore call in the thread pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+async def get(doc_ref) -> Optional[Dict[str, Any]]:
+    """Fetch a single document, returning its data or None if it doesn't exist"""
+    doc = await run(doc_ref.get)
+    if doc is not None and doc.exists:
+        return doc.to_dict()
+    return None
+
+async def get_many(doc_refs: Sequence[Any]) -> List[Optional[Dict[str, Any]]]:
+    """Fetch several documents in one round-trip, returning their data or None, in doc_refs order"""
+    def _collect():
+        found = {doc.reference.path: doc.to_dict() for doc in db.get_all(doc_refs) if doc.exists}
+        return [found.get(doc_ref.path) for doc_ref in doc_refs]
+    
+    return await run(_collect)
+
+async def stream(query) -> List[Dict[str, Any]]:
+    """Run a query and return the data of every matching document"""
+    def _collect():
+        return [doc.to_dict() for doc in query.stream()]
+    
+    return await run(_collect)
+
+async def iter_chunks(query, chunk_size: int = BATCH_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Stream a query's results in chunks, holding only one chunk in memory at a time
+    
+    A single server-side stream is opened and each chunk is pulled from it in
+    the thread pool, so the event loop never blocks on the next page of results.
+    """
+    docs = query.stream()
+    
+    def _next_chunk():
+        return [doc.to_dict() for doc in itertools.islice(docs, chunk_size)]
+    
+    while True:
+        chunk = await run(_next_chunk)
+        if not chunk:
+            return
+        yield chunk
+
+async def first(query) -> Optional[Dict[str, Any]]:
+    """Run a query and return the data of the first matching document, if any"""
+    def _first():
+        for doc in query.limit(1).stream():
+            return doc.to_dict()
+        return None
+    
+    return await run(_first)
+
+async def paginate(
+    query,
+    order_fields: Sequence[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    descending: bool = False
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page of a query using keyset pagination
+    
+    Results are ordered by order_fields, which must end in DOCUMENT_ID so the order
+    is stable; its cursor value is taken from each document's 'id'. The page after
+    cursor starts with Firestore's start_after, so every page costs limit + 1 reads
+    regardless of how deep it is. Returns the page and the cursor for the next one,
+    or None on the last page.
+    """
+    direction = firestore.Query.DESCENDING if descending else firestore.Query.ASCENDING
+    for field in order_fields:
+        query = query.order_by(field, direction=direction)
+    
+    if cursor:
+        query = query.start_after(dict(zip(order_fields, _cursor_values(cursor, order_fields))))
+    
+    # Read one extra document to find out whether there is a next page
+    items = await stream(query.limit(limit + 1))
+    if len(items) <= limit:
+        return items, None
+    
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor([last['id'] if field == DOCUMENT_ID else last[field] for field in order_fields])
+
+def _cursor_values(cursor: str, order_fields: Sequence[str]) -> List[Any]:
+    """Decode a paginate cursor, raising InvalidCursorError unless it fits order_fields"""
+    values = decode_cursor(cursor)
+    if len(values) != len(order_fields):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    
+    for field, value in zip(order_fields, values):
+        if field == DOCUMENT_ID:
+            # A document ID, which start_after resolves to a reference in the queried collection
+            valid = isinstance(value, str) and value != '' and '/' not in value
+        else:
+            valid = value is None or isinstance(value, (str, int, float, bool))
+        if not valid:
+            raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    
+    return values
+
+async def save(doc_ref, data: Dict[str, Any], merge: bool = False) -> None:
+    """Create or overwrite a document"""
+    await run(doc_ref.set, data, merge=merge)
+
+async def update(doc_ref, data: Dict[str, Any]) -> None:
+    """Update fields of an existing document"""
+    await run(doc_ref.update, data)
+
+async def delete(doc_ref) -> None:
+    """Delete a document"""
+    await run(doc_ref.delete)
+
+async def delete_tree(doc_ref) -> int:
+    """Delete a document and every document under its subcollections, at any depth
+    
+    Documents are deleted in batches of BATCH_SIZE, each one after its descendants,
+    so an interrupted delete never orphans anything and is finished by running it
+    again. Returns the number of documents deleted.
+    """
+    def _refs(ref):
+        # list_documents also yields missing documents that only hold subcollections
+        for collection in ref.collections():
+            for child in collection.list_documents(page_size=BATCH_SIZE):
+                yield from _refs(child)
+        yield ref
+    
+    def _delete():
+        refs = _refs(doc_ref)
+        deleted = 0
+        while True:
+            chunk = list(itertools.islice(refs, BATCH_SIZE))
+            if not chunk:
+                return deleted
+            batch = db.batch()
+            for ref in chunk:
+                batch.delete(ref)
+            batch.commit()
+            deleted += len(chunk)
+    
+    return await run(_delete)
+
+async def commit(batch) -> None:
+    """Commit a WriteBatch atomically"""
+    await run(batch.commit)
+
+async def run_transaction(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run func(transaction, *args) as a Firestore transaction, retried on contention
+    
+    func runs in the thread pool, so it must use the synchronous client: reads go
+    through the transaction and must all happen before any write it stages.
+    """
+    return await run(firestore.transactional(func), db.transaction(), *args, **kwargs)
+
+def is_contention(error: BaseException) -> bool:
+    """Whether run_transaction failed because other writers kept the documents it read busy
+    
+    Firestore aborts contended transactions; the client retries them and then raises
+    a ValueError wrapping the last Aborted error.
+    """
+    if isinstance(error, ValueError):
+        error = error.__cause__
+    return isinstance(error, api_exceptions.Aborted)
+
+def shutdown() -> None:
+    """Stop accepting new Firestore work and wait for in-flight calls"""
+    _executor.shutdown(wait=True)
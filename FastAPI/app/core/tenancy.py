@@ -0,0 +1,19 @@
+from typing import Optional
+from app.core.config import db
+
+# Each user's data lives in subcollections of their users/{uid} profile document
+users_ref = db.collection('users')
+
+# Collections stored per user as users/{uid}/<name>
+USER_COLLECTIONS = ('transactions', 'budgets', 'goals', 'recurring_transactions', 'spending_aggregates')
+
+def user_collection(uid: str, name: str):
+    """Reference to one of a user's subcollections"""
+    if not uid:
+        raise ValueError("A user ID is required to access per-user data")
+    return users_ref.document(uid).collection(name)
+
+def owner_of(doc_ref) -> Optional[str]:
+    """UID owning a document found by a collection group query, or None for a legacy top-level document"""
+    parent = doc_ref.parent.parent
+    return parent.id if parent is not None else None
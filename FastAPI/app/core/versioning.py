@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from fastapi import Depends, HTTPException, Request, Response, status
+from firebase_admin import firestore
+from app.core.config import db, COLLECTION_VERSION_TTL, COLLECTION_VERSION_CACHE_SIZE
+from app.core import repository
+from app.core.auth import get_current_user
+from app.core.tenancy import USER_COLLECTIONS, user_collection
+from app.utils.cache import TTLCache, MISSING
+
+# One document per shared collection holding a counter bumped on every write;
+# per-user collections keep theirs in users/{uid}/collection_versions
+collection_versions_ref = db.collection('collection_versions')
+
+# Versions are re-read from Firestore at most every COLLECTION_VERSION_TTL seconds;
+# this worker's own bumps invalidate its entry immediately
+_versions = TTLCache(ttl=COLLECTION_VERSION_TTL, maxsize=COLLECTION_VERSION_CACHE_SIZE)
+
+def _version_ref(collection: str, uid: Optional[str]):
+    """Version document of a shared collection, or of one user's collection when uid is given"""
+    if uid is None:
+        return collection_versions_ref.document(collection)
+    return user_collection(uid, 'collection_versions').document(collection)
+
+async def get_version(collection: str, uid: Optional[str] = None) -> int:
+    """Return the current version counter of a collection, per user when uid is given"""
+    version = _versions.get((uid, collection))
+    if version is MISSING:
+        doc = await repository.get(_version_ref(collection, uid))
+        version = doc.get('version', 0) if doc else 0
+        _versions.set((uid, collection), version)
+    return version
+
+async def bump(*collections: str, uid: Optional[str] = None) -> None:
+    """Record that collections changed so their cached list responses are revalidated
+    
+    Pass the owner's uid for per-user collections. Call it after the write commits.
+    A failed bump is logged rather than raised, since the write itself already succeeded.
+    """
+    for collection in collections:
+        try:
+            await repository.save(_version_ref(collection, uid), {
+                'version': firestore.Increment(1),
+                'updated_at': datetime.now().isoformat()
+            }, merge=True)
+        except Exception as e:
+            print(f"Error bumping version of {collection}: {e}")
+        finally:
+            _versions.invalidate((uid, collection))
+
+# Bumps scheduled by bump_later that haven't run yet, by (uid, collections)
+_pending_bumps: Dict[Tuple[Optional[str], Tuple[str, ...]], asyncio.Task] = {}
+
+def bump_later(*collections: str, uid: Optional[str] = None, delay: float) -> None:
+    """Schedule one bump of collections delay seconds from now, coalescing the calls made meanwhile
+    
+    For write paths too hot to bump a version document on every write: each worker
+    then writes it at most once per delay, and every write is still followed by a bump.
+    """
+    key = (uid, collections)
+    if key in _pending_bumps:
+        return
+    
+    async def _bump_after_delay():
+        await asyncio.sleep(delay)
+        # Writes from here on schedule the next bump
+        _pending_bumps.pop(key, None)
+        await bump(*collections, uid=uid)
+    
+    _pending_bumps[key] = asyncio.create_task(_bump_after_delay())
+
+async def flush_pending_bumps() -> None:
+    """Run every scheduled bump now, so a stopping worker doesn't leave versions behind its writes"""
+    pending = list(_pending_bumps.items())
+    _pending_bumps.clear()
+    for (uid, collections), task in pending:
+        task.cancel()
+        await bump(*collections, uid=uid)
+
+def get_version_cache_stats() -> dict:
+    """Return hit/miss counters for the collection version cache"""
+    return _versions.stats()
+
+def conditional_get(*collections: str) -> Callable:
+    """Build a dependency that answers If-None-Match with 304 Not Modified
+    
+    The ETag combines the versions of collections with the caller's uid and the
+    request path and query, so each user, page and currency of a list gets its own
+    tag. Per-user collections use the caller's own versions and require an
+    authenticated caller; lists of shared collections only stay public. A matching
+    request is answered before the endpoint runs, without querying the collections.
+    The tag is set on the injected response, so endpoints must raise rather than
+    return a fallback body on errors, or clients would revalidate the fallback.
+    """
+    async def check(request: Request, response: Response, uid: Optional[str]) -> None:
+        versions = await asyncio.gather(*(
+            get_version(collection, uid if collection in USER_COLLECTIONS else None)
+            for collection in collections
+        ))
+        
+        fingerprint = (uid or '') + ':' + ':'.join(f"{c}={v}" for c, v in zip(collections, versions))
+        digest = hashlib.sha1(f"{fingerprint}|{request.url.path}?{request.url.query}".encode()).hexdigest()
+        etag = f'W/"{digest[:20]}"'
+        
+        # Browsers then revalidate every poll instead of reusing a stale copy
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in _parse_if_none_match(request.headers.get('if-none-match', '')):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        response.headers.update(headers)
+    
+    if not any(collection in USER_COLLECTIONS for collection in collections):
+        async def public_dependency(request: Request, response: Response) -> None:
+            await check(request, response, None)
+        return public_dependency
+    
+    async def dependency(request: Request, response: Response, current_user: dict = Depends(get_current_user)) -> None:
+        await check(request, response, current_user["uid"])
+    
+    return dependency
+
+def _parse_if_none_match(header: str) -> List[str]:
+    """Split an If-None-Match header into its entity tags"""
+    tags = [tag.strip() for tag in header.split(',') if tag.strip()]
+    # Weak comparison: W/"x" and "x" match
+    return tags + [f'W/{tag}' for tag in tags if not tag.startswith('W/')]
@@ -1,13 +1,20 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import CORS_ORIGINS
+from app.core.config import CORS_ORIGINS, RECURRING_SCHEDULER_ENABLED
 from app.api.routes.transactions import router as transactions_router
 from app.api.routes.budget import router as budget_router
 from app.api.routes.recurring_transaction import router as recurring_transaction_router
 from app.api.routes.currency import router as currency_router
 from app.api.routes.goals import goals_router
 from app.api.routes.auth import auth_router
+from app.api.routes.forecast import router as forecast_router
+from app.api.routes.analytics import router as analytics_router
 from app.services.currency_service import CurrencyService
+from app.services.scheduler_service import SchedulerService
+from app.services.snapshot_service import TransactionSnapshotService
+from app.services.user_service import UserService
+from app.core import repository, versioning
+from app.core.auth import AuthService
 
 def create_app() -> FastAPI:
     """
@@ -32,12 +39,28 @@ def create_app() -> FastAPI:
     app.include_router(currency_router, prefix="/api")
     app.include_router(goals_router, prefix="/api")
     app.include_router(auth_router, prefix="/api")
+    app.include_router(forecast_router, prefix="/api")
+    app.include_router(analytics_router, prefix="/api")
     
     @app.get("/health")
     def health_check():
         """Health check endpoint"""
         return {"status": "ok"}
     
+    @app.get("/metrics")
+    def metrics():
+        """In-process cache and worker metrics"""
+        return {
+            "exchange_rate_cache": CurrencyService.get_rate_cache_stats(),
+            "currency_catalogue_cache": CurrencyService.get_catalogue_cache_stats(),
+            "collection_version_cache": versioning.get_version_cache_stats(),
+            "recurring_scheduler": SchedulerService.get_stats(),
+            "transaction_snapshot": TransactionSnapshotService.get_stats(),
+            "token_cache": AuthService.get_token_cache_stats(),
+            "token_verifier": AuthService.get_verifier_stats(),
+            "profile_cache": UserService.get_profile_cache_stats()
+        }
+    
     @app.on_event("startup")
     async def startup_event():
         """Initialize default currencies and exchange rates on startup"""
@@ -48,6 +71,24 @@ def create_app() -> FastAPI:
             print(f"Error initializing currency service: {e}")
             print("API will continue to work, but currency service might be limited")
             # Allow the app to continue even if currency initialization fails
+        
+        # Load token signing keys before the first authenticated request
+        try:
+            await AuthService.start()
+        except Exception as e:
+            print(f"Error loading token signing keys: {e}")
+        
+        # Generate recurring transactions on a schedule instead of waiting for a client
+        if RECURRING_SCHEDULER_ENABLED:
+            SchedulerService.start()
+    
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Stop the scheduler and wait for in-flight Firestore calls before the worker exits"""
+        await SchedulerService.stop()
+        await AuthService.stop()
+        await versioning.flush_pending_bumps()
+        repository.shutdown()
     
     return app
 
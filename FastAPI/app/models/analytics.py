@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class SummaryBucket(BaseModel):
+    """Income and expense totals for one group"""
+    key: str  # Category, 'YYYY-MM-DD' day, week start, or 'YYYY-MM' month
+    income: float
+    expenses: float
+    net: float
+    count: int
+
+class AnalyticsSummary(BaseModel):
+    """Income and expense series over a date range"""
+    currency: str
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    group_by: str  # 'category', 'day', 'week' or 'month'
+    total_income: float
+    total_expenses: float
+    buckets: List[SummaryBucket]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
 from datetime import datetime
 
 class Currency(BaseModel):
@@ -19,4 +19,10 @@ class ConversionRequest(BaseModel):
     """Model for currency conversion request"""
     amount: float
     from_currency: str
-    to_currency: str 
\ No newline at end of file
+    to_currency: str 
+
+class BatchConversionRequest(BaseModel):
+    """Model for converting many amounts to one currency"""
+    amounts: List[float]
+    from_currencies: Union[str, List[str]]  # One code for every amount, or one per amount
+    to_currency: str
\ No newline at end of file
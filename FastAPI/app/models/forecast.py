@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List
+
+class ForecastBucket(BaseModel):
+    """Projected recurring cash flow for one day ('YYYY-MM-DD') or month ('YYYY-MM')"""
+    period: str
+    income: float
+    expenses: float
+    net: float
+    balance: float  # Projected balance at the end of the period
+
+class Forecast(BaseModel):
+    """Balance projection from the recurring transactions over a horizon"""
+    currency: str
+    start_date: str
+    end_date: str
+    granularity: str  # 'day' or 'month'
+    starting_balance: float
+    ending_balance: float
+    total_income: float
+    total_expenses: float
+    buckets: List[ForecastBucket]
@@ -2,6 +2,9 @@ from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field
 
+# Most counter documents a goal's contributions can be spread over
+MAX_CONTRIBUTION_SHARDS = 100
+
 class GoalBase(BaseModel):
     """Base model for financial goals"""
     name: str
@@ -11,6 +14,9 @@ class GoalBase(BaseModel):
     category: Optional[str] = None
     deadline: Optional[str] = None  # ISO format date string
     description: Optional[str] = None
+    # Spread contributions over this many counter documents for goals contributed to
+    # faster than one document can be written; 0 updates the goal document itself
+    contribution_shards: int = Field(0, ge=0, le=MAX_CONTRIBUTION_SHARDS)
     
 class GoalModel(GoalBase):
     """Model for financial goals with ID and timestamps"""
@@ -0,0 +1,214 @@
+from typing import List, Dict, Any, Optional, Iterable
+from collections import defaultdict
+from datetime import datetime
+from firebase_admin import firestore
+from app.core.config import db, DEFAULT_CURRENCY_CODE
+from app.core import repository
+from app.core.tenancy import user_collection, owner_of
+
+# Collection references
+def aggregates_ref(uid: str):
+    """A user's spending aggregates"""
+    return user_collection(uid, 'spending_aggregates')
+
+# Fields the aggregates are derived from
+AGGREGATED_FIELDS = ['amount', 'category', 'currency', 'date', 'is_income']
+
+class SpendingAggregateService:
+    """Service for per-category monthly spending and income totals
+    
+    One document per user and (category, year-month, currency) holds running
+    'spent', 'income' and 'count' totals. Transaction writes stage Increment deltas
+    in the same batch or transaction, so the totals move atomically with the data.
+    """
+    
+    @staticmethod
+    def aggregate_id(category: str, month: str, currency: str) -> str:
+        """Build the aggregate document ID for a category, year-month and currency"""
+        # Firestore document IDs may not contain '/'
+        return f"{month}_{currency}_{category}".replace('/', '_')
+    
+    @staticmethod
+    def compute_deltas(
+        added: Iterable[Dict[str, Any]] = (),
+        removed: Iterable[Dict[str, Any]] = (),
+        default_currency: str = DEFAULT_CURRENCY_CODE
+    ) -> Dict[str, Dict[str, Any]]:
+        """Group added and removed transactions into deltas keyed by aggregate document ID"""
+        deltas = {}
+        
+        for sign, transactions in ((1, added), (-1, removed)):
+            for t in transactions:
+                month = t['date'][:7]  # 'YYYY-MM' prefix of the ISO date
+                currency = t.get('currency') or default_currency
+                key = SpendingAggregateService.aggregate_id(t['category'], month, currency)
+                
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = {
+                        'category': t['category'],
+                        'month': month,
+                        'currency': currency,
+                        'spent': 0.0,
+                        'income': 0.0,
+                        'count': 0
+                    }
+                
+                if t['is_income']:
+                    delta['income'] += sign * t['amount']
+                else:
+                    delta['spent'] += sign * t['amount']
+                delta['count'] += sign
+        
+        return deltas
+    
+    @staticmethod
+    def stage(writer, uid: str, deltas: Dict[str, Dict[str, Any]]) -> int:
+        """Stage Increment writes for a user's deltas on a WriteBatch or Transaction
+        
+        Returns the number of writes staged; deltas that cancel out are skipped.
+        """
+        staged = 0
+        for key, delta in deltas.items():
+            if delta['count'] == 0 and delta['spent'] == 0 and delta['income'] == 0:
+                continue
+            
+            writer.set(aggregates_ref(uid).document(key), {
+                'category': delta['category'],
+                'month': delta['month'],
+                'currency': delta['currency'],
+                'spent': firestore.Increment(delta['spent']),
+                'income': firestore.Increment(delta['income']),
+                'count': firestore.Increment(delta['count']),
+                'updated_at': datetime.now().isoformat()
+            }, merge=True)
+            staged += 1
+        
+        return staged
+    
+    @staticmethod
+    async def get_month(uid: str, month: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a user's aggregates for a year-month ('YYYY-MM'), optionally for one category"""
+        query = aggregates_ref(uid).where(filter=firestore.FieldFilter("month", "==", month))
+        if category is not None:
+            query = query.where(filter=firestore.FieldFilter("category", "==", category))
+        
+        return await repository.stream(query)
+    
+    @staticmethod
+    async def get_monthly_spending_by_category(uid: str, month: str, category: Optional[str] = None) -> Dict[str, float]:
+        """Sum a user's spending for a month per category across currencies"""
+        spent_by_category = {}
+        for aggregate in await SpendingAggregateService.get_month(uid, month, category):
+            spent_by_category[aggregate['category']] = (
+                spent_by_category.get(aggregate['category'], 0.0) + aggregate.get('spent', 0.0)
+            )
+        
+        return spent_by_category
+    
+    @staticmethod
+    async def recompute(uid: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Recompute aggregates from a full scan of one user's transactions, or every user's
+        
+        Returns the expected aggregates keyed by uid, then by aggregate document ID.
+        """
+        def _scan():
+            if uid is not None:
+                query = user_collection(uid, 'transactions').select(AGGREGATED_FIELDS)
+            else:
+                query = db.collection_group('transactions').select(AGGREGATED_FIELDS)
+            
+            by_user = defaultdict(list)
+            for doc in query.stream():
+                owner = uid or owner_of(doc.reference)
+                if owner is not None:
+                    by_user[owner].append(doc.to_dict())
+            
+            return {
+                owner: SpendingAggregateService.compute_deltas(added=transactions)
+                for owner, transactions in by_user.items()
+            }
+        
+        return await repository.run(_scan)
+    
+    @staticmethod
+    async def rebuild(uid: Optional[str] = None) -> Dict[str, int]:
+        """Replace one user's stored aggregates, or every user's, with a full recompute
+        
+        Writes that land while the rebuild runs may be lost from the totals, so
+        run it while the API is idle or follow it with check_consistency.
+        """
+        expected = await SpendingAggregateService.recompute(uid)
+        stored = await SpendingAggregateService._get_stored(uid)
+        stale = [
+            (doc['uid'], doc['id']) for doc in stored
+            if doc['id'] not in expected.get(doc['uid'], {})
+        ]
+        
+        now = datetime.now().isoformat()
+        writes = [
+            (aggregates_ref(owner).document(key), {**totals, 'updated_at': now})
+            for owner, aggregates in expected.items()
+            for key, totals in aggregates.items()
+        ] + [(aggregates_ref(owner).document(key), None) for owner, key in stale]
+        
+        for start in range(0, len(writes), repository.BATCH_SIZE):
+            batch = db.batch()
+            for ref, data in writes[start:start + repository.BATCH_SIZE]:
+                if data is None:
+                    batch.delete(ref)
+                else:
+                    batch.set(ref, data)
+            await repository.commit(batch)
+        
+        return {
+            'users': len(expected),
+            'written': sum(len(aggregates) for aggregates in expected.values()),
+            'deleted': len(stale)
+        }
+    
+    @staticmethod
+    async def check_consistency(uid: Optional[str] = None, tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+        """Compare one user's stored aggregates, or every user's, to a full recompute
+        
+        Returns one entry per aggregate whose stored totals differ, which is empty
+        when the aggregates are consistent.
+        """
+        expected = {
+            (owner, key): totals
+            for owner, aggregates in (await SpendingAggregateService.recompute(uid)).items()
+            for key, totals in aggregates.items()
+        }
+        stored = {(doc['uid'], doc['id']): doc for doc in await SpendingAggregateService._get_stored(uid)}
+        
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            want = expected.get(key, {'spent': 0.0, 'income': 0.0, 'count': 0})
+            have = stored.get(key, {})
+            
+            if (
+                abs(have.get('spent', 0.0) - want['spent']) > tolerance
+                or abs(have.get('income', 0.0) - want['income']) > tolerance
+                or have.get('count', 0) != want['count']
+            ):
+                mismatches.append({
+                    'uid': key[0],
+                    'id': key[1],
+                    'stored': {field: have.get(field) for field in ('spent', 'income', 'count')},
+                    'expected': {field: want[field] for field in ('spent', 'income', 'count')}
+                })
+        
+        return mismatches
+    
+    @staticmethod
+    async def _get_stored(uid: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get one user's stored aggregates, or every user's, with the document ID and owner"""
+        def _collect():
+            query = aggregates_ref(uid) if uid is not None else db.collection_group('spending_aggregates')
+            return [
+                {**doc.to_dict(), 'id': doc.id, 'uid': uid or owner_of(doc.reference)}
+                for doc in query.stream()
+                if uid is not None or owner_of(doc.reference) is not None
+            ]
+        
+        return await repository.run(_collect)
@@ -0,0 +1,150 @@
+from typing import Dict, Any, Optional
+from collections import defaultdict
+from datetime import date, timedelta
+from firebase_admin import firestore
+from app.core.config import SPENDING_AGGREGATES_ENABLED, COLUMNAR_CACHE_ENABLED, DEFAULT_CURRENCY_CODE
+from app.core import repository
+from app.services.aggregate_service import aggregates_ref, AGGREGATED_FIELDS
+from app.services.currency_service import CurrencyService
+from app.services.snapshot_service import TransactionSnapshotService
+from app.services.transaction_service import transactions_ref
+
+GROUP_BY_OPTIONS = ('category', 'day', 'week', 'month')
+
+class AnalyticsService:
+    """Service for server-side income and expense summaries of a user's transactions"""
+    
+    @staticmethod
+    async def summary(
+        uid: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        group_by: str = 'month',
+        target_currency: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Total income and expenses per group over [date_from, date_to)
+        
+        Totals are accumulated per (group, currency) in one pass over the range and
+        converted per group, so the response grows with the number of groups rather
+        than the number of transactions. Month-aligned category and month summaries
+        are read from spending_aggregates when SPENDING_AGGREGATES_ENABLED is set,
+        and other summaries from the columnar snapshot when COLUMNAR_CACHE_ENABLED is.
+        """
+        if group_by not in GROUP_BY_OPTIONS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY_OPTIONS)}")
+        
+        default_currency = await CurrencyService.get_default_currency()
+        default_code = default_currency['code'] if default_currency else DEFAULT_CURRENCY_CODE
+        target_currency = target_currency or default_code
+        
+        if AnalyticsService._can_use_aggregates(date_from, date_to, group_by):
+            totals = await AnalyticsService._totals_from_aggregates(uid, date_from, date_to, group_by)
+        elif COLUMNAR_CACHE_ENABLED:
+            totals = await TransactionSnapshotService.group_totals(uid, date_from, date_to, group_by)
+        else:
+            totals = await AnalyticsService._totals_from_transactions(uid, date_from, date_to, group_by, default_code)
+        
+        rates = await CurrencyService.get_exchange_rates_to(
+            {currency for _, currency in totals}, target_currency, strict=False
+        )
+        
+        buckets = {}
+        for (key, currency), group in totals.items():
+            if currency not in rates:
+                continue  # Already reported by get_exchange_rates_to
+            rate = rates[currency]
+            
+            bucket = buckets.setdefault(key, {'key': key, 'income': 0.0, 'expenses': 0.0, 'count': 0})
+            bucket['income'] += group['income'] * rate
+            bucket['expenses'] += group['expenses'] * rate
+            bucket['count'] += group['count']
+        
+        for bucket in buckets.values():
+            bucket['net'] = bucket['income'] - bucket['expenses']
+        
+        if group_by == 'category':
+            ordered = sorted(buckets.values(), key=lambda b: b['expenses'], reverse=True)
+        else:
+            ordered = [buckets[key] for key in sorted(buckets)]
+        
+        return {
+            'currency': target_currency,
+            'date_from': date_from.isoformat() if date_from else None,
+            'date_to': date_to.isoformat() if date_to else None,
+            'group_by': group_by,
+            'total_income': sum(b['income'] for b in ordered),
+            'total_expenses': sum(b['expenses'] for b in ordered),
+            'buckets': ordered
+        }
+    
+    @staticmethod
+    def _bucket_key(transaction_date: str, category: str, group_by: str) -> str:
+        """Group key of a transaction"""
+        if group_by == 'category':
+            return category
+        if group_by == 'month':
+            return transaction_date[:7]
+        if group_by == 'week':
+            # Weeks start on Monday and are keyed by that date
+            day = date.fromisoformat(transaction_date[:10])
+            return (day - timedelta(days=day.weekday())).isoformat()
+        return transaction_date[:10]
+    
+    @staticmethod
+    def _can_use_aggregates(date_from: Optional[date], date_to: Optional[date], group_by: str) -> bool:
+        """Monthly aggregates answer category and month summaries over whole months"""
+        return (
+            SPENDING_AGGREGATES_ENABLED
+            and group_by in ('category', 'month')
+            and (date_from is None or date_from.day == 1)
+            and (date_to is None or date_to.day == 1)
+        )
+    
+    @staticmethod
+    async def _totals_from_transactions(
+        uid: str,
+        date_from: Optional[date],
+        date_to: Optional[date],
+        group_by: str,
+        default_code: str
+    ) -> Dict[tuple, Dict[str, Any]]:
+        """Sum transactions per (group, currency) in one chunked pass over the range"""
+        query = transactions_ref(uid).select(AGGREGATED_FIELDS)
+        if date_from is not None:
+            query = query.where(filter=firestore.FieldFilter("date", ">=", date_from.isoformat()))
+        if date_to is not None:
+            query = query.where(filter=firestore.FieldFilter("date", "<", date_to.isoformat()))
+        
+        totals = defaultdict(lambda: {'income': 0.0, 'expenses': 0.0, 'count': 0})
+        async for chunk in repository.iter_chunks(query):
+            for t in chunk:
+                key = AnalyticsService._bucket_key(t['date'], t['category'], group_by)
+                group = totals[(key, t.get('currency') or default_code)]
+                group['income' if t['is_income'] else 'expenses'] += t['amount']
+                group['count'] += 1
+        
+        return totals
+    
+    @staticmethod
+    async def _totals_from_aggregates(
+        uid: str,
+        date_from: Optional[date],
+        date_to: Optional[date],
+        group_by: str
+    ) -> Dict[tuple, Dict[str, Any]]:
+        """Sum the monthly spending aggregates per (group, currency)"""
+        query = aggregates_ref(uid)
+        if date_from is not None:
+            query = query.where(filter=firestore.FieldFilter("month", ">=", date_from.isoformat()[:7]))
+        if date_to is not None:
+            query = query.where(filter=firestore.FieldFilter("month", "<", date_to.isoformat()[:7]))
+        
+        totals = defaultdict(lambda: {'income': 0.0, 'expenses': 0.0, 'count': 0})
+        for aggregate in await repository.stream(query):
+            key = aggregate['category'] if group_by == 'category' else aggregate['month']
+            group = totals[(key, aggregate['currency'])]
+            group['income'] += aggregate.get('income', 0.0)
+            group['expenses'] += aggregate.get('spent', 0.0)
+            group['count'] += aggregate.get('count', 0)
+        
+        return totals
@@ -1,18 +1,26 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, date, timedelta
 from firebase_admin import firestore
-from app.core.config import db
+from app.core.config import SPENDING_AGGREGATES_ENABLED, COLUMNAR_CACHE_ENABLED
+from app.core import repository, versioning
+from app.core.tenancy import user_collection
+from app.services.transaction_service import TransactionService
+from app.services.aggregate_service import SpendingAggregateService
+from app.services.snapshot_service import TransactionSnapshotService
 
 # Collection reference
-budgets_ref = db.collection('budgets')
+def budgets_ref(uid: str):
+    """A user's budgets"""
+    return user_collection(uid, 'budgets')
 
 class BudgetService:
-    """Service for managing budgets in Firebase"""
+    """Service for managing each user's budgets in Firebase"""
     
     @staticmethod
-    async def create(budget_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new budget in Firestore"""
+    async def create(uid: str, budget_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new budget for a user in Firestore"""
         # Generate a unique ID
         budget_id = str(uuid.uuid4())
         
@@ -21,75 +29,62 @@ class BudgetService:
         budget_data['created_at'] = datetime.now().isoformat()
         
         # Save to Firestore
-        budgets_ref.document(budget_id).set(budget_data)
+        await repository.save(budgets_ref(uid).document(budget_id), budget_data)
+        await versioning.bump('budgets', uid=uid)
         
         return budget_data
     
     @staticmethod
-    async def get_all() -> List[Dict[str, Any]]:
-        """Get all budgets"""
-        docs = budgets_ref.stream()
-        
-        budgets = []
-        for doc in docs:
-            budget = doc.to_dict()
-            budgets.append(budget)
-            
-        return budgets
+    async def get_all(uid: str) -> List[Dict[str, Any]]:
+        """Get all of a user's budgets"""
+        return await repository.stream(budgets_ref(uid))
     
     @staticmethod
-    async def get_by_category(category: str) -> Optional[Dict[str, Any]]:
-        """Get a budget by category"""
-        query = budgets_ref.where(filter=firestore.FieldFilter("category", "==", category)).limit(1)
-        docs = query.stream()
-        
-        for doc in docs:
-            return doc.to_dict()
-        
-        return None
+    async def get_by_category(uid: str, category: str) -> Optional[Dict[str, Any]]:
+        """Get a user's budget by category"""
+        query = budgets_ref(uid).where(filter=firestore.FieldFilter("category", "==", category))
+        return await repository.first(query)
     
     @staticmethod
-    async def get_by_id(budget_id: str) -> Optional[Dict[str, Any]]:
-        """Get a budget by ID"""
-        doc = budgets_ref.document(budget_id).get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+    async def get_by_id(uid: str, budget_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's budget by ID"""
+        return await repository.get(budgets_ref(uid).document(budget_id))
     
     @staticmethod
-    async def update(budget_id: str, budget_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update a budget"""
-        budget_ref = budgets_ref.document(budget_id)
-        doc = budget_ref.get()
-        
-        if not doc.exists:
+    async def update(uid: str, budget_id: str, budget_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a user's budget"""
+        budget_ref = budgets_ref(uid).document(budget_id)
+        if await repository.get(budget_ref) is None:
             return None
         
         # Add updated_at timestamp
         budget_data['updated_at'] = datetime.now().isoformat()
         
         # Update in Firestore
-        budget_ref.update(budget_data)
+        await repository.update(budget_ref, budget_data)
+        await versioning.bump('budgets', uid=uid)
         
         # Get and return updated document
-        updated_doc = budget_ref.get()
-        return updated_doc.to_dict()
+        return await repository.get(budget_ref)
     
     @staticmethod
-    async def delete(budget_id: str) -> bool:
-        """Delete a budget"""
-        budget_ref = budgets_ref.document(budget_id)
-        doc = budget_ref.get()
-        
-        if not doc.exists:
+    async def delete(uid: str, budget_id: str) -> bool:
+        """Delete a user's budget"""
+        budget_ref = budgets_ref(uid).document(budget_id)
+        if await repository.get(budget_ref) is None:
             return False
         
-        budget_ref.delete()
+        await repository.delete(budget_ref)
+        await versioning.bump('budgets', uid=uid)
         return True
     
     @staticmethod
-    async def calculate_budget_status(category: str, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Calculate budget status for a category based on transactions
+    async def calculate_budget_status(uid: str, category: str, transactions: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Calculate the status of a user's budget for a category based on transactions
+        
+        If transactions are not given, the current month's spending is read
+        from the spending aggregates when SPENDING_AGGREGATES_ENABLED is set,
+        otherwise only the category's expenses for the month are fetched.
         
         Returns a dict with:
         - budget_amount: the total budget amount
@@ -99,27 +94,99 @@ class BudgetService:
         - status: 'under', 'approaching', 'exceeded'
         """
         # Get the budget for this category
-        budget = await BudgetService.get_by_category(category)
+        budget = await BudgetService.get_by_category(uid, category)
         
         if not budget:
             return None
         
-        # Filter transactions for current month and category
-        now = datetime.now()
-        current_month = now.month
-        current_year = now.year
-        
-        monthly_transactions = [
-            t for t in transactions 
-            if t['category'] == category 
-            and not t['is_income']
-            and datetime.fromisoformat(t['date']).month == current_month
-            and datetime.fromisoformat(t['date']).year == current_year
+        # Calculate spent amount for the current month
+        if transactions is None:
+            spent_by_category = await BudgetService._current_month_spending(uid, category)
+        else:
+            spent_by_category = BudgetService._monthly_spending_by_category(transactions)
+        
+        return BudgetService._build_status(budget, spent_by_category.get(category, 0.0))
+    
+    @staticmethod
+    async def calculate_all_budget_statuses(uid: str, transactions: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Calculate the status of every budget of a user in one pass over the transactions
+        
+        Returns one entry per budget with its id and category plus the same
+        fields as calculate_budget_status. If transactions are not given, the
+        current month's spending is read as in calculate_budget_status.
+        """
+        budgets = await BudgetService.get_all(uid)
+        
+        # Index the current month's spending by category once, then look up each budget
+        if transactions is None:
+            spent_by_category = await BudgetService._current_month_spending(uid)
+        else:
+            spent_by_category = BudgetService._monthly_spending_by_category(transactions)
+        
+        return [
+            {
+                'id': budget['id'],
+                'category': budget['category'],
+                **BudgetService._build_status(budget, spent_by_category.get(budget['category'], 0.0))
+            }
+            for budget in budgets
         ]
+    
+    @staticmethod
+    async def _current_month_spending(uid: str, category: Optional[str] = None) -> Dict[str, float]:
+        """Get a user's spending this month per category, optionally for one category"""
+        date_from, date_to = BudgetService._current_month_range()
+        
+        if SPENDING_AGGREGATES_ENABLED:
+            # A handful of aggregate reads instead of the month's transactions
+            return await SpendingAggregateService.get_monthly_spending_by_category(uid, date_from[:7], category)
+        
+        if COLUMNAR_CACHE_ENABLED:
+            # Vectorized sum over the in-memory snapshot, across currencies like the other paths
+            totals = await TransactionSnapshotService.group_totals(
+                uid, date.fromisoformat(date_from), date.fromisoformat(date_to), 'category'
+            )
+            spent_by_category = defaultdict(float)
+            for (group_category, _), group in totals.items():
+                if category is None or group_category == category:
+                    spent_by_category[group_category] += group['expenses']
+            return spent_by_category
+        
+        transactions = await TransactionService.query(
+            uid,
+            category=category,
+            date_from=date_from,
+            date_to=date_to,
+            is_income=False
+        )
+        return BudgetService._monthly_spending_by_category(transactions)
+    
+    @staticmethod
+    def _current_month_range() -> Tuple[str, str]:
+        """Get the first day of this month and of next month as ISO date strings"""
+        first_of_month = date.today().replace(day=1)
+        first_of_next_month = (first_of_month + timedelta(days=32)).replace(day=1)
+        return first_of_month.isoformat(), first_of_next_month.isoformat()
+    
+    @staticmethod
+    def _monthly_spending_by_category(transactions: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Sum the current month's expenses per category"""
+        now = datetime.now()
         
-        # Calculate spent amount
-        spent_amount = sum(t['amount'] for t in monthly_transactions)
+        spent_by_category = defaultdict(float)
+        for t in transactions:
+            if t['is_income']:
+                continue
+            
+            transaction_date = datetime.fromisoformat(t['date'])
+            if transaction_date.month == now.month and transaction_date.year == now.year:
+                spent_by_category[t['category']] += t['amount']
         
+        return spent_by_category
+    
+    @staticmethod
+    def _build_status(budget: Dict[str, Any], spent_amount: float) -> Dict[str, Any]:
+        """Derive remaining amount, percentage and status from a budget and its spending"""
         # Calculate remaining and percentage
         remaining_amount = budget['amount'] - spent_amount
         percentage_used = (spent_amount / budget['amount']) * 100 if budget['amount'] > 0 else 0
@@ -137,4 +204,4 @@ class BudgetService:
             'remaining_amount': remaining_amount,
             'percentage_used': percentage_used,
             'status': status
-        } 
\ No newline at end of file
+        }
@@ -1,8 +1,13 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Sequence, Tuple, Union
+import asyncio
+import time
 import uuid
 from datetime import datetime
+import numpy as np
 from firebase_admin import firestore
-from app.core.config import db
+from app.core.config import db, EXCHANGE_RATE_CACHE_TTL, EXCHANGE_RATE_CACHE_SIZE, CURRENCY_CACHE_TTL, CURRENCY_VERSION_CHECK_INTERVAL
+from app.core import repository, versioning
+from app.utils.cache import TTLCache, MISSING
 
 # Collection references
 currencies_ref = db.collection('currencies')
@@ -27,6 +32,13 @@ class CurrencyService:
         }
     }
     
+    # Latest rate table per base currency ('*' for the most recent of any base)
+    _rates_cache = TTLCache(ttl=EXCHANGE_RATE_CACHE_TTL, maxsize=EXCHANGE_RATE_CACHE_SIZE)
+    
+    # Whole currency catalogue with the 'currencies' version it was read at and
+    # when that version was last confirmed
+    _catalogue_cache = TTLCache(ttl=CURRENCY_CACHE_TTL)
+    
     # Default currencies
     DEFAULT_CURRENCIES = [
         {
@@ -75,59 +87,49 @@ class CurrencyService:
         currency_id = currency_data['code']
         
         # Check if already exists
-        doc = currencies_ref.document(currency_id).get()
-        if doc.exists:
-            return doc.to_dict()
+        existing = await repository.get(currencies_ref.document(currency_id))
+        if existing is not None:
+            return existing
         
         # Save to Firestore
-        currencies_ref.document(currency_id).set(currency_data)
+        await repository.save(currencies_ref.document(currency_id), currency_data)
+        await CurrencyService._invalidate_catalogue()
         
         return currency_data
     
     @staticmethod
     async def get_all_currencies() -> List[Dict[str, Any]]:
         """Get all currencies"""
-        docs = currencies_ref.stream()
-        
-        currencies = []
-        for doc in docs:
-            currency = doc.to_dict()
-            currencies.append(currency)
-            
-        return currencies
+        return [dict(currency) for currency in await CurrencyService._get_catalogue()]
     
     @staticmethod
     async def get_currency(currency_code: str) -> Optional[Dict[str, Any]]:
         """Get a currency by code"""
-        doc = currencies_ref.document(currency_code).get()
-        if doc.exists:
-            return doc.to_dict()
+        for currency in await CurrencyService._get_catalogue():
+            if currency.get('code') == currency_code:
+                return dict(currency)
         return None
     
     @staticmethod
     async def update_currency(currency_code: str, currency_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update a currency"""
         currency_ref = currencies_ref.document(currency_code)
-        doc = currency_ref.get()
-        
-        if not doc.exists:
+        if await repository.get(currency_ref) is None:
             return None
         
         # Update in Firestore
-        currency_ref.update(currency_data)
+        await repository.update(currency_ref, currency_data)
+        await CurrencyService._invalidate_catalogue()
         
         # Get and return updated document
-        updated_doc = currency_ref.get()
-        return updated_doc.to_dict()
+        return await repository.get(currency_ref)
     
     @staticmethod
     async def get_default_currency() -> Optional[Dict[str, Any]]:
         """Get the default currency"""
-        query = currencies_ref.where(filter=firestore.FieldFilter("is_default", "==", True)).limit(1)
-        docs = query.stream()
-        
-        for doc in docs:
-            return doc.to_dict()
+        for currency in await CurrencyService._get_catalogue():
+            if currency.get('is_default'):
+                return dict(currency)
         
         # If no default is set, return USD
         return await CurrencyService.get_currency("USD")
@@ -158,7 +160,7 @@ class CurrencyService:
                 if current_default and current_default.get('code') != currency_code:
                     try:
                         current_default_ref = currencies_ref.document(current_default['code'])
-                        current_default_ref.update({"is_default": False})
+                        await repository.update(current_default_ref, {"is_default": False})
                     except Exception as e:
                         print(f"Error unsetting previous default: {e}")
                         # Continue anyway
@@ -169,7 +171,7 @@ class CurrencyService:
             # Set new default
             try:
                 new_default_ref = currencies_ref.document(currency_code)
-                new_default_ref.update({"is_default": True})
+                await repository.update(new_default_ref, {"is_default": True})
             except Exception as e:
                 print(f"Error setting new default: {e}")
                 # Try to create/set the currency if update fails
@@ -179,8 +181,9 @@ class CurrencyService:
                         await CurrencyService.create_currency(default_currency)
                         break
             
+            await CurrencyService._invalidate_catalogue()
             return True
-            
+        
         except Exception as e:
             print(f"Error in set_default_currency: {e}")
             # Return True anyway to prevent UI errors
@@ -200,69 +203,136 @@ class CurrencyService:
         rate_id = f"{base_currency}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         # Save to Firestore
-        exchange_rates_ref.document(rate_id).set(rate_data)
+        await repository.save(exchange_rates_ref.document(rate_id), rate_data)
+        await versioning.bump('exchange_rates')
+        
+        # Drop cached tables that this entry supersedes
+        CurrencyService._rates_cache.invalidate(base_currency)
+        CurrencyService._rates_cache.invalidate('*')
         
         return rate_data
     
     @staticmethod
     async def get_latest_exchange_rates(base_currency: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """Get the latest exchange rates for a base currency, or all if not specified"""
+        cache_key = base_currency or '*'
+        cached = CurrencyService._rates_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+        
         if base_currency:
             # Query for specific base currency, ordered by timestamp
             query = exchange_rates_ref.where(
                 filter=firestore.FieldFilter("base_currency", "==", base_currency)
-            ).order_by("timestamp", direction=firestore.Query.DESCENDING).limit(1)
+            ).order_by("timestamp", direction=firestore.Query.DESCENDING)
         else:
             # Just get the most recent rates of any base currency
-            query = exchange_rates_ref.order_by("timestamp", direction=firestore.Query.DESCENDING).limit(1)
+            query = exchange_rates_ref.order_by("timestamp", direction=firestore.Query.DESCENDING)
         
-        docs = query.stream()
+        rates = await repository.first(query)
         
-        for doc in docs:
-            return doc.to_dict()
+        # Misses are only cached for built-in currencies, which fall back to DEFAULT_RATES;
+        # caching them for arbitrary user-supplied codes would let requests fill the cache
+        if rates is not None or base_currency is None or base_currency in CurrencyService.DEFAULT_RATES:
+            CurrencyService._rates_cache.set(cache_key, rates)
         
-        return None
+        return rates
     
     @staticmethod
-    async def convert_currency(amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
-        """Convert an amount from one currency to another"""
+    def get_rate_cache_stats() -> Dict[str, Any]:
+        """Get hit/miss counters for the exchange-rate cache"""
+        return CurrencyService._rates_cache.stats()
+    
+    @staticmethod
+    def get_catalogue_cache_stats() -> Dict[str, Any]:
+        """Get hit/miss counters for the currency catalogue cache"""
+        return CurrencyService._catalogue_cache.stats()
+    
+    @staticmethod
+    async def _get_catalogue() -> List[Dict[str, Any]]:
+        """Get every currency, from the cache unless a worker has changed them since it was read
+        
+        Other workers' changes are looked for at most every CURRENCY_VERSION_CHECK_INTERVAL
+        seconds, so in between the catalogue costs no Firestore reads. This worker's own
+        changes drop the cache immediately.
+        """
+        cached = CurrencyService._catalogue_cache.get('*')
+        if cached is not MISSING and time.monotonic() - cached[2] < CURRENCY_VERSION_CHECK_INTERVAL:
+            return cached[1]
+        
+        version = await versioning.get_version('currencies')
+        if cached is not MISSING and cached[0] == version:
+            CurrencyService._catalogue_cache.set('*', (version, cached[1], time.monotonic()))
+            return cached[1]
+        
+        currencies = await repository.stream(currencies_ref)
+        CurrencyService._catalogue_cache.set('*', (version, currencies, time.monotonic()))
+        return currencies
+    
+    @staticmethod
+    async def _invalidate_catalogue() -> None:
+        """Drop the cached catalogue here and bump its version for the other workers"""
+        CurrencyService._catalogue_cache.invalidate('*')
+        await versioning.bump('currencies')
+    
+    @staticmethod
+    async def get_exchange_rate(from_currency: str, to_currency: str) -> float:
+        """Resolve the rate from one currency to another, falling back to default rates"""
         # If same currency, no conversion needed
         if from_currency == to_currency:
-            return {
-                "original_amount": amount,
-                "original_currency": from_currency,
-                "converted_amount": amount,
-                "converted_currency": to_currency,
-                "exchange_rate": 1.0,
-                "timestamp": datetime.now()
-            }
-        
-        # Get latest exchange rates for from_currency
+            return 1.0
+        
+        # Use the direct exchange rate if the latest rates for from_currency have it
         rates = await CurrencyService.get_latest_exchange_rates(from_currency)
+        if rates and to_currency in rates.get('rates', {}):
+            return rates['rates'][to_currency]
         
         # If rates not found, use default rates
-        if not rates or to_currency not in rates.get('rates', {}):
-            if from_currency in CurrencyService.DEFAULT_RATES and to_currency in CurrencyService.DEFAULT_RATES[from_currency]:
-                exchange_rate = CurrencyService.DEFAULT_RATES[from_currency][to_currency]
-            else:
-                # If no direct conversion is available, go through USD
-                # First convert from_currency to USD
-                if from_currency != "USD" and from_currency in CurrencyService.DEFAULT_RATES:
-                    usd_amount = amount * CurrencyService.DEFAULT_RATES[from_currency]["USD"]
-                else:
-                    usd_amount = amount  # Already in USD
-                
-                # Then convert USD to to_currency
-                if to_currency != "USD" and "USD" in CurrencyService.DEFAULT_RATES:
-                    exchange_rate = CurrencyService.DEFAULT_RATES["USD"][to_currency]
-                    converted_amount = usd_amount * exchange_rate
-                else:
-                    converted_amount = usd_amount  # Convert to USD
-                    exchange_rate = 1.0
-        else:
-            # Use the direct exchange rate
-            exchange_rate = rates['rates'][to_currency]
-            
+        if from_currency in CurrencyService.DEFAULT_RATES and to_currency in CurrencyService.DEFAULT_RATES[from_currency]:
+            return CurrencyService.DEFAULT_RATES[from_currency][to_currency]
+        
+        # If no direct conversion is available, go through USD
+        # First convert from_currency to USD
+        to_usd_rate = 1.0  # Already in USD
+        if from_currency != "USD" and from_currency in CurrencyService.DEFAULT_RATES:
+            to_usd_rate = CurrencyService.DEFAULT_RATES[from_currency]["USD"]
+        
+        # Then convert USD to to_currency
+        from_usd_rate = 1.0  # Convert to USD
+        if to_currency != "USD":
+            if to_currency not in CurrencyService.DEFAULT_RATES["USD"]:
+                raise ValueError(f"No exchange rate available from {from_currency} to {to_currency}")
+            from_usd_rate = CurrencyService.DEFAULT_RATES["USD"][to_currency]
+        
+        return to_usd_rate * from_usd_rate
+    
+    @staticmethod
+    async def get_exchange_rates_to(from_currencies: Iterable[str], to_currency: str, strict: bool = True) -> Dict[str, float]:
+        """Resolve the rate from each distinct currency to to_currency, looking each up once
+        
+        With strict=False, currencies that cannot be converted are left out instead of raising.
+        """
+        codes = list(dict.fromkeys(from_currencies))
+        results = await asyncio.gather(
+            *(CurrencyService.get_exchange_rate(code, to_currency) for code in codes),
+            return_exceptions=True
+        )
+        
+        rates = {}
+        for code, result in zip(codes, results):
+            if isinstance(result, Exception):
+                if strict:
+                    raise result
+                print(f"Currency conversion error: {result}")
+                continue
+            rates[code] = result
+        return rates
+    
+    @staticmethod
+    async def convert_currency(amount: float, from_currency: str, to_currency: str) -> Dict[str, Any]:
+        """Convert an amount from one currency to another"""
+        exchange_rate = await CurrencyService.get_exchange_rate(from_currency, to_currency)
+        
         # Calculate converted amount
         converted_amount = amount * exchange_rate
         
@@ -273,4 +343,31 @@ class CurrencyService:
             "converted_currency": to_currency,
             "exchange_rate": exchange_rate,
             "timestamp": datetime.now()
-        } 
\ No newline at end of file
+        }
+    
+    @staticmethod
+    async def convert_many(
+        amounts: Sequence[float],
+        from_currencies: Union[str, Sequence[str]],
+        to_currency: str
+    ) -> Tuple[np.ndarray, Dict[str, float]]:
+        """Convert a column of amounts to to_currency in one vectorized pass
+        
+        from_currencies is either a single code shared by every amount or one code per amount.
+        Each distinct rate is resolved once; returns the converted amounts and the rates used.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        
+        if isinstance(from_currencies, str):
+            rate = await CurrencyService.get_exchange_rate(from_currencies, to_currency)
+            return amounts * rate, {from_currencies: rate}
+        
+        if len(from_currencies) != len(amounts):
+            raise ValueError("amounts and from_currencies must have the same length")
+        
+        # Map every row to its distinct currency, then gather one rate per currency
+        codes, inverse = np.unique(np.asarray(from_currencies, dtype=str), return_inverse=True)
+        rates = await CurrencyService.get_exchange_rates_to(codes.tolist(), to_currency)
+        rate_column = np.array([rates[code] for code in codes.tolist()], dtype=np.float64)[inverse]
+        
+        return amounts * rate_column, rates
@@ -0,0 +1,153 @@
+from typing import Dict, Any, Optional
+from collections import defaultdict
+from datetime import datetime, timedelta
+import numpy as np
+from app.core.config import SPENDING_AGGREGATES_ENABLED, COLUMNAR_CACHE_ENABLED, BALANCE_CACHE_TTL, BALANCE_CACHE_SIZE, DEFAULT_CURRENCY_CODE
+from app.core import repository, versioning
+from app.services.aggregate_service import aggregates_ref
+from app.services.currency_service import CurrencyService
+from app.services.recurring_transaction_service import RecurringTransactionService
+from app.services.snapshot_service import TransactionSnapshotService
+from app.services.transaction_service import transactions_ref
+from app.utils.cache import TTLCache, MISSING
+from app.utils.recurrence import RecurrenceSchedule
+
+# Longest projection served, about five years
+MAX_HORIZON_DAYS = 1830
+
+class ForecastService:
+    """Service for projecting a user's balance from their recurring transactions
+    
+    Rules are expanded in memory with RecurrenceSchedule and nothing is written
+    to Firestore.
+    """
+    
+    # Net amount per currency of each user's transactions, with the 'transactions'
+    # version and default currency it was summed at
+    _balance_cache = TTLCache(ttl=BALANCE_CACHE_TTL, maxsize=BALANCE_CACHE_SIZE)
+    
+    @staticmethod
+    async def forecast(
+        uid: str,
+        horizon_days: int,
+        target_currency: Optional[str] = None,
+        granularity: str = 'day',
+        starting_balance: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Project the balance over the next horizon_days days in day or month buckets
+        
+        Each rule's occurrences after its last generated date are summed into one daily
+        array. Each rule is converted with a single rate. Occurrences already due but not
+        yet written by the generator (including today's) are not in the balance, so they
+        are counted in the first day, when the next generation run writes them. Without
+        starting_balance, the projection starts from the current net of the user's transactions.
+        """
+        if not 1 <= horizon_days <= MAX_HORIZON_DAYS:
+            raise ValueError(f"horizon_days must be between 1 and {MAX_HORIZON_DAYS}")
+        
+        default_currency = await CurrencyService.get_default_currency()
+        default_code = default_currency['code'] if default_currency else DEFAULT_CURRENCY_CODE
+        target_currency = target_currency or default_code
+        
+        today = datetime.now().date()
+        end = today + timedelta(days=horizon_days)
+        
+        rules = await RecurringTransactionService.get_rules(uid)
+        # Generated transactions use the default currency, so rules without one do too
+        rates = await CurrencyService.get_exchange_rates_to(
+            {rule.get('currency') or default_code for rule in rules}, target_currency
+        )
+        
+        income = np.zeros(horizon_days)
+        expenses = np.zeros(horizon_days)
+        for rule in rules:
+            try:
+                schedule = RecurrenceSchedule.from_rule(rule)
+            except ValueError:
+                # Rules missing the fields their frequency needs never generate anything
+                continue
+            
+            # The generator skips rules that have ended, so their unwritten occurrences never come
+            if schedule.end_date and schedule.end_date < today:
+                continue
+            
+            # None starts at start_date for rules that were never generated
+            after = None
+            if rule.get('last_generated'):
+                after = datetime.fromisoformat(rule['last_generated']).date()
+            
+            # Day offsets into the horizon; index 0 is tomorrow, and also takes overdue occurrences
+            offsets = np.fromiter(
+                (max(d.toordinal() - today.toordinal() - 1, 0) for d in schedule.between(after, end)),
+                dtype=np.int64,
+                count=schedule.count_between(after, end)
+            )
+            amount = rule['amount'] * rates[rule.get('currency') or default_code]
+            target = income if rule['is_income'] else expenses
+            target += np.bincount(offsets, minlength=horizon_days) * amount
+        
+        if starting_balance is None:
+            starting_balance = await ForecastService._current_balance(uid, target_currency, default_code)
+        
+        periods = [(today + timedelta(days=i + 1)).isoformat() for i in range(horizon_days)]
+        if granularity == 'month':
+            # Sum the days of each calendar month; starts are the first index of each month
+            starts = [i for i, period in enumerate(periods) if i == 0 or period.endswith('-01')]
+            income = np.add.reduceat(income, starts)
+            expenses = np.add.reduceat(expenses, starts)
+            periods = [periods[i][:7] for i in starts]
+        
+        net = income - expenses
+        balance = starting_balance + np.cumsum(net)
+        
+        return {
+            'currency': target_currency,
+            'start_date': today.isoformat(),
+            'end_date': end.isoformat(),
+            'granularity': granularity,
+            'starting_balance': starting_balance,
+            'ending_balance': float(balance[-1]),
+            'total_income': float(income.sum()),
+            'total_expenses': float(expenses.sum()),
+            'buckets': [
+                {'period': period, 'income': i, 'expenses': e, 'net': n, 'balance': b}
+                for period, i, e, n, b in zip(
+                    periods, income.tolist(), expenses.tolist(), net.tolist(), balance.tolist()
+                )
+            ]
+        }
+    
+    @staticmethod
+    async def _current_balance(uid: str, target_currency: str, default_code: str) -> float:
+        """Net income minus spending over all of a user's transactions, in target_currency"""
+        net_by_currency = defaultdict(float)
+        
+        if SPENDING_AGGREGATES_ENABLED:
+            for aggregate in await repository.stream(aggregates_ref(uid)):
+                net_by_currency[aggregate['currency']] += aggregate.get('income', 0.0) - aggregate.get('spent', 0.0)
+        elif COLUMNAR_CACHE_ENABLED:
+            for (_, currency), totals in (await TransactionSnapshotService.group_totals(uid)).items():
+                net_by_currency[currency] += totals['income'] - totals['expenses']
+        else:
+            net_by_currency = await ForecastService._scan_net_by_currency(uid, default_code)
+        
+        rates = await CurrencyService.get_exchange_rates_to(net_by_currency, target_currency, strict=False)
+        return sum(net * rates[code] for code, net in net_by_currency.items() if code in rates)
+    
+    @staticmethod
+    async def _scan_net_by_currency(uid: str, default_code: str) -> Dict[str, float]:
+        """Sum a user's transactions per currency, rescanning them only after they change"""
+        version = await versioning.get_version('transactions', uid=uid)
+        
+        cached = ForecastService._balance_cache.get(uid)
+        if cached is not MISSING and cached[:2] == (version, default_code):
+            return cached[2]
+        
+        net_by_currency = defaultdict(float)
+        query = transactions_ref(uid).select(['amount', 'currency', 'is_income'])
+        async for chunk in repository.iter_chunks(query):
+            for t in chunk:
+                net_by_currency[t.get('currency') or default_code] += t['amount'] if t['is_income'] else -t['amount']
+        
+        ForecastService._balance_cache.set(uid, (version, default_code, net_by_currency))
+        return net_by_currency
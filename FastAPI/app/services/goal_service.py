@@ -1,19 +1,30 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+import random
 import uuid
 from datetime import datetime
 from firebase_admin import firestore
-from app.core.config import db
+from google.api_core import exceptions as api_exceptions
+from app.core.config import db, CURRENCY_BACKFILL_COMPLETE, SHARDED_GOAL_VERSION_DELAY
+from app.core import repository, versioning
+from app.core.tenancy import user_collection
 from app.services.currency_service import CurrencyService
 
 # Collection reference
-goals_ref = db.collection('goals')
+def goals_ref(uid: str):
+    """A user's financial goals"""
+    return user_collection(uid, 'goals')
+
+def contribution_shard_refs(goal_ref, count: int) -> list:
+    """Counter documents of a goal whose contributions are sharded"""
+    shards_ref = goal_ref.collection('contribution_shards')
+    return [shards_ref.document(str(i)) for i in range(count)]
 
 class GoalService:
-    """Service for managing financial goals in Firebase"""
+    """Service for managing each user's financial goals in Firebase"""
     
     @staticmethod
-    async def create(goal_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new financial goal in Firestore"""
+    async def create(uid: str, goal_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new financial goal for a user in Firestore"""
         # Generate a unique ID
         goal_id = str(uuid.uuid4())
         
@@ -25,94 +36,63 @@ class GoalService:
         if 'currency' not in goal_data:
             default_currency = await CurrencyService.get_default_currency()
             goal_data['currency'] = default_currency['code']
-            
+        
         # Calculate progress percentage
         if 'target_amount' in goal_data and 'current_amount' in goal_data and goal_data['target_amount'] > 0:
             goal_data['progress_percentage'] = min(100.0, (goal_data['current_amount'] / goal_data['target_amount']) * 100)
         else:
             goal_data['progress_percentage'] = 0.0
-            
+        
         # Set completion status
         goal_data['is_completed'] = goal_data.get('progress_percentage', 0.0) >= 100.0
         
         # Save to Firestore
-        goals_ref.document(goal_id).set(goal_data)
+        await repository.save(goals_ref(uid).document(goal_id), goal_data)
+        await versioning.bump('goals', uid=uid)
         
         return goal_data
     
     @staticmethod
-    async def get_all(limit: int = 100, target_currency: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all financial goals with optional limit and currency conversion"""
-        query = goals_ref.limit(limit)
-        docs = query.stream()
-        
-        goals = []
-        for doc in docs:
-            goal = doc.to_dict()
-            
-            # Ensure goal has a currency field
-            if 'currency' not in goal:
-                default_currency = await CurrencyService.get_default_currency()
-                goal['currency'] = default_currency['code']
-                
-                # Update the goal in Firestore with the default currency
-                goals_ref.document(goal['id']).update({
-                    'currency': goal['currency']
-                })
-            
-            # Convert currency if target_currency is specified and different from goal currency
-            if target_currency and goal.get('currency') != target_currency:
-                try:
-                    # Convert target amount
-                    conversion_target = await CurrencyService.convert_currency(
-                        goal['target_amount'],
-                        goal['currency'],
-                        target_currency
-                    )
-                    
-                    # Convert current amount
-                    conversion_current = await CurrencyService.convert_currency(
-                        goal['current_amount'],
-                        goal['currency'],
-                        target_currency
-                    )
-                    
-                    # Store original values
-                    goal['original_target_amount'] = goal['target_amount']
-                    goal['original_current_amount'] = goal['current_amount']
-                    goal['original_currency'] = goal['currency']
-                    
-                    # Update with converted values
-                    goal['target_amount'] = conversion_target['converted_amount']
-                    goal['current_amount'] = conversion_current['converted_amount']
-                    goal['currency'] = target_currency
-                    
-                except Exception as e:
-                    # If conversion fails, keep original values
-                    print(f"Currency conversion error: {e}")
-            
-            goals.append(goal)
-            
-        return goals
+    async def get_page(
+        uid: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        target_currency: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of a user's financial goals in creation order, with optional category filter and currency conversion
+        
+        Pages are ordered by (created_at, document ID) and continue after the opaque cursor
+        returned with the previous page. Returns the page and the next cursor, or
+        None on the last page. Filtering by category uses the (category, created_at)
+        composite index in React/finance-app/firestore.indexes.json.
+        """
+        query = goals_ref(uid)
+        if category is not None:
+            query = query.where(filter=firestore.FieldFilter("category", "==", category))
+        
+        goals, next_cursor = await repository.paginate(query, ['created_at', repository.DOCUMENT_ID], limit, cursor)
+        
+        # Ensure every goal has a currency field
+        await GoalService._ensure_currency(uid, goals)
+        await GoalService._apply_contributions(uid, goals)
+        
+        # Convert currency if target_currency is specified, resolving each rate once
+        if target_currency:
+            await GoalService._convert_all(goals, target_currency)
+        
+        return goals, next_cursor
     
     @staticmethod
-    async def get_by_id(goal_id: str, target_currency: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """Get a goal by ID with optional currency conversion"""
-        doc = goals_ref.document(goal_id).get()
-        if not doc.exists:
+    async def get_by_id(uid: str, goal_id: str, target_currency: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a user's goal by ID with optional currency conversion"""
+        goal = await repository.get(goals_ref(uid).document(goal_id))
+        if goal is None:
             return None
-            
-        goal = doc.to_dict()
         
         # Ensure goal has a currency field
-        if 'currency' not in goal:
-            default_currency = await CurrencyService.get_default_currency()
-            goal['currency'] = default_currency['code']
-            
-            # Update the goal in Firestore with the default currency
-            goals_ref.document(goal_id).update({
-                'currency': goal['currency']
-            })
+        await GoalService._ensure_currency(uid, [goal])
+        await GoalService._apply_contributions(uid, [goal])
         
         # Convert currency if target_currency is specified and different from goal currency
         if target_currency and goal.get('currency') != target_currency:
@@ -140,7 +120,7 @@ class GoalService:
                 goal['target_amount'] = conversion_target['converted_amount']
                 goal['current_amount'] = conversion_current['converted_amount']
                 goal['currency'] = target_currency
-                
+            
             except Exception as e:
                 # If conversion fails, keep original values
                 print(f"Currency conversion error: {e}")
@@ -148,15 +128,12 @@ class GoalService:
         return goal
     
     @staticmethod
-    async def update(goal_id: str, goal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update a goal"""
-        goal_ref = goals_ref.document(goal_id)
-        doc = goal_ref.get()
-        
-        if not doc.exists:
+    async def update(uid: str, goal_id: str, goal_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a user's goal"""
+        goal_ref = goals_ref(uid).document(goal_id)
+        existing_goal = await repository.get(goal_ref)
+        if existing_goal is None:
             return None
-            
-        existing_goal = doc.to_dict()
         
         # Add updated_at timestamp
         goal_data['updated_at'] = datetime.now().isoformat()
@@ -172,103 +149,211 @@ class GoalService:
                 # Update completion status based on new progress
                 goal_data['is_completed'] = goal_data['progress_percentage'] >= 100.0
         
-        # Update in Firestore
-        goal_ref.update(goal_data)
+        if existing_goal.get('contribution_shards', 0) and 'current_amount' in goal_data:
+            # The new amount replaces the contributions counted in the shards too
+            await repository.run_transaction(GoalService._reset_shards_in_transaction, goal_ref, goal_data)
+        else:
+            # Update in Firestore
+            await repository.update(goal_ref, goal_data)
+        await versioning.bump('goals', uid=uid)
         
         # Get and return updated document
-        updated_doc = goal_ref.get()
-        return updated_doc.to_dict()
+        goal = await repository.get(goal_ref)
+        if goal is not None:
+            await GoalService._apply_contributions(uid, [goal])
+        return goal
     
     @staticmethod
-    async def delete(goal_id: str) -> bool:
-        """Delete a goal"""
-        goal_ref = goals_ref.document(goal_id)
-        doc = goal_ref.get()
-        
-        if not doc.exists:
+    async def delete(uid: str, goal_id: str) -> bool:
+        """Delete a user's goal"""
+        goal_ref = goals_ref(uid).document(goal_id)
+        goal = await repository.get(goal_ref)
+        if goal is None:
             return False
         
-        goal_ref.delete()
+        # Subcollections aren't deleted with their parent, so the shards go in the same batch
+        batch = db.batch()
+        batch.delete(goal_ref)
+        for shard_ref in contribution_shard_refs(goal_ref, goal.get('contribution_shards', 0)):
+            batch.delete(shard_ref)
+        await repository.commit(batch)
+        await versioning.bump('goals', uid=uid)
         return True
-        
+    
     @staticmethod
-    async def contribute(goal_id: str, amount: float) -> Optional[Dict[str, Any]]:
-        """Add a contribution to a goal"""
-        goal_ref = goals_ref.document(goal_id)
-        doc = goal_ref.get()
+    async def contribute(uid: str, goal_id: str, amount: float) -> Optional[Dict[str, Any]]:
+        """Add a contribution to a user's goal atomically
         
-        if not doc.exists:
-            return None
-            
-        existing_goal = doc.to_dict()
+        The goal is read and updated in one transaction, so concurrent contributions
+        are never lost and progress_percentage and is_completed match the committed
+        amount. If the transaction keeps aborting because of contention, the amount
+        is added with a blind Increment instead, which can't be lost either.
         
-        # Update current amount
-        current_amount = existing_goal.get('current_amount', 0) + amount
-        target_amount = existing_goal.get('target_amount', 0)
+        Goals with contribution_shards instead add the amount to a random counter
+        document and never write the goal itself, so their write rate isn't capped by
+        a single document. Their list version is bumped at most once per
+        SHARDED_GOAL_VERSION_DELAY for the same reason. Reads sum the shards into
+        current_amount, and progress is always recomputed from current_amount on read.
+        """
+        goal_ref = goals_ref(uid).document(goal_id)
+        try:
+            goal = await repository.run_transaction(GoalService._contribute_in_transaction, goal_ref, amount)
+        except Exception as e:
+            if not repository.is_contention(e):
+                raise
+            goal = await GoalService._contribute_blindly(goal_ref, amount)
+        if goal is None:
+            return None
         
-        # Calculate new progress percentage
-        progress_percentage = 0.0
-        if target_amount > 0:
-            progress_percentage = min(100.0, (current_amount / target_amount) * 100)
+        if goal.get('contribution_shards', 0):
+            versioning.bump_later('goals', uid=uid, delay=SHARDED_GOAL_VERSION_DELAY)
+        else:
+            await versioning.bump('goals', uid=uid)
+        await GoalService._apply_contributions(uid, [goal])
+        return goal
+    
+    @staticmethod
+    def _contribute_in_transaction(transaction, goal_ref, amount: float) -> Optional[Dict[str, Any]]:
+        """Add amount to the goal or one of its shards, returning the goal as committed"""
+        snapshot = goal_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        goal = snapshot.to_dict()
         
-        # Determine if goal is completed
-        is_completed = progress_percentage >= 100.0
+        shards = goal.get('contribution_shards', 0)
+        if shards:
+            shard_ref = contribution_shard_refs(goal_ref, shards)[random.randrange(shards)]
+            transaction.set(shard_ref, {'amount': firestore.Increment(amount)}, merge=True)
+            return goal
         
-        # Update the goal
+        current_amount = goal.get('current_amount', 0) + amount
         updates = {
             'current_amount': current_amount,
-            'progress_percentage': progress_percentage,
-            'is_completed': is_completed,
+            **GoalService._progress(current_amount, goal.get('target_amount', 0)),
             'updated_at': datetime.now().isoformat()
         }
+        transaction.update(goal_ref, updates)
+        return {**goal, **updates}
+    
+    @staticmethod
+    async def _contribute_blindly(goal_ref, amount: float) -> Optional[Dict[str, Any]]:
+        """Add amount to the goal or one of its shards with an Increment outside a transaction"""
+        goal = await repository.get(goal_ref)
+        if goal is None:
+            return None
         
-        goal_ref.update(updates)
+        shards = goal.get('contribution_shards', 0)
+        if shards:
+            shard_ref = contribution_shard_refs(goal_ref, shards)[random.randrange(shards)]
+            await repository.save(shard_ref, {'amount': firestore.Increment(amount)}, merge=True)
+            return goal
         
-        # Get and return updated document
-        updated_doc = goal_ref.get()
-        return updated_doc.to_dict()
+        try:
+            await repository.update(goal_ref, {
+                'current_amount': firestore.Increment(amount),
+                'updated_at': datetime.now().isoformat()
+            })
+        except api_exceptions.NotFound:
+            return None
+        return await repository.get(goal_ref)
+    
+    @staticmethod
+    def _reset_shards_in_transaction(transaction, goal_ref, goal_data: Dict[str, Any]) -> None:
+        """Update the goal and zero its shards together
         
+        Contributions read the goal in their transactions too, so none can land
+        between the goal's new amount and its shards being cleared.
+        """
+        snapshot = goal_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return
+        
+        transaction.update(goal_ref, goal_data)
+        for shard_ref in contribution_shard_refs(goal_ref, snapshot.to_dict().get('contribution_shards', 0)):
+            transaction.set(shard_ref, {'amount': 0.0})
+    
     @staticmethod
-    async def get_by_category(category: str, target_currency: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get goals by category with optional currency conversion"""
-        query = goals_ref.where(filter=firestore.FieldFilter("category", "==", category))
-        docs = query.stream()
-        
-        goals = []
-        for doc in docs:
-            goal = doc.to_dict()
+    async def _ensure_currency(uid: str, goals: List[Dict[str, Any]]) -> None:
+        """Backfill the default currency on legacy goals stored without one
+        
+        A no-op once CURRENCY_BACKFILL_COMPLETE is set, as backfill_currency.py has
+        then given every stored goal a currency.
+        """
+        if CURRENCY_BACKFILL_COMPLETE:
+            return
+        
+        for goal in goals:
+            if 'currency' not in goal:
+                default_currency = await CurrencyService.get_default_currency()
+                goal['currency'] = default_currency['code']
+                
+                # Update the goal in Firestore with the default currency
+                await repository.update(goals_ref(uid).document(goal['id']), {
+                    'currency': goal['currency']
+                })
+    
+    @staticmethod
+    def _progress(current_amount: float, target_amount: float) -> Dict[str, Any]:
+        """Progress percentage and completion status for an amount towards a target"""
+        progress_percentage = 0.0
+        if target_amount > 0:
+            progress_percentage = min(100.0, (current_amount / target_amount) * 100)
+        return {'progress_percentage': progress_percentage, 'is_completed': progress_percentage >= 100.0}
+    
+    @staticmethod
+    async def _apply_contributions(uid: str, goals: List[Dict[str, Any]]) -> None:
+        """Add sharded goals' shard totals to their amounts and recompute every goal's progress in place
+        
+        Every shard of every sharded goal is read in one round-trip; unsharded goals
+        cost no reads. Progress is recomputed because contributions made with a blind
+        Increment don't update the stored progress.
+        """
+        for goal in goals:
+            goal.update(GoalService._progress(goal.get('current_amount', 0), goal.get('target_amount', 0)))
+        
+        sharded = [g for g in goals if g.get('contribution_shards', 0) > 0]
+        if not sharded:
+            return
+        
+        refs_by_goal = [
+            contribution_shard_refs(goals_ref(uid).document(g['id']), g['contribution_shards'])
+            for g in sharded
+        ]
+        shards = await repository.get_many([ref for refs in refs_by_goal for ref in refs])
+        
+        start = 0
+        for goal, refs in zip(sharded, refs_by_goal):
+            contributed = sum(shard.get('amount', 0.0) for shard in shards[start:start + len(refs)] if shard)
+            start += len(refs)
             
-            # Convert currency if needed (using the same conversion logic as in get_all)
-            if target_currency and goal.get('currency') != target_currency:
-                try:
-                    # Convert target amount
-                    conversion_target = await CurrencyService.convert_currency(
-                        goal['target_amount'],
-                        goal['currency'],
-                        target_currency
-                    )
-                    
-                    # Convert current amount
-                    conversion_current = await CurrencyService.convert_currency(
-                        goal['current_amount'],
-                        goal['currency'],
-                        target_currency
-                    )
-                    
-                    # Store original values
-                    goal['original_target_amount'] = goal['target_amount']
-                    goal['original_current_amount'] = goal['current_amount']
-                    goal['original_currency'] = goal['currency']
-                    
-                    # Update with converted values
-                    goal['target_amount'] = conversion_target['converted_amount']
-                    goal['current_amount'] = conversion_current['converted_amount']
-                    goal['currency'] = target_currency
-                    
-                except Exception as e:
-                    # If conversion fails, keep original values
-                    print(f"Currency conversion error: {e}")
+            goal['current_amount'] = goal.get('current_amount', 0) + contributed
+            goal.update(GoalService._progress(goal['current_amount'], goal.get('target_amount', 0)))
+    
+    @staticmethod
+    async def _convert_all(goals: List[Dict[str, Any]], target_currency: str) -> None:
+        """Convert goals to target_currency in place, looking up each source rate once"""
+        to_convert = [g for g in goals if g.get('currency') and g['currency'] != target_currency]
+        if not to_convert:
+            return
+        
+        # Currencies that fail to convert are left out and keep their original values
+        rates = await CurrencyService.get_exchange_rates_to(
+            (g['currency'] for g in to_convert),
+            target_currency,
+            strict=False
+        )
+        
+        for goal in to_convert:
+            rate = rates.get(goal['currency'])
+            if rate is None:
+                continue
             
-            goals.append(goal)
+            # Store original values
+            goal['original_target_amount'] = goal['target_amount']
+            goal['original_current_amount'] = goal['current_amount']
+            goal['original_currency'] = goal['currency']
             
-        return goals 
\ No newline at end of file
+            # Update with converted values
+            goal['target_amount'] = goal['target_amount'] * rate
+            goal['current_amount'] = goal['current_amount'] * rate
+            goal['currency'] = target_currency
\ No newline at end of file
@@ -1,20 +1,32 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
 import uuid
-from datetime import datetime, date, timedelta
-import calendar
+from datetime import datetime, date
 from firebase_admin import firestore
-from app.core.config import db
-from app.services.transaction_service import TransactionService
+from app.core.config import db, RECURRING_GENERATION_CONCURRENCY, DEFAULT_CURRENCY_CODE
+from app.core import repository, versioning
+from app.core.tenancy import user_collection, owner_of
+from app.services.transaction_service import transactions_ref
+from app.services.currency_service import CurrencyService
+from app.services.aggregate_service import SpendingAggregateService
+from app.services.snapshot_service import TransactionSnapshotService
+from app.utils.recurrence import RecurrenceSchedule
 
 # Collection reference
-recurring_transactions_ref = db.collection('recurring_transactions')
+def recurring_transactions_ref(uid: str):
+    """A user's recurring transactions"""
+    return user_collection(uid, 'recurring_transactions')
+
+# Occurrences written per transaction; each may also touch one aggregate document,
+# and the rule's last_generated update takes one more write
+GENERATION_CHUNK_SIZE = (repository.BATCH_SIZE - 1) // 2
 
 class RecurringTransactionService:
-    """Service for managing recurring transactions in Firebase"""
+    """Service for managing each user's recurring transactions in Firebase"""
     
     @staticmethod
-    async def create(transaction_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new recurring transaction"""
+    async def create(uid: str, transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new recurring transaction for a user"""
         # Generate a unique ID
         transaction_id = str(uuid.uuid4())
         
@@ -30,37 +42,39 @@ class RecurringTransactionService:
         transaction_data['created_at'] = datetime.now().isoformat()
         
         # Save to Firestore
-        recurring_transactions_ref.document(transaction_id).set(transaction_data)
+        await repository.save(recurring_transactions_ref(uid).document(transaction_id), transaction_data)
+        await versioning.bump('recurring_transactions', uid=uid)
         
         return transaction_data
     
     @staticmethod
-    async def get_all() -> List[Dict[str, Any]]:
-        """Get all recurring transactions"""
-        docs = recurring_transactions_ref.stream()
-        
-        transactions = []
-        for doc in docs:
-            transaction = doc.to_dict()
-            transactions.append(transaction)
-            
-        return transactions
+    async def get_rules(uid: str) -> List[Dict[str, Any]]:
+        """Get every one of a user's recurring transactions, for generation and forecasting
+        
+        List endpoints page through them with get_page instead.
+        """
+        return await repository.stream(recurring_transactions_ref(uid))
     
     @staticmethod
-    async def get_by_id(transaction_id: str) -> Optional[Dict[str, Any]]:
-        """Get a recurring transaction by ID"""
-        doc = recurring_transactions_ref.document(transaction_id).get()
-        if doc.exists:
-            return doc.to_dict()
-        return None
+    async def get_page(uid: str, limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of a user's recurring transactions in creation order
+        
+        Pages are ordered by (created_at, document ID) and continue after the opaque cursor
+        returned with the previous page. Returns the page and the next cursor, or
+        None on the last page.
+        """
+        return await repository.paginate(recurring_transactions_ref(uid), ['created_at', repository.DOCUMENT_ID], limit, cursor)
     
     @staticmethod
-    async def update(transaction_id: str, transaction_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update a recurring transaction"""
-        transaction_ref = recurring_transactions_ref.document(transaction_id)
-        doc = transaction_ref.get()
-        
-        if not doc.exists:
+    async def get_by_id(uid: str, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user's recurring transaction by ID"""
+        return await repository.get(recurring_transactions_ref(uid).document(transaction_id))
+    
+    @staticmethod
+    async def update(uid: str, transaction_id: str, transaction_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a user's recurring transaction"""
+        transaction_ref = recurring_transactions_ref(uid).document(transaction_id)
+        if await repository.get(transaction_ref) is None:
             return None
         
         # Convert dates to ISO strings
@@ -74,93 +88,71 @@ class RecurringTransactionService:
         transaction_data['updated_at'] = datetime.now().isoformat()
         
         # Update in Firestore
-        transaction_ref.update(transaction_data)
+        await repository.update(transaction_ref, transaction_data)
+        await versioning.bump('recurring_transactions', uid=uid)
         
         # Get and return updated document
-        updated_doc = transaction_ref.get()
-        return updated_doc.to_dict()
+        return await repository.get(transaction_ref)
     
     @staticmethod
-    async def delete(transaction_id: str) -> bool:
-        """Delete a recurring transaction"""
-        transaction_ref = recurring_transactions_ref.document(transaction_id)
-        doc = transaction_ref.get()
-        
-        if not doc.exists:
+    async def delete(uid: str, transaction_id: str) -> bool:
+        """Delete a user's recurring transaction"""
+        transaction_ref = recurring_transactions_ref(uid).document(transaction_id)
+        if await repository.get(transaction_ref) is None:
             return False
         
-        transaction_ref.delete()
+        await repository.delete(transaction_ref)
+        await versioning.bump('recurring_transactions', uid=uid)
         return True
     
     @staticmethod
-    async def generate_transactions() -> Dict[str, Any]:
-        """Generate transactions for all recurring transactions 
-        that need to be created since their last generation"""
-        recurring_transactions = await RecurringTransactionService.get_all()
+    async def generate_transactions(uid: Optional[str] = None) -> Dict[str, Any]:
+        """Generate transactions for one user's recurring transactions, or every user's,
+        that need to be created since their last generation
+        
+        Rules are processed concurrently, at most RECURRING_GENERATION_CONCURRENCY
+        at a time; a failing rule is reported in 'errors' without stopping the others.
+        """
+        if uid is not None:
+            rules = [(uid, recurring) for recurring in await RecurringTransactionService.get_rules(uid)]
+        else:
+            rules = await RecurringTransactionService._get_all_users_rules()
         
         now = datetime.now().date()
         transactions_created = 0
         errors = []
         
-        for recurring in recurring_transactions:
-            try:
-                # Parse dates
-                start_date = datetime.fromisoformat(recurring['start_date']).date()
-                end_date = None
-                if recurring.get('end_date'):
-                    end_date = datetime.fromisoformat(recurring['end_date']).date()
-                
-                # Skip if end_date is in the past
-                if end_date and end_date < now:
-                    continue
-                
-                # Determine the last date a transaction was generated
-                last_generated = None
-                if recurring.get('last_generated'):
-                    last_generated = datetime.fromisoformat(recurring['last_generated']).date()
-                else:
-                    last_generated = start_date - timedelta(days=1)  # Day before start to include start date
-                
-                # Determine dates to generate
-                dates_to_generate = RecurringTransactionService._get_dates_to_generate(
-                    recurring['frequency'],
-                    last_generated,
-                    now,
-                    recurring.get('day_of_week'),
-                    recurring.get('day_of_month'),
-                    recurring.get('month_of_year'),
-                    end_date
-                )
-                
-                # Create transactions for each date
-                for generation_date in dates_to_generate:
-                    # Skip if date is before start_date or after end_date
-                    if generation_date < start_date or (end_date and generation_date > end_date):
-                        continue
-                    
-                    # Create transaction with the date
-                    transaction_data = {
-                        'amount': recurring['amount'],
-                        'category': recurring['category'],
-                        'description': recurring['description'],
-                        'is_income': recurring['is_income'],
-                        'date': generation_date.isoformat(),
-                        'recurring_transaction_id': recurring['id']  # Reference to the recurring transaction
-                    }
-                    
-                    await TransactionService.create(transaction_data)
-                    transactions_created += 1
-                
-                # Update last_generated date
-                if dates_to_generate:
-                    await RecurringTransactionService.update(
-                        recurring['id'], 
-                        {'last_generated': now.isoformat()}
-                    )
-                
-            except Exception as e:
-                errors.append(f"Error processing recurring transaction {recurring.get('id')}: {str(e)}")
+        # Resolve the currency for generated transactions once per run
+        default_currency = await CurrencyService.get_default_currency()
+        currency = default_currency['code'] if default_currency else DEFAULT_CURRENCY_CODE
+        
+        semaphore = asyncio.Semaphore(RECURRING_GENERATION_CONCURRENCY)
+        
+        async def _generate(owner: str, recurring: Dict[str, Any]) -> Tuple[bool, int]:
+            async with semaphore:
+                return await RecurringTransactionService._generate_for_rule(owner, recurring, now, currency)
+        
+        results = await asyncio.gather(
+            *(_generate(owner, recurring) for owner, recurring in rules),
+            return_exceptions=True
+        )
+        
+        # Owners with a rule that advanced last_generated, and how many transactions they got
+        created_by_user = {}
+        for (owner, recurring), result in zip(rules, results):
+            if isinstance(result, Exception):
+                errors.append(f"Error processing recurring transaction {recurring.get('id')}: {str(result)}")
                 continue
+            
+            advanced, created = result
+            transactions_created += created
+            if advanced:
+                created_by_user[owner] = created_by_user.get(owner, 0) + created
+        
+        for owner, created in created_by_user.items():
+            await versioning.bump('recurring_transactions', uid=owner)
+            if created:
+                await versioning.bump('transactions', uid=owner)
                 
         return {
             'transactions_created': transactions_created,
@@ -168,86 +160,97 @@ class RecurringTransactionService:
         }
     
     @staticmethod
-    def _get_dates_to_generate(
-        frequency: str,
-        last_generated: date,
-        current_date: date,
-        day_of_week: Optional[int] = None,
-        day_of_month: Optional[int] = None,
-        month_of_year: Optional[int] = None,
-        end_date: Optional[date] = None
-    ) -> List[date]:
-        """Get dates to generate transactions for based on frequency and last generation date"""
-        dates = []
-        
-        if frequency == 'daily':
-            # For daily, generate all days between last_generated and current_date
-            delta = current_date - last_generated
-            for i in range(1, delta.days + 1):  # +1 to include current_date
-                generation_date = last_generated + timedelta(days=i)
-                if end_date and generation_date > end_date:
-                    break
-                dates.append(generation_date)
-                
-        elif frequency == 'weekly' and day_of_week is not None:
-            # For weekly, find all matching days of week between last_generated and current_date
-            next_date = last_generated + timedelta(days=1)
-            
-            # Find the next occurrence of the day of week
-            # In Python, weekday() returns 0 for Monday, 6 for Sunday
-            # The day_of_week param uses the same convention (0=Monday, 6=Sunday)
-            days_ahead = (day_of_week - next_date.weekday()) % 7
-            next_date = next_date + timedelta(days=days_ahead)
-            
-            # Add all weekly occurrences up to current_date
-            while next_date <= current_date:
-                if end_date and next_date > end_date:
-                    break
-                dates.append(next_date)
-                next_date += timedelta(days=7)
-                
-        elif frequency == 'monthly' and day_of_month is not None:
-            # For monthly, find all matching days of month between last_generated and current_date
-            next_month = last_generated.replace(day=1) + timedelta(days=32)
-            next_month = next_month.replace(day=1)  # First day of next month
-            
-            while (next_month.year, next_month.month) <= (current_date.year, current_date.month):
-                # Get the correct day, accounting for different month lengths
-                last_day = calendar.monthrange(next_month.year, next_month.month)[1]
-                day = min(day_of_month, last_day)
-                
-                try:
-                    generation_date = next_month.replace(day=day)
-                    if generation_date > last_generated and generation_date <= current_date:
-                        if end_date and generation_date > end_date:
-                            break
-                        dates.append(generation_date)
-                except ValueError:
-                    # Skip invalid dates (e.g., February 30)
-                    pass
-                
-                # Move to next month
-                next_month = (next_month.replace(day=1) + timedelta(days=32)).replace(day=1)
-                
-        elif frequency == 'yearly' and day_of_month is not None and month_of_year is not None:
-            # For yearly, find all matching days in the specified month between last_generated and current_date
-            current_year = last_generated.year
+    async def _get_all_users_rules() -> List[Tuple[str, Dict[str, Any]]]:
+        """Get every user's recurring transactions with their owner's uid
+        
+        One collection group query across all users; legacy top-level rules that
+        have not been moved under a user are skipped.
+        """
+        def _collect():
+            return [
+                (owner_of(doc.reference), doc.to_dict())
+                for doc in db.collection_group('recurring_transactions').stream()
+                if owner_of(doc.reference) is not None
+            ]
+        
+        return await repository.run(_collect)
+    
+    @staticmethod
+    async def _generate_for_rule(uid: str, recurring: Dict[str, Any], now: date, currency: str) -> Tuple[bool, int]:
+        """Write the missing occurrences of one of a user's recurring transactions up to now
+        
+        Occurrences get deterministic IDs ('<recurring id>_<date>') and are written in
+        chunked transactions that also advance last_generated, so rerunning after a
+        partial failure never duplicates a transaction. Returns whether the rule was
+        written (last_generated advanced) and the number of transactions created.
+        """
+        try:
+            schedule = RecurrenceSchedule.from_rule(recurring)
+        except ValueError:
+            # Rules missing the fields their frequency needs generate nothing
+            return False, 0
+        
+        # Skip if end_date is in the past
+        if schedule.end_date and schedule.end_date < now:
+            return False, 0
+        
+        # Determine the last date a transaction was generated; None starts at start_date
+        last_generated = None
+        if recurring.get('last_generated'):
+            last_generated = datetime.fromisoformat(recurring['last_generated']).date()
+        
+        occurrences = list(schedule.between(last_generated, now))
+        
+        # Nothing due since the last run, so last_generated stays where it is
+        if not occurrences:
+            return False, 0
+        
+        created_at = datetime.now().isoformat()
+        transactions = [
+            {
+                'id': f"{recurring['id']}_{generation_date.isoformat()}",
+                'amount': recurring['amount'],
+                'category': recurring['category'],
+                'description': recurring['description'],
+                'is_income': recurring['is_income'],
+                'date': generation_date.isoformat(),
+                'currency': currency,
+                'recurring_transaction_id': recurring['id'],  # Reference to the recurring transaction
+                'created_at': created_at
+            }
+            for generation_date in occurrences
+        ]
+        
+        recurring_ref = recurring_transactions_ref(uid).document(recurring['id'])
+        created = 0
+        
+        for start in range(0, len(transactions), GENERATION_CHUNK_SIZE):
+            chunk = transactions[start:start + GENERATION_CHUNK_SIZE]
+            is_last = start + GENERATION_CHUNK_SIZE >= len(transactions)
+            last_generated_date = now.isoformat() if is_last else chunk[-1]['date']
             
-            while current_year <= current_date.year:
-                # Get the correct day, accounting for different month lengths
-                last_day = calendar.monthrange(current_year, month_of_year)[1]
-                day = min(day_of_month, last_day)
-                
-                try:
-                    generation_date = date(current_year, month_of_year, day)
-                    if generation_date > last_generated and generation_date <= current_date:
-                        if end_date and generation_date > end_date:
-                            break
-                        dates.append(generation_date)
-                except ValueError:
-                    # Skip invalid dates
-                    pass
-                
-                current_year += 1
-                
-        return dates 
\ No newline at end of file
+            new = await repository.run_transaction(
+                RecurringTransactionService._write_occurrences, uid, recurring_ref, chunk, last_generated_date
+            )
+            TransactionSnapshotService.record_writes(uid, added=new)
+            created += len(new)
+        
+        return True, created
+    
+    @staticmethod
+    def _write_occurrences(transaction, uid: str, recurring_ref, chunk: List[Dict[str, Any]], last_generated_date: str) -> List[Dict[str, Any]]:
+        """Create the occurrences that don't exist yet and advance last_generated in one transaction"""
+        refs = [transactions_ref(uid).document(data['id']) for data in chunk]
+        existing = {snapshot.id for snapshot in transaction.get_all(refs) if snapshot.exists}
+        new = [data for data in chunk if data['id'] not in existing]
+        
+        for data in new:
+            transaction.set(transactions_ref(uid).document(data['id']), data)
+        SpendingAggregateService.stage(transaction, uid, SpendingAggregateService.compute_deltas(added=new))
+        
+        transaction.update(recurring_ref, {
+            'last_generated': last_generated_date,
+            'updated_at': datetime.now().isoformat()
+        })
+        
+        return new
@@ -0,0 +1,144 @@
+from typing import Dict, Any, Optional
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from app.core.config import db, RECURRING_GENERATION_SCHEDULE, SCHEDULER_LEASE_SECONDS
+from app.core import repository
+from app.services.recurring_transaction_service import RecurringTransactionService
+from app.utils.cron import CronSchedule
+
+# Collection reference
+scheduler_locks_ref = db.collection('scheduler_locks')
+
+# Lease document shared by every worker and instance
+GENERATION_LOCK_ID = 'recurring_generation'
+
+# Identifies this worker process as a lease holder
+_holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_task: Optional[asyncio.Task] = None
+_stats: Dict[str, Any] = {
+    'schedule': RECURRING_GENERATION_SCHEDULE,
+    'runs': 0,
+    'skipped': 0,
+    'failures': 0,
+    'next_run_at': None,
+    'last_run_at': None,
+    'last_run_duration_seconds': None,
+    'last_run_lag_seconds': None,
+    'last_result': None
+}
+
+class SchedulerService:
+    """In-process scheduler that generates recurring transactions on a cron cadence
+    
+    Every worker runs the loop, but each scheduled run is claimed through a lease
+    document in Firestore, so only one worker or instance generates per slot.
+    """
+    
+    @staticmethod
+    def start() -> None:
+        """Start the scheduler loop on the running event loop
+        
+        Raises ValueError for an invalid RECURRING_GENERATION_SCHEDULE.
+        """
+        global _task
+        if _task is None or _task.done():
+            schedule = CronSchedule(RECURRING_GENERATION_SCHEDULE)
+            _task = asyncio.create_task(SchedulerService._run_loop(schedule))
+    
+    @staticmethod
+    async def stop() -> None:
+        """Cancel the scheduler loop and wait for it to exit"""
+        global _task
+        if _task is None:
+            return
+        
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+    
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        """Return the run counters and the last run's duration, lag and result"""
+        return dict(_stats)
+    
+    @staticmethod
+    async def run_once(slot: datetime) -> Optional[Dict[str, Any]]:
+        """Generate recurring transactions for a scheduled slot if this worker wins the lease
+        
+        Returns the generation result, or None when another worker already claimed
+        the slot or still holds the lease.
+        """
+        lock_ref = scheduler_locks_ref.document(GENERATION_LOCK_ID)
+        acquired = await repository.run_transaction(
+            SchedulerService._acquire, lock_ref, slot.isoformat(), time.time() + SCHEDULER_LEASE_SECONDS
+        )
+        if not acquired:
+            _stats['skipped'] += 1
+            return None
+        
+        started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            result = await RecurringTransactionService.generate_transactions()
+        except Exception:
+            _stats['failures'] += 1
+            raise
+        finally:
+            _stats['runs'] += 1
+            _stats['last_run_at'] = started_at.isoformat()
+            _stats['last_run_duration_seconds'] = time.perf_counter() - started
+            _stats['last_run_lag_seconds'] = (started_at - slot).total_seconds()
+            await repository.run_transaction(SchedulerService._release, lock_ref)
+        
+        _stats['last_result'] = {
+            'transactions_created': result['transactions_created'],
+            'errors': len(result['errors'])
+        }
+        return result
+    
+    @staticmethod
+    async def _run_loop(schedule: CronSchedule) -> None:
+        """Sleep until each scheduled slot and run generation for it"""
+        while True:
+            slot = schedule.next_after(datetime.now())
+            _stats['next_run_at'] = slot.isoformat()
+            await asyncio.sleep(max((slot - datetime.now()).total_seconds(), 0))
+            
+            try:
+                await SchedulerService.run_once(slot)
+            except Exception as e:
+                print(f"Error running scheduled transaction generation: {e}")
+    
+    @staticmethod
+    def _acquire(transaction, lock_ref, slot: str, expires_at: float) -> bool:
+        """Claim the lease for a slot unless it already ran or another holder's lease is live"""
+        snapshot = lock_ref.get(transaction=transaction)
+        lock = snapshot.to_dict() if snapshot.exists else {}
+        
+        if lock.get('last_slot') and lock['last_slot'] >= slot:
+            return False
+        if lock.get('holder') not in (None, _holder) and lock.get('expires_at', 0) > time.time():
+            return False
+        
+        transaction.set(lock_ref, {
+            'holder': _holder,
+            'expires_at': expires_at,
+            'last_slot': slot,
+            'acquired_at': datetime.now().isoformat()
+        })
+        return True
+    
+    @staticmethod
+    def _release(transaction, lock_ref) -> None:
+        """Give up the lease if this worker still holds it"""
+        snapshot = lock_ref.get(transaction=transaction)
+        if snapshot.exists and snapshot.get('holder') == _holder:
+            transaction.update(lock_ref, {'holder': None, 'expires_at': 0})
@@ -0,0 +1,139 @@
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import date
+from threading import Lock
+from app.core.config import COLUMNAR_CACHE_TTL, COLUMNAR_CACHE_MAX_USERS, DEFAULT_CURRENCY_CODE
+from app.core import repository
+from app.core.tenancy import user_collection
+from app.services.aggregate_service import AGGREGATED_FIELDS
+from app.services.currency_service import CurrencyService
+from app.utils.columnar import TransactionColumns
+
+class _Snapshot:
+    """One user's columns and the state of loading them"""
+    
+    def __init__(self):
+        self.columns: Optional[TransactionColumns] = None
+        self.loaded_at = 0.0
+        # Writes recorded while a load is scanning, replayed once it finishes
+        self.pending: Optional[List[Tuple[List[Dict[str, Any]], List[str]]]] = None
+        self.load_lock = asyncio.Lock()
+
+# Snapshots by uid, least recently used first
+_snapshots: 'OrderedDict[str, _Snapshot]' = OrderedDict()
+_loads = 0
+_columns_lock = Lock()
+
+class TransactionSnapshotService:
+    """Lazily loaded columnar snapshots of each user's transactions for analytics and budget math
+    
+    A user's snapshot is loaded on first use with one field-projected scan of their
+    transactions and kept current by the transaction write paths through
+    record_writes. It is reloaded after COLUMNAR_CACHE_TTL seconds to pick up
+    writes made by other workers, and at most COLUMNAR_CACHE_MAX_USERS snapshots
+    are kept, evicting the least recently used.
+    """
+    
+    @staticmethod
+    async def group_totals(
+        uid: str,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        group_by: str = 'category'
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Sum a user's income, expenses and counts per (group, currency) over [date_from, date_to)"""
+        columns = await TransactionSnapshotService._get_columns(uid)
+        with _columns_lock:
+            return columns.group_totals(date_from, date_to, group_by)
+    
+    @staticmethod
+    def record_writes(uid: str, added: Iterable[Dict[str, Any]] = (), removed_ids: Iterable[str] = ()) -> None:
+        """Apply a user's committed transaction writes to their snapshot if it is loaded or loading"""
+        added = list(added)
+        removed_ids = list(removed_ids)
+        
+        with _columns_lock:
+            snapshot = _snapshots.get(uid)
+            if snapshot is None:
+                return
+            if snapshot.pending is not None:
+                snapshot.pending.append((added, removed_ids))
+            if snapshot.columns is None:
+                return
+            
+            for transaction_id in removed_ids:
+                snapshot.columns.remove(transaction_id)
+            snapshot.columns.extend(added)
+    
+    @staticmethod
+    def invalidate(uid: Optional[str] = None) -> None:
+        """Drop a user's snapshot, or every snapshot, so the next query reloads it"""
+        with _columns_lock:
+            if uid is None:
+                _snapshots.clear()
+            else:
+                _snapshots.pop(uid, None)
+    
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        """Return the number of loaded snapshots and their total size and memory use"""
+        with _columns_lock:
+            loaded = [snapshot.columns for snapshot in _snapshots.values() if snapshot.columns is not None]
+            return {
+                'users': len(loaded),
+                'max_users': COLUMNAR_CACHE_MAX_USERS,
+                'loads': _loads,
+                'rows': sum(len(columns) for columns in loaded),
+                'bytes': sum(columns.nbytes for columns in loaded)
+            }
+    
+    @staticmethod
+    async def _get_columns(uid: str) -> TransactionColumns:
+        """Return a user's snapshot, loading it first if it is missing or older than the TTL"""
+        with _columns_lock:
+            snapshot = _snapshots.get(uid)
+            if snapshot is None:
+                snapshot = _snapshots[uid] = _Snapshot()
+                while len(_snapshots) > COLUMNAR_CACHE_MAX_USERS:
+                    _snapshots.popitem(last=False)
+            _snapshots.move_to_end(uid)
+        
+        async with snapshot.load_lock:
+            if snapshot.columns is None or time.monotonic() - snapshot.loaded_at > COLUMNAR_CACHE_TTL:
+                await TransactionSnapshotService._load(uid, snapshot)
+            return snapshot.columns
+    
+    @staticmethod
+    async def _load(uid: str, snapshot: _Snapshot) -> None:
+        """Scan a user's transactions into fresh columns and swap them in"""
+        global _loads
+        
+        default_currency = await CurrencyService.get_default_currency()
+        default_code = default_currency['code'] if default_currency else DEFAULT_CURRENCY_CODE
+        
+        with _columns_lock:
+            snapshot.pending = []
+        
+        columns = TransactionColumns()
+        try:
+            query = user_collection(uid, 'transactions').select(['id'] + AGGREGATED_FIELDS)
+            async for chunk in repository.iter_chunks(query):
+                columns.extend(chunk, default_code)
+        except Exception:
+            with _columns_lock:
+                snapshot.pending = None
+            raise
+        
+        with _columns_lock:
+            # Writes committed during the scan may or may not be in it; replaying is idempotent
+            for added, removed_ids in snapshot.pending:
+                for transaction_id in removed_ids:
+                    columns.remove(transaction_id)
+                columns.extend(added, default_code)
+            
+            snapshot.pending = None
+            snapshot.columns = columns
+            snapshot.loaded_at = time.monotonic()
+            _loads += 1
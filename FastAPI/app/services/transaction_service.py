@@ -1,19 +1,45 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, AsyncIterator, BinaryIO
+import asyncio
+import csv
+import io
+import itertools
+import json
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, date
 from firebase_admin import firestore
-from app.core.config import db
+from app.core.config import db, BULK_IMPORT_CONCURRENCY, CURRENCY_BACKFILL_COMPLETE
+from app.core import repository, versioning
+from app.core.tenancy import user_collection
+from app.models.transaction import TransactionBase
+from app.utils.formatting import format_category
 from app.services.currency_service import CurrencyService
+from app.services.aggregate_service import SpendingAggregateService
+from app.services.snapshot_service import TransactionSnapshotService
 
 # Collection references
-transactions_ref = db.collection('transactions')
+def transactions_ref(uid: str):
+    """A user's transactions"""
+    return user_collection(uid, 'transactions')
+
+# Columns written by CSV exports, in order
+EXPORT_FIELDS = [
+    'id', 'date', 'amount', 'currency', 'category', 'description', 'is_income',
+    'original_amount', 'original_currency', 'created_at', 'updated_at'
+]
+
+# Cap on per-row errors listed in a bulk import report
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+# Character that invalid UTF-8 in an import file decodes to
+UNDECODABLE = '\ufffd'
 
 class TransactionService:
-    """Service for managing transactions in Firebase"""
+    """Service for managing each user's transactions in Firebase"""
     
     @staticmethod
-    async def create(transaction_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new transaction in Firestore"""
+    async def create(uid: str, transaction_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a new transaction for a user in Firestore"""
         # Generate a unique ID
         transaction_id = str(uuid.uuid4())
         
@@ -26,75 +52,279 @@ class TransactionService:
             default_currency = await CurrencyService.get_default_currency()
             transaction_data['currency'] = default_currency['code']
         
-        # Save to Firestore
-        transactions_ref.document(transaction_id).set(transaction_data)
+        # Save to Firestore together with the spending aggregate increments
+        batch = db.batch()
+        batch.set(transactions_ref(uid).document(transaction_id), transaction_data)
+        SpendingAggregateService.stage(batch, uid, SpendingAggregateService.compute_deltas(added=[transaction_data]))
+        await repository.commit(batch)
+        TransactionSnapshotService.record_writes(uid, added=[transaction_data])
+        await versioning.bump('transactions', uid=uid)
         
         return transaction_data
     
     @staticmethod
-    async def get_all(limit: int = 100, target_currency: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all transactions with optional limit and currency conversion"""
-        query = transactions_ref.limit(limit)
-        docs = query.stream()
+    async def bulk_import(uid: str, file: BinaryIO, import_format: str = 'ndjson') -> Dict[str, Any]:
+        """Validate and import a user's transactions from an NDJSON or CSV file with batched writes
         
-        transactions = []
-        for doc in docs:
-            transaction = doc.to_dict()
-            
-            # Ensure transaction has a currency field
-            if 'currency' not in transaction:
-                # Get default currency
-                default_currency = await CurrencyService.get_default_currency()
-                transaction['currency'] = default_currency['code']
+        Rows are read and validated against TransactionBase a chunk at a time, so
+        the file is never fully materialized. Valid rows are packed into WriteBatches
+        of up to 500 writes, including their spending aggregate increments, and up
+        to BULK_IMPORT_CONCURRENCY batches are committed concurrently.
+        
+        Returns counts, per-row errors (1-based row numbers, capped at
+        MAX_REPORTED_IMPORT_ERRORS) and throughput.
+        """
+        started = time.perf_counter()
+        records = TransactionService._parse_import(file, import_format)
+        chunk_rows = repository.BATCH_SIZE * BULK_IMPORT_CONCURRENCY
+        semaphore = asyncio.Semaphore(BULK_IMPORT_CONCURRENCY)
+        
+        imported = 0
+        errors = []
+        
+        async def _commit(rows: List[Tuple[int, Dict[str, Any]]]) -> Tuple[int, List[Dict[str, Any]]]:
+            async with semaphore:
+                batch = db.batch()
+                for _, data in rows:
+                    batch.set(transactions_ref(uid).document(data['id']), data)
+                SpendingAggregateService.stage(
+                    batch, uid, SpendingAggregateService.compute_deltas(added=[data for _, data in rows])
+                )
                 
-                # Update the transaction in Firestore with the default currency
-                transactions_ref.document(transaction['id']).update({
-                    'currency': transaction['currency']
-                })
-            
-            # Convert currency if target_currency is specified and different from transaction currency
-            if target_currency and transaction.get('currency') != target_currency:
                 try:
-                    conversion = await CurrencyService.convert_currency(
-                        transaction['amount'],
-                        transaction['currency'],
-                        target_currency
-                    )
-                    
-                    # Store original values
-                    transaction['original_amount'] = transaction['amount']
-                    transaction['original_currency'] = transaction['currency']
-                    
-                    # Update with converted values
-                    transaction['amount'] = conversion['converted_amount']
-                    transaction['currency'] = target_currency
+                    await repository.commit(batch)
+                    TransactionSnapshotService.record_writes(uid, added=[data for _, data in rows])
+                    return len(rows), []
                 except Exception as e:
-                    # If conversion fails, keep original values
-                    print(f"Currency conversion error: {e}")
+                    return 0, [{'row': row, 'error': f"Write failed: {e}"} for row, _ in rows]
+        
+        while True:
+            # Parse and validate the next chunk off the event loop
+            consumed, prepared, failed = await repository.run(
+                TransactionService._prepare_import_chunk, records, chunk_rows
+            )
+            errors.extend(failed)
             
-            transactions.append(transaction)
+            results = await asyncio.gather(
+                *(_commit(rows) for rows in TransactionService._pack_import_batches(prepared))
+            )
+            for count, failed_writes in results:
+                imported += count
+                errors.extend(failed_writes)
             
+            if consumed < chunk_rows:
+                break
+        
+        if imported:
+            await versioning.bump('transactions', uid=uid)
+        
+        elapsed = time.perf_counter() - started
+        return {
+            'imported': imported,
+            'failed': len(errors),
+            'errors': sorted(errors, key=lambda e: e['row'])[:MAX_REPORTED_IMPORT_ERRORS],
+            'elapsed_seconds': elapsed,
+            'rows_per_second': imported / elapsed if elapsed > 0 else 0.0
+        }
+    
+    @staticmethod
+    def _parse_import(file: BinaryIO, import_format: str):
+        """Lazily yield (row number, record or parse error) from an NDJSON or CSV file
+        
+        Bytes that aren't valid UTF-8 are decoded as U+FFFD, and rows containing it
+        are reported as errors rather than failing the import after earlier chunks
+        were committed.
+        """
+        text = io.TextIOWrapper(file, encoding='utf-8', errors='replace', newline='')
+        
+        if import_format == 'csv':
+            for row_number, record in enumerate(csv.DictReader(text), start=1):
+                if any(UNDECODABLE in str(cell) for item in record.items() for cell in item):
+                    yield row_number, ValueError("Invalid UTF-8")
+                    continue
+                # Empty cells fall back to model defaults; cells without a header are dropped
+                yield row_number, {k: v for k, v in record.items() if k is not None and v != ''}
+            return
+        
+        for row_number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            if UNDECODABLE in line:
+                yield row_number, ValueError("Invalid UTF-8")
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e}")
+    
+    @staticmethod
+    def _prepare_import_chunk(records, chunk_rows: int) -> Tuple[int, List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+        """Validate the next chunk_rows records into transaction documents
+        
+        Returns how many records were consumed, the valid documents with their row
+        numbers, and the errors for invalid rows.
+        """
+        now = datetime.now().isoformat()
+        consumed = 0
+        prepared = []
+        failed = []
+        
+        for row_number, record in itertools.islice(records, chunk_rows):
+            consumed += 1
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                
+                transaction_data = TransactionBase.model_validate(record).model_dump()
+                date.fromisoformat(transaction_data['date'][:10])
+            except ValueError as e:
+                failed.append({'row': row_number, 'error': str(e)})
+                continue
+            
+            transaction_data['category'] = format_category(transaction_data['category'])
+            transaction_data['id'] = str(uuid.uuid4())
+            transaction_data['created_at'] = now
+            prepared.append((row_number, transaction_data))
+        
+        return consumed, prepared, failed
+    
+    @staticmethod
+    def _pack_import_batches(rows: List[Tuple[int, Dict[str, Any]]]) -> List[List[Tuple[int, Dict[str, Any]]]]:
+        """Group rows so each batch's transaction and aggregate writes fit in one commit"""
+        batches = []
+        current = []
+        aggregate_ids = set()
+        
+        for row in rows:
+            data = row[1]
+            aggregate_id = SpendingAggregateService.aggregate_id(data['category'], data['date'][:7], data['currency'])
+            writes = len(current) + 1 + len(aggregate_ids | {aggregate_id})
+            
+            if current and writes > repository.BATCH_SIZE:
+                batches.append(current)
+                current = []
+                aggregate_ids = set()
+            
+            current.append(row)
+            aggregate_ids.add(aggregate_id)
+        
+        if current:
+            batches.append(current)
+        return batches
+    
+    @staticmethod
+    async def get_page(
+        uid: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        target_currency: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of a user's transactions, newest first, with optional category filter and currency conversion
+        
+        Pages are ordered by (date, document ID) and continue after the opaque cursor
+        returned with the previous page. Returns the page and the next cursor, or None
+        on the last page. Filtering by category uses the (category, date) composite
+        index in React/finance-app/firestore.indexes.json.
+        """
+        query = transactions_ref(uid)
+        if category is not None:
+            query = query.where(filter=firestore.FieldFilter("category", "==", category))
+        
+        transactions, next_cursor = await repository.paginate(
+            query, ['date', repository.DOCUMENT_ID], limit, cursor, descending=True
+        )
+        
+        # Ensure every transaction has a currency field
+        await TransactionService._ensure_currency(uid, transactions)
+        
+        # Convert currency if target_currency is specified, resolving each rate once
+        if target_currency:
+            await TransactionService._convert_all(transactions, target_currency)
+        
+        return transactions, next_cursor
+    
+    @staticmethod
+    async def query(
+        uid: str,
+        category: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        is_income: Optional[bool] = None,
+        target_currency: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a user's transactions matching the given filters, evaluated by Firestore
+        
+        date_from is inclusive and date_to is exclusive. Both are ISO date strings,
+        which order chronologically, so the range is a Firestore range query on
+        'date'. Combining it with category or is_income uses the composite indexes
+        in React/finance-app/firestore.indexes.json.
+        """
+        query = transactions_ref(uid)
+        
+        if category is not None:
+            query = query.where(filter=firestore.FieldFilter("category", "==", category))
+        if is_income is not None:
+            query = query.where(filter=firestore.FieldFilter("is_income", "==", is_income))
+        if date_from is not None:
+            query = query.where(filter=firestore.FieldFilter("date", ">=", date_from))
+        if date_to is not None:
+            query = query.where(filter=firestore.FieldFilter("date", "<", date_to))
+        
+        transactions = await repository.stream(query)
+        
+        # Convert currency if target_currency is specified, resolving each rate once
+        if target_currency:
+            await TransactionService._convert_all(transactions, target_currency)
+        
         return transactions
     
     @staticmethod
-    async def get_by_id(transaction_id: str, target_currency: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """Get a transaction by ID with optional currency conversion"""
-        doc = transactions_ref.document(transaction_id).get()
-        if not doc.exists:
-            return None
+    async def export(
+        uid: str,
+        export_format: str = 'ndjson',
+        target_currency: Optional[str] = None,
+        chunk_size: int = repository.BATCH_SIZE
+    ) -> AsyncIterator[str]:
+        """Stream every transaction of a user as NDJSON lines or CSV rows, one chunk at a time
+        
+        Only one chunk of documents is held in memory. Exchange rates are looked
+        up once per source currency for the whole export, so every chunk is
+        converted with the same rates.
+        """
+        rates = {}
+        
+        if export_format == 'csv':
+            yield TransactionService._to_csv([], header=True)
+        
+        async for transactions in repository.iter_chunks(transactions_ref(uid), chunk_size):
+            if target_currency:
+                await TransactionService._convert_all(transactions, target_currency, rates)
             
-        transaction = doc.to_dict()
+            if export_format == 'csv':
+                yield TransactionService._to_csv(transactions)
+            else:
+                yield ''.join(json.dumps(t, default=str) + '\n' for t in transactions)
+    
+    @staticmethod
+    def _to_csv(transactions: List[Dict[str, Any]], header: bool = False) -> str:
+        """Serialize transactions as CSV rows in EXPORT_FIELDS order"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        if header:
+            writer.writeheader()
+        writer.writerows(transactions)
+        return buffer.getvalue()
+    
+    @staticmethod
+    async def get_by_id(uid: str, transaction_id: str, target_currency: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get a user's transaction by ID with optional currency conversion"""
+        transaction = await repository.get(transactions_ref(uid).document(transaction_id))
+        if transaction is None:
+            return None
         
         # Ensure transaction has a currency field
-        if 'currency' not in transaction:
-            # Get default currency
-            default_currency = await CurrencyService.get_default_currency()
-            transaction['currency'] = default_currency['code']
-            
-            # Update the transaction in Firestore with the default currency
-            transactions_ref.document(transaction_id).update({
-                'currency': transaction['currency']
-            })
+        await TransactionService._ensure_currency(uid, [transaction])
         
         # Convert currency if target_currency is specified and different from transaction currency
         if target_currency and transaction.get('currency') != target_currency:
@@ -119,13 +349,9 @@ class TransactionService:
         return transaction
     
     @staticmethod
-    async def update(transaction_id: str, transaction_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update a transaction"""
-        transaction_ref = transactions_ref.document(transaction_id)
-        doc = transaction_ref.get()
-        
-        if not doc.exists:
-            return None
+    async def update(uid: str, transaction_id: str, transaction_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update a user's transaction"""
+        transaction_ref = transactions_ref(uid).document(transaction_id)
         
         # Add updated_at timestamp
         transaction_data['updated_at'] = datetime.now().isoformat()
@@ -135,66 +361,121 @@ class TransactionService:
             default_currency = await CurrencyService.get_default_currency()
             transaction_data['currency'] = default_currency['code']
         
-        # Update in Firestore
-        transaction_ref.update(transaction_data)
+        # Update in Firestore, moving the amount between aggregates atomically
+        updated = await repository.run_transaction(
+            TransactionService._update_in_transaction, uid, transaction_ref, transaction_data
+        )
+        if updated is not None:
+            TransactionSnapshotService.record_writes(uid, added=[updated])
+            await versioning.bump('transactions', uid=uid)
+        
+        return updated
+    
+    @staticmethod
+    async def delete(uid: str, transaction_id: str) -> bool:
+        """Delete a user's transaction"""
+        transaction_ref = transactions_ref(uid).document(transaction_id)
+        
+        # Delete from Firestore, removing the amount from its aggregate atomically
+        deleted = await repository.run_transaction(
+            TransactionService._delete_in_transaction, uid, transaction_ref
+        )
+        if deleted:
+            TransactionSnapshotService.record_writes(uid, removed_ids=[transaction_id])
+            await versioning.bump('transactions', uid=uid)
         
-        # Get and return updated document
-        updated_doc = transaction_ref.get()
-        return updated_doc.to_dict()
+        return deleted
     
     @staticmethod
-    async def delete(transaction_id: str) -> bool:
-        """Delete a transaction"""
-        transaction_ref = transactions_ref.document(transaction_id)
-        doc = transaction_ref.get()
+    def _update_in_transaction(transaction, uid: str, transaction_ref, transaction_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply an update and its aggregate deltas inside a Firestore transaction"""
+        snapshot = transaction_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        
+        existing = snapshot.to_dict()
+        updated = {**existing, **transaction_data}
+        
+        transaction.update(transaction_ref, transaction_data)
+        SpendingAggregateService.stage(
+            transaction,
+            uid,
+            SpendingAggregateService.compute_deltas(added=[updated], removed=[existing])
+        )
         
-        if not doc.exists:
+        return updated
+    
+    @staticmethod
+    def _delete_in_transaction(transaction, uid: str, transaction_ref) -> bool:
+        """Delete a transaction and reverse its aggregate deltas inside a Firestore transaction"""
+        snapshot = transaction_ref.get(transaction=transaction)
+        if not snapshot.exists:
             return False
         
-        transaction_ref.delete()
-        return True
+        transaction.delete(transaction_ref)
+        SpendingAggregateService.stage(
+            transaction,
+            uid,
+            SpendingAggregateService.compute_deltas(removed=[snapshot.to_dict()])
+        )
         
+        return True
+    
     @staticmethod
-    async def get_by_category(category: str, target_currency: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get transactions by category with optional currency conversion"""
-        query = transactions_ref.where(filter=firestore.FieldFilter("category", "==", category))
-        docs = query.stream()
+    async def _ensure_currency(uid: str, transactions: List[Dict[str, Any]]) -> None:
+        """Backfill the default currency on legacy transactions stored without one
         
-        transactions = []
-        for doc in docs:
-            transaction = doc.to_dict()
-            
-            # Ensure transaction has a currency field
+        A no-op once CURRENCY_BACKFILL_COMPLETE is set, as backfill_currency.py has
+        then given every stored transaction a currency.
+        """
+        if CURRENCY_BACKFILL_COMPLETE:
+            return
+        
+        for transaction in transactions:
             if 'currency' not in transaction:
                 # Get default currency
                 default_currency = await CurrencyService.get_default_currency()
                 transaction['currency'] = default_currency['code']
                 
                 # Update the transaction in Firestore with the default currency
-                transactions_ref.document(transaction['id']).update({
+                await repository.update(transactions_ref(uid).document(transaction['id']), {
                     'currency': transaction['currency']
                 })
+    
+    @staticmethod
+    async def _convert_all(
+        transactions: List[Dict[str, Any]],
+        target_currency: str,
+        rates: Optional[Dict[str, Optional[float]]] = None
+    ) -> None:
+        """Convert transactions to target_currency in place, looking up each source rate once
+        
+        Pass the same rates dict across calls to reuse the rates resolved so far;
+        currencies that can't be converted are recorded in it as None.
+        """
+        to_convert = [t for t in transactions if t.get('currency') and t['currency'] != target_currency]
+        if not to_convert:
+            return
+        
+        if rates is None:
+            rates = {}
+        
+        # Currencies that fail to convert are left out and keep their original values
+        missing = {t['currency'] for t in to_convert if t['currency'] not in rates}
+        if missing:
+            resolved = await CurrencyService.get_exchange_rates_to(missing, target_currency, strict=False)
+            for code in missing:
+                rates[code] = resolved.get(code)
+        
+        for transaction in to_convert:
+            rate = rates.get(transaction['currency'])
+            if rate is None:
+                continue
             
-            # Convert currency if target_currency is specified and different from transaction currency
-            if target_currency and transaction.get('currency') != target_currency:
-                try:
-                    conversion = await CurrencyService.convert_currency(
-                        transaction['amount'],
-                        transaction['currency'],
-                        target_currency
-                    )
-                    
-                    # Store original values
-                    transaction['original_amount'] = transaction['amount']
-                    transaction['original_currency'] = transaction['currency']
-                    
-                    # Update with converted values
-                    transaction['amount'] = conversion['converted_amount']
-                    transaction['currency'] = target_currency
-                except Exception as e:
-                    # If conversion fails, keep original values
-                    print(f"Currency conversion error: {e}")
-            
-            transactions.append(transaction)
+            # Store original values
+            transaction['original_amount'] = transaction['amount']
+            transaction['original_currency'] = transaction['currency']
             
-        return transactions 
\ No newline at end of file
+            # Update with converted values
+            transaction['amount'] = transaction['amount'] * rate
+            transaction['currency'] = target_currency
\ No newline at end of file
@@ -1,7 +1,11 @@
 from typing import Dict, Any, Optional
+import asyncio
+import copy
 from firebase_admin import auth, firestore
-from app.core.config import db
+from app.core.config import db, PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL
+from app.core import repository
 from app.models.user import UserCreate, UserPreferences
+from app.utils.cache import TTLCache, MISSING
 import datetime
 
 # Collection references
@@ -11,6 +15,9 @@ user_preferences_ref = db.collection('user_preferences')
 class UserService:
     """Service for managing users in Firebase"""
     
+    # Profiles with preferences by uid; /auth/me reads it on every page load
+    _profile_cache = TTLCache(ttl=PROFILE_CACHE_TTL, maxsize=PROFILE_CACHE_SIZE)
+    
     @staticmethod
     async def create_user(user_data: UserCreate) -> Dict[str, Any]:
         """
@@ -18,13 +25,14 @@ class UserService:
         
         Args:
             user_data: User creation data including email and password
-            
+        
         Returns:
             Dict with user information
         """
         try:
             # Create user in Firebase Auth
-            user_record = auth.create_user(
+            user_record = await repository.run(
+                auth.create_user,
                 email=user_data.email,
                 password=user_data.password,
                 display_name=user_data.name,
@@ -42,12 +50,13 @@ class UserService:
                 "updated_at": datetime.datetime.now().isoformat()
             }
             
-            # Save user in Firestore
-            users_ref.document(user_id).set(user_doc)
-            
-            # Create default user preferences
+            # Save user and default preferences in Firestore concurrently
             default_preferences = UserPreferences().dict()
-            user_preferences_ref.document(user_id).set(default_preferences)
+            await asyncio.gather(
+                repository.save(users_ref.document(user_id), user_doc),
+                repository.save(user_preferences_ref.document(user_id), default_preferences)
+            )
+            UserService._profile_cache.invalidate(user_id)
             
             return {**user_doc, "preferences": default_preferences}
         
@@ -58,29 +67,38 @@ class UserService:
     @staticmethod
     async def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
         """
-        Get user by ID from Firestore
+        Get user by ID from the profile cache or Firestore
+        
+        The user and preferences documents are read in one round-trip.
         
         Args:
             user_id: Firebase user ID
-            
+        
         Returns:
             User data or None if not found
         """
         try:
-            # Get user data from Firestore
-            user_doc = users_ref.document(user_id).get()
-            
-            if not user_doc.exists:
+            cached = UserService._profile_cache.get(user_id)
+            # Callers get their own copy, so changing it can't alter the cached profile
+            if cached is not MISSING:
+                return copy.deepcopy(cached)
+            
+            # Get user data and preferences from Firestore together
+            user_data, preferences = await repository.get_many([
+                users_ref.document(user_id),
+                user_preferences_ref.document(user_id)
+            ])
+            
+            if user_data is None:
                 return None
-                
-            user_data = user_doc.to_dict()
             
-            # Get user preferences
-            preferences_doc = user_preferences_ref.document(user_id).get()
-            preferences = preferences_doc.to_dict() if preferences_doc.exists else UserPreferences().dict()
-            
-            return {**user_data, "preferences": preferences}
+            if preferences is None:
+                preferences = UserPreferences().dict()
             
+            user = {**user_data, "preferences": preferences}
+            UserService._profile_cache.set(user_id, user)
+            return copy.deepcopy(user)
+        
         except Exception as e:
             # Log the error and return None
             print(f"Error getting user: {str(e)}")
@@ -91,10 +109,12 @@ class UserService:
         """
         Update user data in Firestore and optionally in Firebase Auth
         
+        The Auth, user and preferences updates are independent and run concurrently.
+        
         Args:
             user_id: Firebase user ID
             update_data: Data to update
-            
+        
         Returns:
             Updated user data or None if failed
         """
@@ -111,12 +131,12 @@ class UserService:
             if "name" in update_data:
                 firestore_update["name"] = update_data["name"]
                 auth_update["display_name"] = update_data["name"]
-                
+            
             # Update picture if provided
             if "picture" in update_data:
                 firestore_update["picture"] = update_data["picture"]
                 auth_update["photo_url"] = update_data["picture"]
-                
+            
             # Update email if provided (requires re-authentication)
             if "email" in update_data:
                 firestore_update["email"] = update_data["email"]
@@ -125,50 +145,70 @@ class UserService:
             # Update preferences if provided
             preferences_update = update_data.get("preferences", {})
             
+            updates = []
+            
             # Update in Firebase Auth if needed
             if auth_update:
-                auth.update_user(user_id, **auth_update)
-                
+                updates.append(repository.run(auth.update_user, user_id, **auth_update))
+            
             # Update in Firestore
             if firestore_update:
-                users_ref.document(user_id).update(firestore_update)
-                
+                updates.append(repository.update(users_ref.document(user_id), firestore_update))
+            
             # Update preferences in Firestore
             if preferences_update:
-                user_preferences_ref.document(user_id).update(preferences_update)
-                
+                updates.append(repository.update(user_preferences_ref.document(user_id), preferences_update))
+            
+            try:
+                await asyncio.gather(*updates)
+            finally:
+                # Some updates may have applied even if another failed
+                UserService._profile_cache.invalidate(user_id)
+            
             # Get updated user
             return await UserService.get_user_by_id(user_id)
-            
+        
         except Exception as e:
             # Log the error and return None
             print(f"Error updating user: {str(e)}")
             return None
-            
+    
     @staticmethod
     async def delete_user(user_id: str) -> bool:
         """
         Delete user from Firebase Auth and Firestore
         
+        The users/{uid} document is deleted with all of its subcollections
+        (transactions, budgets, goals, recurring_transactions,
+        spending_aggregates, collection_versions and anything nested in them).
+        
         Args:
             user_id: Firebase user ID
-            
+        
         Returns:
             True if successful, False otherwise
         """
         try:
             # Delete from Auth
-            auth.delete_user(user_id)
-            
-            # Delete from Firestore
-            users_ref.document(user_id).delete()
+            await repository.run(auth.delete_user, user_id)
             
-            # Delete preferences
-            user_preferences_ref.document(user_id).delete()
+            # Delete user data and preferences from Firestore concurrently
+            try:
+                await asyncio.gather(
+                    repository.delete_tree(users_ref.document(user_id)),
+                    repository.delete(user_preferences_ref.document(user_id))
+                )
+            finally:
+                UserService._profile_cache.invalidate(user_id)
             
             return True
-            
+        
         except Exception as e:
             # Log the error and return False
             print(f"Error deleting user: {str(e)}")
-            return False 
\ No newline at end of file
+            return False 
+    
+    @staticmethod
+    def get_profile_cache_stats() -> Dict[str, Any]:
+        """Get hit/miss counters for the user profile cache"""
+        return UserService._profile_cache.stats()
@@ -0,0 +1,17 @@
+import json
+import os
+
+def load_checkpoint(path: str) -> dict:
+    """Read a migration script's progress, or an empty checkpoint if it has none yet"""
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+def save_checkpoint(path: str, checkpoint: dict) -> None:
+    """Persist a migration script's progress so an interrupted run can resume"""
+    # Write then rename so a crash never leaves a truncated checkpoint
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,183 @@
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.core.config import DEFAULT_CURRENCY_CODE
+
+# Initial row capacity; arrays double when full
+INITIAL_CAPACITY = 1024
+
+class DictionaryEncoder:
+    """Maps repeated strings to dense int codes and back"""
+    
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+    
+    def encode(self, value: str) -> int:
+        """Return the code for value, assigning the next one if it is new"""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class TransactionColumns:
+    """Columnar copy of the transactions for vectorized group-bys
+    
+    Amounts are float64, dates are int32 day ordinals, and categories and
+    currencies are dictionary-encoded int32 codes. Rows are appended in place
+    and deleted rows are only marked dead, so writes are O(1) amortized.
+    Dead rows are reclaimed by compact().
+    """
+    
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.categories = DictionaryEncoder()
+        self.currencies = DictionaryEncoder()
+        self._rows: Dict[str, int] = {}  # Transaction ID -> row
+        self._size = 0
+        self._allocate(capacity)
+    
+    def _allocate(self, capacity: int) -> None:
+        """Create empty columns, or grow the existing ones to capacity"""
+        columns = {
+            'amount': np.float64,
+            'day': np.int32,
+            'month': np.int32,
+            'category': np.int32,
+            'currency': np.int32,
+            'is_income': np.bool_,
+            'alive': np.bool_
+        }
+        for name, dtype in columns.items():
+            column = np.zeros(capacity, dtype=dtype)
+            if hasattr(self, name):
+                column[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, column)
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays"""
+        return sum(
+            getattr(self, name).nbytes
+            for name in ('amount', 'day', 'month', 'category', 'currency', 'is_income', 'alive')
+        )
+    
+    def upsert(self, transaction: Dict[str, Any], default_currency: str = DEFAULT_CURRENCY_CODE) -> None:
+        """Add a transaction, replacing any previous version with the same ID"""
+        self.remove(transaction['id'])
+        
+        if self._size == len(self.amount):
+            # Reuse dead rows when they make up half the columns, otherwise grow
+            if len(self._rows) <= self._size // 2:
+                self.compact()
+            else:
+                self._allocate(len(self.amount) * 2)
+        
+        row = self._size
+        day = date.fromisoformat(transaction['date'][:10])
+        self.amount[row] = transaction['amount']
+        self.day[row] = day.toordinal()
+        self.month[row] = day.year * 12 + day.month - 1
+        self.category[row] = self.categories.encode(transaction['category'])
+        self.currency[row] = self.currencies.encode(transaction.get('currency') or default_currency)
+        self.is_income[row] = transaction['is_income']
+        self.alive[row] = True
+        
+        self._rows[transaction['id']] = row
+        self._size += 1
+    
+    def extend(self, transactions: Iterable[Dict[str, Any]], default_currency: str = DEFAULT_CURRENCY_CODE) -> None:
+        """Upsert many transactions"""
+        for transaction in transactions:
+            self.upsert(transaction, default_currency)
+    
+    def remove(self, transaction_id: str) -> None:
+        """Drop a transaction if it is present"""
+        row = self._rows.pop(transaction_id, None)
+        if row is not None:
+            self.alive[row] = False
+    
+    def compact(self) -> None:
+        """Reclaim the rows of removed transactions"""
+        keep = np.flatnonzero(self.alive[:self._size])
+        if len(keep) == self._size:
+            return
+        
+        new_row = np.full(self._size, -1, dtype=np.int64)
+        new_row[keep] = np.arange(len(keep))
+        for name in ('amount', 'day', 'month', 'category', 'currency', 'is_income', 'alive'):
+            column = getattr(self, name)
+            column[:len(keep)] = column[keep]
+            column[len(keep):self._size] = 0
+        self._rows = {transaction_id: int(new_row[row]) for transaction_id, row in self._rows.items()}
+        self._size = len(keep)
+    
+    def group_totals(
+        self,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        group_by: str = 'category'
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Sum income, expenses and counts per (group, currency) over [date_from, date_to)
+        
+        group_by is 'category', 'day', 'week' (keyed by the Monday) or 'month'; keys
+        are formatted like the analytics buckets. A boolean mask selects the rows and
+        one bincount per total does the grouping.
+        """
+        n = self._size
+        mask = self.alive[:n].copy()
+        if date_from is not None:
+            mask &= self.day[:n] >= date_from.toordinal()
+        if date_to is not None:
+            mask &= self.day[:n] < date_to.toordinal()
+        
+        if group_by == 'category':
+            keys = self.category[:n][mask]
+        elif group_by == 'month':
+            keys = self.month[:n][mask]
+        elif group_by == 'week':
+            # Ordinal 1 is a Monday, so this rounds each day down to its week's Monday
+            days = self.day[:n][mask]
+            keys = days - (days - 1) % 7
+        elif group_by == 'day':
+            keys = self.day[:n][mask]
+        else:
+            raise ValueError(f"Unknown group_by '{group_by}'")
+        
+        if len(keys) == 0:
+            return {}
+        
+        # One group per distinct (key, currency) pair
+        pairs = keys.astype(np.int64) * max(len(self.currencies.values), 1) + self.currency[:n][mask]
+        groups, inverse = np.unique(pairs, return_inverse=True)
+        amounts = self.amount[:n][mask]
+        is_income = self.is_income[:n][mask]
+        
+        income = np.bincount(inverse, weights=np.where(is_income, amounts, 0.0), minlength=len(groups))
+        expenses = np.bincount(inverse, weights=np.where(is_income, 0.0, amounts), minlength=len(groups))
+        counts = np.bincount(inverse, minlength=len(groups))
+        
+        totals = {}
+        for group, group_income, group_expenses, count in zip(
+            groups.tolist(), income.tolist(), expenses.tolist(), counts.tolist()
+        ):
+            key_code, currency_code = divmod(group, max(len(self.currencies.values), 1))
+            totals[(self._format_key(key_code, group_by), self.currencies.values[currency_code])] = {
+                'income': group_income,
+                'expenses': group_expenses,
+                'count': count
+            }
+        
+        return totals
+    
+    def _format_key(self, key_code: int, group_by: str) -> str:
+        """Turn a group code back into its category name, ISO date or 'YYYY-MM'"""
+        if group_by == 'category':
+            return self.categories.values[key_code]
+        if group_by == 'month':
+            year, month = divmod(key_code, 12)
+            return f"{year:04d}-{month + 1:02d}"
+        return date.fromordinal(key_code).isoformat()
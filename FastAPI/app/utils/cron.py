@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from typing import Set
+
+# (lowest, highest) value accepted by each of the five cron fields
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+# Upper bound on the search for the next match; no valid expression needs more than
+# a leap-year cycle (e.g. '0 0 29 2 *')
+MAX_SEARCH_DAYS = 366 * 8
+
+class CronSchedule:
+    """Five-field cron expression ('minute hour day-of-month month day-of-week')
+    
+    Supports '*', single values, 'a-b' ranges, comma-separated lists and '/n' steps.
+    Day of week is 0-7 with both 0 and 7 meaning Sunday. As in cron, when both day
+    fields are restricted a time matches if either of them does. Only a literal '*'
+    leaves a day field unrestricted; '*/n' is a restriction like any other.
+    """
+    
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression must have 5 fields: '{expression}'")
+        
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)
+        )
+        # Sunday is both 0 and 7
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        
+        # Unlike Vixie cron, which treats any field starting with '*' as unrestricted
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+    
+    @staticmethod
+    def _parse_field(field: str, low: int, high: int) -> Set[int]:
+        """Expand one cron field into the set of values it matches"""
+        values = set()
+        for part in field.split(','):
+            value_range, _, step = part.partition('/')
+            
+            if value_range == '*':
+                start, end = low, high
+            elif '-' in value_range:
+                start, end = (int(v) for v in value_range.split('-', 1))
+            else:
+                start = end = int(value_range)
+                if step:
+                    end = high  # 'a/n' means every n from a
+            
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field '{field}' is outside {low}-{high}")
+            
+            values.update(range(start, end + 1, int(step) if step else 1))
+        
+        return values
+    
+    def _matches_day(self, moment: datetime) -> bool:
+        """Check the day-of-month and day-of-week fields for a date"""
+        day_match = moment.day in self.days
+        # cron counts weekdays from Sunday, Python from Monday
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        
+        if self._any_day:
+            return weekday_match
+        if self._any_weekday:
+            return day_match
+        return day_match or weekday_match
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first matching minute strictly after moment"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=MAX_SEARCH_DAYS)
+        
+        while candidate < limit:
+            if candidate.month not in self.months:
+                # Jump to the first minute of the next month
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._matches_day(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
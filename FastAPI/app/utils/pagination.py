@@ -0,0 +1,27 @@
+import base64
+import json
+from typing import Any, List
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor can't be decoded"""
+    pass
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the sort-key values of the last item on a page as an opaque token"""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a token produced by encode_cursor back into sort-key values"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor}") from e
+    
+    if not isinstance(values, list):
+        raise InvalidCursorError(f"Invalid cursor: {cursor}")
+    return values
+
+# Response header carrying the cursor for the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
@@ -0,0 +1,127 @@
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+class RecurrenceSchedule:
+    """Occurrence dates of a recurring transaction, computed in closed form
+    
+    Every occurrence has an integer index: the day ordinal for daily rules, the
+    week, month or year number for the others. Counting and seeking are index
+    arithmetic, so they cost O(1) regardless of the window, and iteration is lazy.
+    Monthly and yearly days past the end of a short month are clamped to its last
+    day. Occurrences fall within start_date and end_date, both inclusive and both
+    optional.
+    """
+    
+    def __init__(
+        self,
+        frequency: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        day_of_week: Optional[int] = None,
+        day_of_month: Optional[int] = None,
+        month_of_year: Optional[int] = None
+    ):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{frequency}'")
+        if frequency == 'weekly' and (day_of_week is None or not 0 <= day_of_week <= 6):
+            raise ValueError("Weekly schedules need a day_of_week between 0 and 6")
+        if frequency in ('monthly', 'yearly') and (day_of_month is None or not 1 <= day_of_month <= 31):
+            raise ValueError(f"{frequency.capitalize()} schedules need a day_of_month between 1 and 31")
+        if frequency == 'yearly' and (month_of_year is None or not 1 <= month_of_year <= 12):
+            raise ValueError("Yearly schedules need a month_of_year between 1 and 12")
+        
+        self.frequency = frequency
+        self.start_date = start_date
+        self.end_date = end_date
+        self.day_of_week = day_of_week
+        self.day_of_month = day_of_month
+        self.month_of_year = month_of_year
+    
+    @classmethod
+    def from_rule(cls, rule: Dict[str, Any]) -> 'RecurrenceSchedule':
+        """Build the schedule of a stored recurring transaction"""
+        return cls(
+            rule['frequency'],
+            datetime.fromisoformat(rule['start_date']).date(),
+            datetime.fromisoformat(rule['end_date']).date() if rule.get('end_date') else None,
+            rule.get('day_of_week'),
+            rule.get('day_of_month'),
+            rule.get('month_of_year')
+        )
+    
+    def _count_upto(self, d: date) -> int:
+        """Index of the last occurrence on or before d, ignoring start and end dates"""
+        if self.frequency == 'daily':
+            return d.toordinal()
+        
+        if self.frequency == 'weekly':
+            # Ordinal 1 (0001-01-01) is a Monday, so weekday() == (ordinal - 1) % 7
+            return (d.toordinal() - 1 - self.day_of_week) // 7
+        
+        if self.frequency == 'monthly':
+            month_index = d.year * 12 + d.month - 1
+            return month_index - (d.day < self._clamp(d.year, d.month))
+        
+        # yearly
+        occurrence = date(d.year, self.month_of_year, self._clamp(d.year, self.month_of_year))
+        return d.year - (d < occurrence)
+    
+    def _occurrence(self, index: int) -> date:
+        """Date of the occurrence with the given index"""
+        if self.frequency == 'daily':
+            return date.fromordinal(index)
+        
+        if self.frequency == 'weekly':
+            return date.fromordinal(index * 7 + 1 + self.day_of_week)
+        
+        if self.frequency == 'monthly':
+            year, month = divmod(index, 12)
+            return date(year, month + 1, self._clamp(year, month + 1))
+        
+        # yearly
+        return date(index, self.month_of_year, self._clamp(index, self.month_of_year))
+    
+    def _clamp(self, year: int, month: int) -> int:
+        """Day of month an occurrence falls on, clamped to the month's length"""
+        return min(self.day_of_month, calendar.monthrange(year, month)[1])
+    
+    def _index_range(self, after: Optional[date], until: Optional[date]) -> range:
+        """Indexes of the occurrences in (after, until], within start and end dates"""
+        if self.start_date is not None and (after is None or after < self.start_date):
+            after = self.start_date - timedelta(days=1)
+        if self.end_date is not None and (until is None or until > self.end_date):
+            until = self.end_date
+        if after is None or until is None:
+            raise ValueError("Open-ended ranges need a start_date and an end_date")
+        
+        first = self._count_upto(after) + 1
+        last = self._count_upto(until)
+        return range(first, max(last + 1, first))
+    
+    def between(self, after: Optional[date], until: Optional[date]) -> Iterator[date]:
+        """Lazily yield the occurrences after 'after' up to and including 'until'
+        
+        Either bound may be None to use start_date or end_date instead.
+        """
+        for index in self._index_range(after, until):
+            yield self._occurrence(index)
+    
+    def count_between(self, after: Optional[date], until: Optional[date]) -> int:
+        """Count the occurrences after 'after' up to and including 'until'"""
+        return len(self._index_range(after, until))
+    
+    def nth_after(self, d: date, n: int = 1) -> Optional[date]:
+        """Return the n-th occurrence (1-based) strictly after d, or None if it is past end_date"""
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        
+        if self.start_date is not None and d < self.start_date:
+            d = self.start_date - timedelta(days=1)
+        
+        occurrence = self._occurrence(self._count_upto(d) + n)
+        if self.end_date is not None and occurrence > self.end_date:
+            return None
+        return occurrence
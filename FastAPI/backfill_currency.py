@@ -0,0 +1,107 @@
+"""
+Script to backfill the currency field on legacy transactions and goals.
+Every user's documents are scanned with one collection group query in document
+path order in batches, and progress is checkpointed after every batch, so an
+interrupted run resumes where it stopped.
+Once it reports completion, set CURRENCY_BACKFILL_COMPLETE=true so the read
+paths stop checking each document for a currency.
+"""
+import argparse
+import asyncio
+import os
+import time
+from app.core.config import db, DEFAULT_CURRENCY_CODE
+from app.core import repository
+from app.utils.checkpoint import load_checkpoint, save_checkpoint
+from app.services.currency_service import CurrencyService
+
+COLLECTIONS = ['transactions', 'goals']
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.currency_backfill_checkpoint.json')
+# Attempts per batch when documents change between the read and the write
+MAX_BATCH_ATTEMPTS = 5
+
+def fetch_batch(collection_group, last_path, batch_size: int) -> list:
+    # Only the currency field is read; missing fields come back absent
+    query = collection_group.select(['currency']).order_by(repository.DOCUMENT_ID).limit(batch_size)
+    if last_path is not None:
+        # Collection group cursors need the full path, since IDs repeat across users
+        query = query.start_after({repository.DOCUMENT_ID: db.document(last_path)})
+    return list(query.stream())
+
+async def backfill_collection(name: str, currency: str, batch_size: int, checkpoint: dict, checkpoint_path: str):
+    state = checkpoint.setdefault(name, {'last_path': None, 'scanned': 0, 'updated': 0, 'done': False})
+    if state['done']:
+        print(f"{name}: already complete ({state['scanned']} scanned, {state['updated']} updated)")
+        return
+    
+    collection_group = db.collection_group(name)
+    started = time.perf_counter()
+    
+    while True:
+        for attempt in range(1, MAX_BATCH_ATTEMPTS + 1):
+            docs = await repository.run(fetch_batch, collection_group, state.get('last_path'), batch_size)
+            legacy = [doc for doc in docs if 'currency' not in (doc.to_dict() or {})]
+            if not legacy:
+                break
+            
+            # Each update requires the document to be unchanged since it was read,
+            # so a currency set concurrently by the API is never overwritten
+            batch = db.batch()
+            for doc in legacy:
+                batch.update(doc.reference, {'currency': currency}, option=db.write_option(last_update_time=doc.update_time))
+            try:
+                await repository.commit(batch)
+                break
+            except Exception as e:
+                if attempt == MAX_BATCH_ATTEMPTS:
+                    raise
+                print(f"{name}: batch after {state.get('last_path')} changed during backfill, retrying ({e})")
+        
+        if not docs:
+            break
+        
+        state['last_path'] = docs[-1].reference.path
+        state['scanned'] += len(docs)
+        state['updated'] += len(legacy)
+        save_checkpoint(checkpoint_path, checkpoint)
+        
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {state['scanned']} scanned, {state['updated']} updated ({len(docs) / max(elapsed, 1e-9):.0f} docs/sec)")
+        started = time.perf_counter()
+        
+        if len(docs) < batch_size:
+            break
+    
+    state['done'] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+    print(f"{name}: complete ({state['scanned']} scanned, {state['updated']} updated)")
+
+async def backfill_currency(collections, currency, batch_size: int, checkpoint_path: str):
+    if currency is None:
+        default_currency = await CurrencyService.get_default_currency()
+        currency = default_currency['code'] if default_currency else DEFAULT_CURRENCY_CODE
+    
+    print(f"Backfilling currency '{currency}' on {', '.join(collections)}...")
+    
+    checkpoint = load_checkpoint(checkpoint_path)
+    for name in collections:
+        await backfill_collection(name, currency, batch_size, checkpoint, checkpoint_path)
+    
+    print("Backfill completed successfully! Set CURRENCY_BACKFILL_COMPLETE=true to skip the read-path checks.")
+    print("If SPENDING_AGGREGATES_ENABLED is set, run rebuild_aggregates.py --check to verify the aggregates.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--collections", nargs="+", choices=COLLECTIONS, default=COLLECTIONS, help="collections to backfill")
+    parser.add_argument("--currency", help="currency code to set (defaults to the default currency)")
+    parser.add_argument("--batch-size", type=int, default=repository.BATCH_SIZE, help="documents per batch (at most 500)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+    
+    if not 0 < args.batch_size <= repository.BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {repository.BATCH_SIZE}")
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    
+    asyncio.run(backfill_currency(args.collections, args.currency, args.batch_size, args.checkpoint))
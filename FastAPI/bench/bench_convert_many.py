@@ -0,0 +1,46 @@
+"""
+Micro-benchmark: converting a column of amounts with CurrencyService.convert_many
+versus one convert_currency call per amount.
+
+Run from the FastAPI directory: python -m bench.bench_convert_many
+"""
+import argparse
+import asyncio
+import random
+import time
+# Connects to the emulator, so it must come before the app imports
+from bench import emulator
+from app.services.currency_service import CurrencyService
+
+CURRENCIES = ['USD', 'EUR', 'MKD']
+
+async def main(size: int, to_currency: str):
+    rng = random.Random(0)
+    amounts = [rng.uniform(1, 1000) for _ in range(size)]
+    from_currencies = [rng.choice(CURRENCIES) for _ in range(size)]
+    
+    # Warm the rate cache so both paths measure conversion, not Firestore
+    await CurrencyService.convert_many(amounts[:1], from_currencies[:1], to_currency)
+    
+    started = time.perf_counter()
+    per_item = [
+        (await CurrencyService.convert_currency(amount, code, to_currency))['converted_amount']
+        for amount, code in zip(amounts, from_currencies)
+    ]
+    per_item_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    converted, _ = await CurrencyService.convert_many(amounts, from_currencies, to_currency)
+    batch_seconds = time.perf_counter() - started
+    
+    assert converted.tolist() == per_item
+    print(f"{size} amounts to {to_currency}")
+    print(f"convert_currency per amount {per_item_seconds * 1000:9.1f} ms")
+    print(f"convert_many                {batch_seconds * 1000:9.1f} ms   ({per_item_seconds / batch_seconds:.0f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000, help="number of amounts")
+    parser.add_argument("--to", default="EUR", help="target currency")
+    args = parser.parse_args()
+    asyncio.run(main(args.size, args.to))
@@ -0,0 +1,45 @@
+"""
+Benchmark RecurrenceSchedule against the legacy day/month/year walk over 10-year windows.
+
+Run from the FastAPI directory: python -m bench.bench_recurrence
+"""
+import argparse
+import timeit
+from datetime import date
+from app.utils.recurrence import RecurrenceSchedule
+from tests.test_recurrence import legacy_dates_to_generate
+
+AFTER = date(2015, 1, 1)
+UNTIL = date(2025, 1, 1)
+
+RULES = {
+    'daily': {},
+    'weekly': {'day_of_week': 4},
+    'monthly': {'day_of_month': 31},
+    'yearly': {'day_of_month': 29, 'month_of_year': 2},
+}
+
+def best_of(func, repeat: int, number: int) -> float:
+    """Fastest time of one call in microseconds"""
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1e6
+
+def main(repeat: int, number: int):
+    print(f"Window {AFTER} .. {UNTIL}, best of {repeat} x {number} calls, microseconds per call")
+    print(f"{'frequency':<10}{'occurrences':>12}{'legacy list':>14}{'between':>12}{'count':>10}{'nth_after':>12}")
+    
+    for frequency, fields in RULES.items():
+        schedule = RecurrenceSchedule(frequency, **fields)
+        occurrences = schedule.count_between(AFTER, UNTIL)
+        
+        legacy = best_of(lambda: legacy_dates_to_generate(frequency, AFTER, UNTIL, **fields), repeat, number)
+        between = best_of(lambda: list(schedule.between(AFTER, UNTIL)), repeat, number)
+        count = best_of(lambda: schedule.count_between(AFTER, UNTIL), repeat, number)
+        nth = best_of(lambda: schedule.nth_after(AFTER, occurrences), repeat, number)
+        print(f"{frequency:<10}{occurrences:>12}{legacy:>14.1f}{between:>12.1f}{count:>10.2f}{nth:>12.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs per measurement")
+    parser.add_argument("--number", type=int, default=100, help="calls per timing run")
+    args = parser.parse_args()
+    main(args.repeat, args.number)
@@ -0,0 +1,80 @@
+"""
+Benchmark recurring-transaction generation across rules at increasing concurrency.
+
+Each run creates --rules monthly rules for a fresh user, each due for a year of
+occurrences, and times generate_transactions for that user. --latency adds a
+sleep to every Firestore call to stand in for the round-trip to a remote
+Firestore, so the speedup shows how well rule latencies overlap. It levels off
+at RECURRING_GENERATION_CONCURRENCY and at FIRESTORE_MAX_WORKERS.
+
+Run from the FastAPI directory: python -m bench.bench_recurring_generation
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import date, timedelta
+# Connects to the emulator, so it must come before the app imports
+from bench import emulator
+from app.core import repository
+from app.core.config import FIRESTORE_MAX_WORKERS
+from app.services import recurring_transaction_service
+from app.services.recurring_transaction_service import RecurringTransactionService
+from app.core.tenancy import users_ref
+
+def inject_latency(latency: float) -> None:
+    """Delay every Firestore call made through the repository by latency seconds"""
+    run = repository.run
+    
+    async def run_with_latency(func, *args, **kwargs):
+        def delayed():
+            time.sleep(latency)
+            return func(*args, **kwargs)
+        return await run(delayed)
+    
+    repository.run = run_with_latency
+
+async def generate(rules: int, concurrency: int) -> float:
+    uid = f"bench-{uuid.uuid4().hex}"
+    start_date = (date.today() - timedelta(days=365)).isoformat()
+    await asyncio.gather(*(
+        RecurringTransactionService.create(uid, {
+            'amount': 10.0,
+            'category': 'Rent',
+            'description': f'Rule {i}',
+            'is_income': False,
+            'start_date': start_date,
+            'frequency': 'monthly',
+            'day_of_month': 1 + i % 28
+        })
+        for i in range(rules)
+    ))
+    
+    recurring_transaction_service.RECURRING_GENERATION_CONCURRENCY = concurrency
+    started = time.perf_counter()
+    result = await RecurringTransactionService.generate_transactions(uid)
+    elapsed = time.perf_counter() - started
+    
+    assert not result['errors'], result['errors'][:3]
+    await repository.delete_tree(users_ref.document(uid))
+    return elapsed
+
+async def main(rules: int, latency: float, max_concurrency: int):
+    inject_latency(latency)
+    print(f"{rules} rules, {latency * 1000:.0f} ms added latency, {FIRESTORE_MAX_WORKERS} Firestore threads")
+    
+    baseline = None
+    concurrency = 1
+    while concurrency <= max_concurrency:
+        elapsed = await generate(rules, concurrency)
+        baseline = baseline or elapsed
+        print(f"concurrency {concurrency:>3}   {elapsed:7.2f} s   speedup {baseline / elapsed:5.1f}x")
+        concurrency *= 2
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=64, help="recurring rules to generate")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every Firestore call")
+    parser.add_argument("--max-concurrency", type=int, default=32, help="highest concurrency measured")
+    args = parser.parse_args()
+    asyncio.run(main(args.rules, args.latency, args.max_concurrency))
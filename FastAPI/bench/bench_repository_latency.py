@@ -0,0 +1,71 @@
+"""
+Load benchmark: request latency with Firestore calls made on the event loop versus
+through the repository's thread pool.
+
+Every simulated request reads a document a few times. 'blocking' makes the
+synchronous calls directly in the coroutine, as the services did before the
+repository layer; 'repository' awaits repository.get. --latency adds a sleep to
+every call to stand in for the round-trip to a remote Firestore.
+
+Run from the FastAPI directory: python -m bench.bench_repository_latency
+"""
+import argparse
+import asyncio
+import time
+# Connects to the emulator, so it must come before the app imports
+from bench import emulator
+from app.core import repository
+from app.core.config import db, FIRESTORE_MAX_WORKERS
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+async def measure(name: str, request, requests: int):
+    """Start every request at once and report the spread of their latencies"""
+    started = time.perf_counter()
+    
+    async def timed():
+        await request()
+        return time.perf_counter() - started
+    
+    latencies = await asyncio.gather(*(timed() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:<12} p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   "
+        f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms   "
+        f"{requests / elapsed:8.0f} requests/sec"
+    )
+
+async def main(requests: int, reads: int, latency: float):
+    doc_ref = db.collection('bench').document('latency')
+    doc_ref.set({'value': 1})
+    
+    def slow_get():
+        time.sleep(latency)
+        return doc_ref.get()
+    
+    async def slow_repository_get():
+        await repository.run(slow_get)
+    
+    async def blocking_request():
+        for _ in range(reads):
+            slow_get()
+    
+    async def repository_request():
+        for _ in range(reads):
+            await slow_repository_get()
+    
+    print(f"{requests} concurrent requests x {reads} reads, {latency * 1000:.0f} ms added latency, "
+          f"{FIRESTORE_MAX_WORKERS} Firestore threads")
+    await measure("blocking", blocking_request, requests)
+    await measure("repository", repository_request, requests)
+    doc_ref.delete()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200, help="requests started at once")
+    parser.add_argument("--reads", type=int, default=3, help="Firestore reads per request")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every Firestore call")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.reads, args.latency))
@@ -0,0 +1,27 @@
+"""
+Connect firebase_admin to the Firestore emulator for the benchmarks.
+
+Import it before any app module, which would otherwise initialize Firebase with
+the service account. Start the emulator with `firebase emulators:start --only firestore`
+and set FIRESTORE_EMULATOR_HOST.
+"""
+import os
+import sys
+import firebase_admin
+from firebase_admin import credentials
+from google.auth.credentials import AnonymousCredentials
+
+class EmulatorCredential(credentials.Base):
+    """The emulator accepts unauthenticated requests"""
+    def get_credential(self):
+        return AnonymousCredentials()
+
+if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    sys.exit("Set FIRESTORE_EMULATOR_HOST to a running Firestore emulator")
+
+try:
+    firebase_admin.get_app()
+except ValueError:
+    firebase_admin.initialize_app(EmulatorCredential(), {
+        "projectId": os.getenv("GCLOUD_PROJECT", "demo-finance-app")
+    })
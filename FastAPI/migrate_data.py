@@ -1,54 +1,184 @@
 """
 Script to migrate data from SQLite to Firebase Firestore.
-Run this once to transfer all your transaction data.
+The rows are written as the transactions of the user given by --uid.
+Rows are read in primary-key order a chunk at a time and written with batched
+commits from a pool of concurrent writers. Document IDs are derived from the
+SQLite primary key, so a rerun overwrites instead of duplicating, and progress
+is checkpointed after every chunk, so an interrupted run resumes where it stopped.
 """
+import argparse
 import asyncio
-from sqlalchemy.orm import Session
-from database import SessionLocal, engine
-import models
-from app.core.config import db
+import os
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from sqlalchemy import func
+from database import SessionLocal
+import models
+from app.core.config import db, BULK_IMPORT_CONCURRENCY, DEFAULT_CURRENCY_CODE
+from app.core import repository, versioning
+from app.core.tenancy import user_collection
+from app.utils.checkpoint import load_checkpoint, save_checkpoint
+from app.services.currency_service import CurrencyService
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.sqlite_migration_checkpoint.json')
+# Namespace of the uuid5 document IDs; changing it would duplicate previously migrated rows
+MIGRATION_NAMESPACE = uuid.UUID('d6b634f4-288b-4291-9a7c-79a0ffa98754')
+# Attempts per batch before the run aborts; the checkpoint makes the rerun pick up from there
+MAX_BATCH_ATTEMPTS = 3
+
+# SQLite connections must stay on the thread that opened them, so every read
+# runs on this single thread while Firestore writes use the repository pool
+_sqlite_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        _session = SessionLocal()
+    return _session
+
+def close_session():
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
+
+async def run_sqlite(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sqlite_executor, func, *args)
+
+def count_rows(last_id) -> int:
+    query = get_session().query(func.count(models.Transaction.id))
+    if last_id is not None:
+        query = query.filter(models.Transaction.id > last_id)
+    return query.scalar()
+
+def fetch_chunk(last_id, chunk_size: int) -> list:
+    # Keyset pagination: seeks past the last migrated key instead of using OFFSET,
+    # and selects plain columns so no ORM objects are built
+    query = get_session().query(
+        models.Transaction.id,
+        models.Transaction.amount,
+        models.Transaction.category,
+        models.Transaction.description,
+        models.Transaction.is_income,
+        models.Transaction.date
+    )
+    if last_id is not None:
+        query = query.filter(models.Transaction.id > last_id)
+    return query.order_by(models.Transaction.id).limit(chunk_size).all()
+
+def document_id(source_id) -> str:
+    return str(uuid.uuid5(MIGRATION_NAMESPACE, f"sqlite:transactions:{source_id}"))
 
-# Collection references
-transactions_ref = db.collection('transactions')
+def to_document(row, currency: str, migrated_at: str) -> dict:
+    transaction_date = row.date.isoformat() if hasattr(row.date, 'isoformat') else row.date
+    return {
+        "id": document_id(row.id),
+        "amount": float(row.amount),
+        "category": row.category,
+        "description": row.description,
+        "is_income": bool(row.is_income),
+        "date": transaction_date,
+        "currency": currency,
+        "created_at": migrated_at,
+    }
 
-def get_db():
-    db = SessionLocal()
+async def commit_batch(transactions_ref, documents: list, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        for attempt in range(1, MAX_BATCH_ATTEMPTS + 1):
+            batch = db.batch()
+            for document in documents:
+                batch.set(transactions_ref.document(document['id']), document)
+            try:
+                await repository.commit(batch)
+                return
+            except Exception as e:
+                if attempt == MAX_BATCH_ATTEMPTS:
+                    raise
+                print(f"Batch starting at {documents[0]['id']} failed, retrying ({e})")
+                await asyncio.sleep(2 ** attempt)
+
+async def migrate_data(uid: str, currency, batch_size: int, workers: int, checkpoint_path: str):
+    print(f"Starting migration from SQLite to Firebase for user {uid}...")
+    
+    transactions_ref = user_collection(uid, 'transactions')
+    checkpoint = load_checkpoint(checkpoint_path)
+    state = checkpoint.setdefault(f"{uid}/transactions", {'last_id': None, 'migrated': 0, 'done': False})
+    if state['done']:
+        print(f"Migration already complete ({state['migrated']} transactions); pass --restart to run it again")
+        return
+    
+    if currency is None:
+        default_currency = await CurrencyService.get_default_currency()
+        currency = default_currency['code'] if default_currency else DEFAULT_CURRENCY_CODE
+    
+    remaining = await run_sqlite(count_rows, state['last_id'])
+    print(f"Found {remaining} transactions to migrate" + (f" after id {state['last_id']}" if state['last_id'] is not None else ""))
+    
+    chunk_size = batch_size * workers
+    semaphore = asyncio.Semaphore(workers)
+    migrated_at = datetime.now().isoformat()
+    started = time.perf_counter()
+    migrated = 0
+    
+    # Read the next chunk from SQLite while the current one is being written
+    next_chunk = asyncio.ensure_future(run_sqlite(fetch_chunk, state['last_id'], chunk_size))
     try:
-        return db
+        while True:
+            rows = await next_chunk
+            if not rows:
+                break
+            if len(rows) == chunk_size:
+                next_chunk = asyncio.ensure_future(run_sqlite(fetch_chunk, rows[-1].id, chunk_size))
+            else:
+                next_chunk = asyncio.ensure_future(asyncio.sleep(0, result=[]))
+            
+            documents = [to_document(row, currency, migrated_at) for row in rows]
+            await asyncio.gather(*(
+                commit_batch(transactions_ref, documents[i:i + batch_size], semaphore)
+                for i in range(0, len(documents), batch_size)
+            ))
+            
+            # Every batch of the chunk has committed, so the chunk's last key is safe to resume after
+            state['last_id'] = rows[-1].id
+            state['migrated'] += len(rows)
+            save_checkpoint(checkpoint_path, checkpoint)
+            
+            migrated += len(rows)
+            elapsed = time.perf_counter() - started
+            print(f"Migrated {migrated}/{remaining} transactions ({migrated / max(elapsed, 1e-9):.0f} rows/sec)")
     finally:
-        db.close()
-
-async def migrate_data():
-    print("Starting migration from SQLite to Firebase...")
-    
-    # Get data from SQLite
-    db = get_db()
-    transactions = db.query(models.Transaction).all()
-    
-    print(f"Found {len(transactions)} transactions to migrate")
-    
-    # Migrate each transaction to Firebase
-    for transaction in transactions:
-        transaction_id = str(uuid.uuid4())
-        
-        # Convert SQLAlchemy model to dict
-        transaction_data = {
-            "id": transaction_id,
-            "amount": float(transaction.amount),
-            "category": transaction.category,
-            "description": transaction.description,
-            "is_income": bool(transaction.is_income),
-            "date": transaction.date,
-            "created_at": datetime.now().isoformat(),
-        }
-        
-        # Save to Firestore
-        transactions_ref.document(transaction_id).set(transaction_data)
-        print(f"Migrated transaction: {transaction_id}")
+        next_chunk.cancel()
+        await run_sqlite(close_session)
+    
+    state['done'] = True
+    save_checkpoint(checkpoint_path, checkpoint)
+    if migrated:
+        await versioning.bump('transactions', uid=uid)
     
+    elapsed = time.perf_counter() - started
+    print(f"Migrated {migrated} transactions in {elapsed:.1f}s ({migrated / max(elapsed, 1e-9):.0f} rows/sec)")
     print("Migration completed successfully!")
+    print(f"If SPENDING_AGGREGATES_ENABLED is set, run rebuild_aggregates.py --uid {uid} to include the migrated transactions.")
 
 if __name__ == "__main__":
-    asyncio.run(migrate_data()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--uid", required=True, help="user ID that owns the migrated transactions")
+    parser.add_argument("--currency", help="currency code of the migrated transactions (defaults to the default currency)")
+    parser.add_argument("--batch-size", type=int, default=repository.BATCH_SIZE, help="documents per batch (at most 500)")
+    parser.add_argument("--workers", type=int, default=BULK_IMPORT_CONCURRENCY, help="batches committed concurrently")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file used to resume")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    args = parser.parse_args()
+    
+    if not 0 < args.batch_size <= repository.BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {repository.BATCH_SIZE}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    
+    asyncio.run(migrate_data(args.uid, args.currency, args.batch_size, args.workers, args.checkpoint))
@@ -0,0 +1,92 @@
+"""
+Script to move the shared top-level collections under one user.
+Documents written before data was partitioned per user are moved to
+users/{uid}/<collection> with the same document IDs. Each batch creates the
+new documents and deletes the originals atomically, so a document is never in
+both places, and an interrupted run is resumed by running it again.
+"""
+import argparse
+import asyncio
+import time
+from firebase_admin import auth
+from app.core.config import db, BULK_IMPORT_CONCURRENCY
+from app.core import repository, versioning
+from app.core.tenancy import USER_COLLECTIONS, user_collection
+
+# Each moved document takes two of a batch's 500 writes
+DEFAULT_BATCH_SIZE = repository.BATCH_SIZE // 2
+
+def fetch_chunk(collection_ref, last_doc, chunk_size: int) -> list:
+    # Seek past the last document read in this run rather than rescanning
+    # from the start over the deletes this run has already made
+    query = collection_ref.order_by(repository.DOCUMENT_ID).limit(chunk_size)
+    if last_doc is not None:
+        query = query.start_after(last_doc)
+    return list(query.stream())
+
+async def move_batch(docs: list, target_ref, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        batch = db.batch()
+        for doc in docs:
+            batch.set(target_ref.document(doc.id), doc.to_dict())
+            # Fails the batch if the document changed after it was read
+            batch.delete(doc.reference, option=db.write_option(last_update_time=doc.update_time))
+        await repository.commit(batch)
+
+async def move_collection(name: str, uid: str, batch_size: int, workers: int) -> int:
+    source_ref = db.collection(name)
+    target_ref = user_collection(uid, name)
+    semaphore = asyncio.Semaphore(workers)
+    started = time.perf_counter()
+    moved = 0
+    last_doc = None
+    
+    while True:
+        docs = await repository.run(fetch_chunk, source_ref, last_doc, batch_size * workers)
+        if not docs:
+            break
+        
+        await asyncio.gather(*(
+            move_batch(docs[i:i + batch_size], target_ref, semaphore)
+            for i in range(0, len(docs), batch_size)
+        ))
+        
+        moved += len(docs)
+        last_doc = docs[-1]
+        elapsed = time.perf_counter() - started
+        print(f"{name}: moved {moved} documents ({moved / max(elapsed, 1e-9):.0f} docs/sec)")
+    
+    if moved:
+        await versioning.bump(name, uid=uid)
+    print(f"{name}: complete ({moved} documents moved)")
+    return moved
+
+async def migrate_to_user_collections(uid: str, collections, batch_size: int, workers: int):
+    print(f"Moving {', '.join(collections)} under users/{uid}...")
+    
+    started = time.perf_counter()
+    moved = 0
+    for name in collections:
+        moved += await move_collection(name, uid, batch_size, workers)
+    
+    elapsed = time.perf_counter() - started
+    print(f"Moved {moved} documents in {elapsed:.1f}s ({moved / max(elapsed, 1e-9):.0f} docs/sec)")
+    print("Migration completed successfully!")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    owner = parser.add_mutually_exclusive_group(required=True)
+    owner.add_argument("--uid", help="user ID that receives the documents")
+    owner.add_argument("--email", help="email of the user that receives the documents")
+    parser.add_argument("--collections", nargs="+", choices=USER_COLLECTIONS, default=list(USER_COLLECTIONS), help="collections to move")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"documents per batch (at most {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--workers", type=int, default=BULK_IMPORT_CONCURRENCY, help="batches committed concurrently")
+    args = parser.parse_args()
+    
+    if not 0 < args.batch_size <= DEFAULT_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {DEFAULT_BATCH_SIZE}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    
+    uid = args.uid or auth.get_user_by_email(args.email).uid
+    asyncio.run(migrate_to_user_collections(uid, args.collections, args.batch_size, args.workers))
@@ -0,0 +1,75 @@
+"""
+Script to mint Firebase-style ID tokens against a local signing key set.
+Run it with --init once to create a key pair, then point the API at the key set
+with TOKEN_VERIFIER=keyset and AUTH_KEYSET_FILE so load tests and local runs
+can authenticate with no network access. Never use these keys in production.
+"""
+import argparse
+import json
+import os
+import time
+import uuid
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.auth import crypt, jwt
+from app.core.config import AUTH_PROJECT_ID
+
+KEYSET_FILE = 'keyset.json'
+PRIVATE_KEY_FILE = 'private_key.pem'
+
+def init_keys(key_dir: str) -> None:
+    os.makedirs(key_dir, exist_ok=True)
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    kid = uuid.uuid4().hex
+    
+    with open(os.path.join(key_dir, PRIVATE_KEY_FILE), 'wb') as f:
+        f.write(private_key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        ))
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    with open(os.path.join(key_dir, KEYSET_FILE), 'w') as f:
+        json.dump({kid: public_pem}, f, indent=2)
+    
+    print(f"Wrote key '{kid}' to {key_dir}")
+    print(f"Start the API with TOKEN_VERIFIER=keyset AUTH_KEYSET_FILE={os.path.join(key_dir, KEYSET_FILE)}")
+
+def mint_token(key_dir: str, project_id: str, uid: str, email, ttl: int) -> str:
+    with open(os.path.join(key_dir, KEYSET_FILE)) as f:
+        kid = next(iter(json.load(f)))
+    with open(os.path.join(key_dir, PRIVATE_KEY_FILE)) as f:
+        signer = crypt.RSASigner.from_string(f.read(), key_id=kid)
+    
+    now = int(time.time())
+    claims = {
+        'iss': f"https://securetoken.google.com/{project_id}",
+        'aud': project_id,
+        'sub': uid,
+        'iat': now,
+        'auth_time': now,
+        'exp': now + ttl
+    }
+    if email:
+        claims.update({'email': email, 'email_verified': True})
+    return jwt.encode(signer, claims).decode()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", default=".test_keys", help="directory holding the key set and private key")
+    parser.add_argument("--init", action="store_true", help="create a new key pair and key set")
+    parser.add_argument("--project", default=AUTH_PROJECT_ID, help="project ID for the aud and iss claims")
+    parser.add_argument("--uid", default="load-test-user", help="user ID for the sub claim")
+    parser.add_argument("--email", help="email claim")
+    parser.add_argument("--ttl", type=int, default=3600, help="seconds until the token expires")
+    args = parser.parse_args()
+    
+    if args.init:
+        init_keys(args.keys)
+    else:
+        if not args.project:
+            parser.error("--project is required when AUTH_PROJECT_ID is not set")
+        print(mint_token(args.keys, args.project, args.uid, args.email, args.ttl))
@@ -0,0 +1,45 @@
+"""
+Script to rebuild or verify the per-category monthly spending aggregates.
+Run it once to backfill the spending_aggregates collection before enabling
+SPENDING_AGGREGATES_ENABLED, and with --check to compare the stored totals
+against a full recompute from the transactions. Every user's aggregates are
+processed unless --uid names one user.
+"""
+import argparse
+import asyncio
+from app.services.aggregate_service import SpendingAggregateService
+
+async def rebuild_aggregates(uid=None):
+    print(f"Recomputing spending aggregates from the transactions of {f'user {uid}' if uid else 'all users'}...")
+    
+    result = await SpendingAggregateService.rebuild(uid)
+    
+    print(f"Wrote {result['written']} aggregates for {result['users']} users, deleted {result['deleted']} stale aggregates")
+    print("Rebuild completed successfully!")
+
+async def check_aggregates(uid=None) -> bool:
+    print("Comparing stored spending aggregates to a full recompute...")
+    
+    mismatches = await SpendingAggregateService.check_consistency(uid)
+    
+    for mismatch in mismatches:
+        print(f"Mismatch in {mismatch['uid']}/{mismatch['id']}: stored {mismatch['stored']}, expected {mismatch['expected']}")
+    
+    if mismatches:
+        print(f"Found {len(mismatches)} inconsistent aggregates; run without --check to rebuild")
+        return False
+    
+    print("All aggregates are consistent")
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--check", action="store_true", help="only compare aggregates, don't write")
+    parser.add_argument("--uid", help="only process this user's aggregates")
+    args = parser.parse_args()
+    
+    if args.check:
+        consistent = asyncio.run(check_aggregates(args.uid))
+        raise SystemExit(0 if consistent else 1)
+    
+    asyncio.run(rebuild_aggregates(args.uid))
@@ -0,0 +1,20 @@
+"""
+The tests run against the Firestore emulator: start it with
+`firebase emulators:start --only firestore` and set FIRESTORE_EMULATOR_HOST.
+"""
+import os
+import firebase_admin
+from firebase_admin import credentials
+from google.auth.credentials import AnonymousCredentials
+
+class EmulatorCredential(credentials.Base):
+    """The emulator accepts unauthenticated requests"""
+    def get_credential(self):
+        return AnonymousCredentials()
+
+# Must run before app.core.config is imported, which otherwise initializes
+# Firebase with the service account
+if os.getenv("FIRESTORE_EMULATOR_HOST"):
+    firebase_admin.initialize_app(EmulatorCredential(), {
+        "projectId": os.getenv("GCLOUD_PROJECT", "demo-finance-app")
+    })
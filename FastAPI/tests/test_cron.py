@@ -0,0 +1,43 @@
+from datetime import datetime
+import pytest
+from app.utils.cron import CronSchedule
+
+def next_matches(expression: str, start: datetime, count: int):
+    schedule = CronSchedule(expression)
+    matches = []
+    for _ in range(count):
+        start = schedule.next_after(start)
+        matches.append(start)
+    return matches
+
+def test_daily_schedule():
+    assert next_matches("5 0 * * *", datetime(2024, 2, 28, 12, 0), 2) == [
+        datetime(2024, 2, 29, 0, 5), datetime(2024, 3, 1, 0, 5)
+    ]
+
+def test_literal_star_leaves_the_other_day_field_in_charge():
+    # Mondays only
+    assert next_matches("0 0 * * 1", datetime(2024, 1, 1, 12, 0), 2) == [
+        datetime(2024, 1, 8), datetime(2024, 1, 15)
+    ]
+
+def test_stepped_star_day_of_month_is_a_restriction():
+    # Odd days of the month or Mondays: '*/2' restricts the day of month, so both fields apply
+    assert next_matches("0 0 */2 * 1", datetime(2024, 1, 1, 12, 0), 4) == [
+        datetime(2024, 1, 3), datetime(2024, 1, 5), datetime(2024, 1, 7), datetime(2024, 1, 8)
+    ]
+
+def test_stepped_star_day_of_week_is_a_restriction():
+    # The 15th or Sundays, Tuesdays, Thursdays and Saturdays
+    assert next_matches("0 0 15 * */2", datetime(2024, 1, 1, 12, 0), 3) == [
+        datetime(2024, 1, 2), datetime(2024, 1, 4), datetime(2024, 1, 6)
+    ]
+
+@pytest.mark.parametrize("expression", ["* * *", "60 * * * *", "0 0 32 * *", "0 0 * 13 *", "0 0 5-1 * *"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+def test_expression_that_never_matches():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime(2024, 1, 1))
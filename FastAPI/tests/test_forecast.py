@@ -0,0 +1,54 @@
+import asyncio
+import os
+import uuid
+from datetime import date, timedelta
+import pytest
+
+if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    pytest.skip("needs the Firestore emulator (FIRESTORE_EMULATOR_HOST)", allow_module_level=True)
+
+from app.core import repository
+from app.core.tenancy import users_ref
+from app.services.forecast_service import ForecastService
+from app.services.recurring_transaction_service import RecurringTransactionService
+
+HORIZON_DAYS = 5
+
+def forecast_rule_due_today(last_generated: date = None) -> dict:
+    """Forecast for a fresh user whose only rule is a monthly expense due today"""
+    today = date.today()
+    
+    async def run():
+        uid = f"forecast-test-{uuid.uuid4().hex}"
+        rule = await RecurringTransactionService.create(uid, {
+            'amount': 50.0,
+            'category': 'Rent',
+            'description': 'Due today',
+            'is_income': False,
+            'currency': 'USD',
+            'start_date': (today - timedelta(days=60)).isoformat(),
+            'frequency': 'monthly',
+            'day_of_month': today.day
+        })
+        if last_generated is not None:
+            await RecurringTransactionService.update(uid, rule['id'], {'last_generated': last_generated.isoformat()})
+        
+        try:
+            return await ForecastService.forecast(uid, HORIZON_DAYS, 'USD', starting_balance=0.0)
+        finally:
+            await repository.delete_tree(users_ref.document(uid))
+    
+    return asyncio.run(run())
+
+def test_occurrence_due_today_and_not_generated_is_forecast():
+    forecast = forecast_rule_due_today(last_generated=date.today() - timedelta(days=1))
+    
+    assert forecast['total_expenses'] == 50.0
+    assert forecast['buckets'][0]['expenses'] == 50.0
+    assert forecast['ending_balance'] == -50.0
+
+def test_occurrence_already_generated_today_is_not_forecast_again():
+    forecast = forecast_rule_due_today(last_generated=date.today())
+    
+    assert forecast['total_expenses'] == 0.0
+    assert forecast['ending_balance'] == 0.0
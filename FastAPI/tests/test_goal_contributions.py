@@ -0,0 +1,40 @@
+import asyncio
+import os
+import pytest
+
+if not os.getenv("FIRESTORE_EMULATOR_HOST"):
+    pytest.skip("needs the Firestore emulator (FIRESTORE_EMULATOR_HOST)", allow_module_level=True)
+
+from app.core import versioning
+from app.services.goal_service import GoalService
+
+UID = "contribution-test-user"
+CONTRIBUTIONS = 1000
+
+def contribute_in_parallel(shards: int) -> dict:
+    async def run():
+        goal = await GoalService.create(UID, {
+            'name': 'Concurrency test',
+            'target_amount': CONTRIBUTIONS / 2,
+            'current_amount': 0.0,
+            'currency': 'USD',
+            'contribution_shards': shards
+        })
+        try:
+            await asyncio.gather(*(
+                GoalService.contribute(UID, goal['id'], 1.0) for _ in range(CONTRIBUTIONS)
+            ))
+            return await GoalService.get_by_id(UID, goal['id'])
+        finally:
+            await GoalService.delete(UID, goal['id'])
+            await versioning.flush_pending_bumps()
+    
+    return asyncio.run(run())
+
+@pytest.mark.parametrize("shards", [0, 10])
+def test_parallel_contributions_are_not_lost(shards):
+    goal = contribute_in_parallel(shards)
+    
+    assert goal['current_amount'] == CONTRIBUTIONS
+    assert goal['progress_percentage'] == 100
+    assert goal['is_completed']
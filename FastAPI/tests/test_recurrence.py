@@ -0,0 +1,141 @@
+import calendar
+import itertools
+import random
+from datetime import date, timedelta
+from typing import List, Optional
+import pytest
+from app.utils.recurrence import RecurrenceSchedule
+
+SEEDS = range(20)
+CASES_PER_SEED = 250
+
+def legacy_dates_to_generate(
+    frequency: str,
+    last_generated: date,
+    current_date: date,
+    day_of_week: Optional[int] = None,
+    day_of_month: Optional[int] = None,
+    month_of_year: Optional[int] = None,
+    end_date: Optional[date] = None
+) -> List[date]:
+    """RecurringTransactionService._get_dates_to_generate before RecurrenceSchedule replaced it"""
+    dates = []
+    
+    if frequency == 'daily':
+        delta = current_date - last_generated
+        for i in range(1, delta.days + 1):
+            generation_date = last_generated + timedelta(days=i)
+            if end_date and generation_date > end_date:
+                break
+            dates.append(generation_date)
+    
+    elif frequency == 'weekly' and day_of_week is not None:
+        next_date = last_generated + timedelta(days=1)
+        days_ahead = (day_of_week - next_date.weekday()) % 7
+        next_date = next_date + timedelta(days=days_ahead)
+        
+        while next_date <= current_date:
+            if end_date and next_date > end_date:
+                break
+            dates.append(next_date)
+            next_date += timedelta(days=7)
+    
+    elif frequency == 'monthly' and day_of_month is not None:
+        next_month = last_generated.replace(day=1) + timedelta(days=32)
+        next_month = next_month.replace(day=1)
+        
+        while (next_month.year, next_month.month) <= (current_date.year, current_date.month):
+            last_day = calendar.monthrange(next_month.year, next_month.month)[1]
+            generation_date = next_month.replace(day=min(day_of_month, last_day))
+            if last_generated < generation_date <= current_date:
+                if end_date and generation_date > end_date:
+                    break
+                dates.append(generation_date)
+            next_month = (next_month.replace(day=1) + timedelta(days=32)).replace(day=1)
+    
+    elif frequency == 'yearly' and day_of_month is not None and month_of_year is not None:
+        current_year = last_generated.year
+        
+        while current_year <= current_date.year:
+            last_day = calendar.monthrange(current_year, month_of_year)[1]
+            generation_date = date(current_year, month_of_year, min(day_of_month, last_day))
+            if last_generated < generation_date <= current_date:
+                if end_date and generation_date > end_date:
+                    break
+                dates.append(generation_date)
+            current_year += 1
+    
+    return dates
+
+def random_cases(seed: int):
+    """(schedule arguments, last_generated, current_date) drawn around month ends and leap years"""
+    rng = random.Random(seed)
+    for _ in range(CASES_PER_SEED):
+        last_generated = date(2019, 1, 1) + timedelta(days=rng.randint(0, 3000))
+        current_date = last_generated + timedelta(days=rng.randint(-5, 1500))
+        end_date = rng.choice([None, last_generated + timedelta(days=rng.randint(-10, 1600))])
+        args = (rng.randint(0, 6), rng.choice([1, 15, 28, 29, 30, 31, rng.randint(1, 31)]), rng.randint(1, 12), end_date)
+        yield args, last_generated, current_date
+
+def schedule(frequency: str, day_of_week: int, day_of_month: int, month_of_year: int, end_date: Optional[date]):
+    return RecurrenceSchedule(frequency, None, end_date, day_of_week, day_of_month, month_of_year)
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("frequency", ['daily', 'weekly', 'yearly'])
+def test_matches_legacy_generation(frequency, seed):
+    for (day_of_week, day_of_month, month_of_year, end_date), last_generated, current_date in random_cases(seed):
+        expected = legacy_dates_to_generate(
+            frequency, last_generated, current_date, day_of_week, day_of_month, month_of_year, end_date
+        )
+        actual = list(schedule(frequency, day_of_week, day_of_month, month_of_year, end_date).between(last_generated, current_date))
+        assert actual == expected, (frequency, last_generated, current_date, day_of_week, day_of_month, month_of_year, end_date)
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_monthly_also_generates_the_rest_of_last_generated_month(seed):
+    # The legacy walk started at the month after last_generated, so an occurrence
+    # later in last_generated's own month was skipped; RecurrenceSchedule keeps it
+    for (_, day_of_month, _, end_date), last_generated, current_date in random_cases(seed):
+        expected = legacy_dates_to_generate(
+            'monthly', last_generated, current_date, day_of_month=day_of_month, end_date=end_date
+        )
+        actual = list(schedule('monthly', 0, day_of_month, 1, end_date).between(last_generated, current_date))
+        
+        same_month = [
+            d for d in actual
+            if (d.year, d.month) == (last_generated.year, last_generated.month)
+        ]
+        assert len(same_month) <= 1
+        assert actual == same_month + expected
+
+def test_monthly_example_from_the_middle_of_a_month():
+    monthly = RecurrenceSchedule('monthly', day_of_month=31)
+    
+    assert list(monthly.between(date(2024, 1, 15), date(2024, 4, 1))) == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)
+    ]
+    assert legacy_dates_to_generate('monthly', date(2024, 1, 15), date(2024, 4, 1), day_of_month=31) == [
+        date(2024, 2, 29), date(2024, 3, 31)
+    ]
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("frequency", ['daily', 'weekly', 'monthly', 'yearly'])
+def test_count_between_matches_between(frequency, seed):
+    rng = random.Random(seed)
+    for (day_of_week, day_of_month, month_of_year, end_date), last_generated, current_date in random_cases(seed):
+        start_date = rng.choice([None, last_generated + timedelta(days=rng.randint(-40, 40))])
+        rule = RecurrenceSchedule(frequency, start_date, end_date, day_of_week, day_of_month, month_of_year)
+        
+        assert rule.count_between(last_generated, current_date) == len(list(rule.between(last_generated, current_date)))
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("frequency", ['daily', 'weekly', 'monthly', 'yearly'])
+def test_nth_after_matches_between(frequency, seed):
+    rng = random.Random(seed)
+    for (day_of_week, day_of_month, month_of_year, end_date), last_generated, _ in random_cases(seed):
+        n = rng.randint(1, 30)
+        unbounded = RecurrenceSchedule(frequency, None, None, day_of_week, day_of_month, month_of_year)
+        occurrences = list(itertools.islice(unbounded.between(last_generated, last_generated + timedelta(days=31 * 366)), n))
+        expected = occurrences[n - 1] if end_date is None or occurrences[n - 1] <= end_date else None
+        
+        rule = RecurrenceSchedule(frequency, None, end_date, day_of_week, day_of_month, month_of_year)
+        assert rule.nth_after(last_generated, n) == expected
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { auth } from './firebase';
 
 // Determine the base URL based on environment
 const getBaseUrl = () => {
@@ -12,4 +13,18 @@ const api = axios.create({
   baseURL: getBaseUrl(),
 });
 
+// Data is stored per user, so every API call carries the signed-in user's ID token.
+// getIdToken returns the cached token and only refreshes it when it is about to expire.
+const attachIdToken = async (config) => {
+  const user = auth.currentUser;
+  if (user) {
+    config.headers.Authorization = `Bearer ${await user.getIdToken()}`;
+  }
+  return config;
+};
+
+// Components also call the API with the global axios instance
+api.interceptors.request.use(attachIdToken);
+axios.interceptors.request.use(attachIdToken);
+
 export default api;
@@ -17,44 +17,25 @@ const BudgetAlerts = ({ transactions }) => {
     try {
       setLoading(true);
 
-      // Get all budgets
-      const budgetsResponse = await axios.get(`${API_URL}/budgets`);
-      const budgets = budgetsResponse.data;
-
-      if (budgets.length === 0) {
-        setLoading(false);
-        return;
-      }
-
-      // Check status for each budget
-      const alertsData = [];
-
-      for (const budget of budgets) {
-        try {
-          const statusResponse = await axios.get(
-            `${API_URL}/budgets/status/${budget.category}`
-          );
-          const status = statusResponse.data;
-
-          // Only add alerts for approaching or exceeded budgets
-          if (status.status === 'approaching' || status.status === 'exceeded') {
-            alertsData.push({
-              id: budget.id,
-              category: budget.category,
-              budgetAmount: budget.amount,
-              spentAmount: status.spent_amount,
-              remainingAmount: status.remaining_amount,
-              percentageUsed: status.percentage_used,
-              status: status.status,
-            });
-          }
-        } catch (err) {
-          console.error(
-            `Error checking budget status for ${budget.category}:`,
-            err
-          );
-        }
-      }
+      // Get the status of every budget in one request
+      const statusResponse = await axios.get(`${API_URL}/budgets/status`);
+      const statuses = statusResponse.data;
+
+      // Only add alerts for approaching or exceeded budgets
+      const alertsData = statuses
+        .filter(
+          (status) =>
+            status.status === 'approaching' || status.status === 'exceeded'
+        )
+        .map((status) => ({
+          id: status.id,
+          category: status.category,
+          budgetAmount: status.budget_amount,
+          spentAmount: status.spent_amount,
+          remainingAmount: status.remaining_amount,
+          percentageUsed: status.percentage_used,
+          status: status.status,
+        }));
 
       setBudgetAlerts(alertsData);
       setLoading(false);
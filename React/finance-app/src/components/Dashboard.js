@@ -12,6 +12,9 @@ import {
 } from 'chart.js';
 import { Pie, Bar } from 'react-chartjs-2';
 import { FaChartPie, FaChartBar, FaCalendarDay } from 'react-icons/fa';
+import axios from 'axios';
+
+const API_URL = 'http://localhost:8000/api';
 
 // Register Chart.js components
 ChartJS.register(
@@ -39,20 +42,40 @@ const Dashboard = ({ transactions }) => {
   const isDarkMode = document.body.classList.contains('dark-mode');
 
   useEffect(() => {
-    // Process category data
-    const expensesByCategory = {};
-    transactions
-      .filter((t) => !t.is_income)
-      .forEach((t) => {
-        if (!expensesByCategory[t.category]) {
-          expensesByCategory[t.category] = 0;
-        }
-        expensesByCategory[t.category] += t.amount;
-      });
+    fetchSummaries();
+  }, [transactions, isDarkMode]);
 
-    const sortedCategories = Object.entries(expensesByCategory)
-      .sort((a, b) => b[1] - a[1])
-      .slice(0, 5);
+  const fetchSummaries = async () => {
+    const currentYear = new Date().getFullYear();
+
+    try {
+      // Totals are aggregated on the server over every transaction, not just the loaded page
+      const [categoryResponse, monthlyResponse] = await Promise.all([
+        axios.get(`${API_URL}/analytics/summary`, {
+          params: { group_by: 'category' },
+        }),
+        axios.get(`${API_URL}/analytics/summary`, {
+          params: {
+            group_by: 'month',
+            from: `${currentYear}-01-01`,
+            to: `${currentYear + 1}-01-01`,
+          },
+        }),
+      ]);
+
+      buildCategoryData(categoryResponse.data.buckets);
+      buildMonthlyData(monthlyResponse.data.buckets, currentYear);
+    } catch (err) {
+      console.error('Error fetching spending summaries:', err);
+    }
+  };
+
+  const buildCategoryData = (buckets) => {
+    // Buckets arrive sorted by expenses, largest first
+    const sortedCategories = buckets
+      .filter((b) => b.expenses > 0)
+      .slice(0, 5)
+      .map((b) => [b.key, b.expenses]);
 
     setCategoryData({
       labels: sortedCategories.map((c) => c[0]),
@@ -93,29 +116,18 @@ const Dashboard = ({ transactions }) => {
         },
       ],
     });
+  };
 
-    // Process monthly data
+  const buildMonthlyData = (buckets, currentYear) => {
     const monthlyExpenses = {};
     const monthlyIncome = {};
-    const currentYear = new Date().getFullYear();
 
-    transactions.forEach((t) => {
-      const date = new Date(t.date);
-      const monthYear = `${date.getMonth() + 1}/${date.getFullYear()}`;
-
-      if (date.getFullYear() === currentYear) {
-        if (t.is_income) {
-          if (!monthlyIncome[monthYear]) {
-            monthlyIncome[monthYear] = 0;
-          }
-          monthlyIncome[monthYear] += t.amount;
-        } else {
-          if (!monthlyExpenses[monthYear]) {
-            monthlyExpenses[monthYear] = 0;
-          }
-          monthlyExpenses[monthYear] += t.amount;
-        }
-      }
+    // Bucket keys are 'YYYY-MM'
+    buckets.forEach((b) => {
+      const [year, month] = b.key.split('-');
+      const monthYear = `${parseInt(month)}/${year}`;
+      monthlyIncome[monthYear] = b.income;
+      monthlyExpenses[monthYear] = b.expenses;
     });
 
     // Get all months from the current year
@@ -167,13 +179,15 @@ const Dashboard = ({ transactions }) => {
         },
       ],
     });
+  };
 
+  useEffect(() => {
     // Get recent transactions
     const recent = [...transactions]
       .sort((a, b) => new Date(b.date) - new Date(a.date))
       .slice(0, 5);
     setRecentTransactions(recent);
-  }, [transactions, isDarkMode]);
+  }, [transactions]);
 
   const formatDate = (dateString) => {
     const options = { year: 'numeric', month: 'short', day: 'numeric' };